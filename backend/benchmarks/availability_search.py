@@ -0,0 +1,131 @@
+"""
+Micro-benchmark: free-room search latency.
+
+    cd backend && python -m benchmarks.availability_search [--rooms 1000] [--years 2]
+
+Builds a throwaway SQLite database with rooms of every type and capacity
+booked most nights from today on, loads the availability index, then times
+random searches (1-14 nights, capacity, optional room type) on the occupancy
+grid, on the per-room interval lists and with the database query, and checks
+all three agree.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+_DB_DIR = tempfile.mkdtemp(prefix="lobbylobster-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from database import engine, init_db  # noqa: E402
+from models import Reservation, ReservationStatus, Room, RoomType  # noqa: E402
+from models.ids import new_id  # noqa: E402
+from services.availability_index import AvailabilityIndex, blocking_stays_query, free_rooms_query  # noqa: E402
+
+STATUSES = [ReservationStatus.CONFIRMED] * 8 + [ReservationStatus.CANCELLED, ReservationStatus.CHECKED_IN]
+
+
+def build(rooms_count: int, days: int) -> int:
+    init_db()
+    rng = random.Random(5)
+    types = list(RoomType)
+    rooms = [{"id": new_id(), "number": str(1000 + i), "name": f"Room {i}",
+              "room_type": types[i % len(types)], "capacity": 1 + i % 5} for i in range(rooms_count)]
+    today = date.today()
+    stays = 0
+    with engine.begin() as conn:
+        conn.execute(insert(Room), rooms)
+        batch = []
+        for room in rooms:
+            day = today
+            while day < today + timedelta(days=days):
+                day += timedelta(days=rng.choice([0, 0, 1, 3]))
+                nights = rng.randint(1, 6)
+                batch.append({
+                    "id": new_id(), "room_id": room["id"], "guest_name": "Guest", "guest_key": "guest",
+                    "check_in": day, "check_out": day + timedelta(days=nights), "status": rng.choice(STATUSES),
+                })
+                day += timedelta(days=nights)
+                if len(batch) == 20000:
+                    conn.execute(insert(Reservation), batch)
+                    stays += len(batch)
+                    batch = []
+        conn.execute(insert(Reservation), batch)
+    return stays + len(batch)
+
+
+def searches(days: int, count: int):
+    rng = random.Random(3)
+    today = date.today()
+    out = []
+    for _ in range(count):
+        check_in = today + timedelta(days=rng.randrange(days))
+        out.append((check_in, check_in + timedelta(days=rng.randint(1, 14)),
+                    rng.randint(1, 5), rng.choice([None, *RoomType])))
+    return out
+
+
+def timings(fn, items):
+    samples, answers = [], []
+    for item in items:
+        start = time.perf_counter()
+        answers.append(sorted(fn(*item)))
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples), answers
+
+
+def report(name, samples):
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<22} p50 {statistics.median(samples):7.3f} ms   p99 {p99:7.3f} ms  ({len(samples)} searches)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--searches", type=int, default=500)
+    args = parser.parse_args()
+
+    days = 365 * args.years
+    begin = time.perf_counter()
+    stays = build(args.rooms, days)
+    print(f"Built {args.rooms} rooms / {stays} stays in {time.perf_counter() - begin:.1f}s ({_DB_DIR})")
+
+    index = AvailabilityIndex()
+    with engine.connect() as conn:
+        begin = time.perf_counter()
+        rooms = [tuple(row) for row in conn.execute(select(Room.id, Room.capacity, Room.room_type))]
+        index.load((tuple(row) for row in conn.execute(blocking_stays_query())), rooms)
+        print(f"Index loaded in {(time.perf_counter() - begin) * 1000:.0f} ms")
+
+        items = searches(days, args.searches)
+        grid_ms, grid = timings(index.free_rooms, items)
+        report("occupancy grid", grid_ms)
+
+        def intervals(check_in, check_out, min_capacity, room_type):
+            return [
+                room_id for room_id, capacity, kind in rooms
+                if capacity >= min_capacity and room_type in (None, kind)
+                and index.is_available(room_id, check_in, check_out)
+            ]
+        interval_ms, by_interval = timings(intervals, items)
+        report("interval lists", interval_ms)
+
+        def database(check_in, check_out, min_capacity, room_type):
+            query = free_rooms_query(check_in, check_out, min_capacity, room_type).with_only_columns(Room.id)
+            return conn.execute(query).scalars().all()
+        database_ms, by_database = timings(database, items)
+        report("database query", database_ms)
+
+    assert grid == by_interval == by_database
+    print("all three agree")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Micro-benchmark: guest autocomplete latency on a large database.
+
+    cd backend && python -m benchmarks.guest_search [--reservations 1000000]
+
+Builds a throwaway SQLite database (rooms, reservations for a pool of
+repeat guests, guest statistics and search index), then times typed
+prefixes, email and phone fragments and misspelled names against the old
+ILIKE + GROUP BY query and the indexed search (uncached; the in-process
+cache only makes repeated keystrokes cheaper).
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+_DB_DIR = tempfile.mkdtemp(prefix="lobbylobster-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from database import engine, init_db  # noqa: E402
+from models import Reservation, ReservationStatus, Room, RoomType  # noqa: E402
+from models.guest_stats import guest_key  # noqa: E402
+from models.ids import new_id  # noqa: E402
+from services import guest_search, guest_stats  # noqa: E402
+
+FIRST = ["Anna", "Ben", "Carla", "David", "Elif", "Felix", "Greta", "Hannah", "Ivan", "Jonas",
+         "Katrin", "Lukas", "Mia", "Noah", "Olga", "Paul", "Quentin", "Rosa", "Sven", "Tanja"]
+LAST = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+        "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Schröder", "Neumann"]
+COMPANIES = ["Acme GmbH", "Globex AG", "Initech", "Umbrella KG", "Hooli", None, None, None]
+
+
+def make_guests(count: int):
+    rng = random.Random(7)
+    guests = []
+    for i in range(count):
+        suffix = "".join(rng.choices(string.ascii_lowercase, k=4))
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)}-{suffix}"
+        guests.append({
+            "guest_name": name,
+            "guest_email": f"{suffix}.{i}@example.com",
+            "guest_phone": f"+49 {rng.randint(30, 999)} {rng.randint(100000, 9999999)}",
+            "guest_company": rng.choice(COMPANIES),
+        })
+    return guests
+
+
+def build(reservations: int, guests_count: int):
+    init_db()
+    rng = random.Random(11)
+    rooms = [{"id": new_id(), "number": str(100 + i), "name": f"Room {i}",
+              "room_type": RoomType.DOUBLE, "capacity": 2, "floor": 1} for i in range(200)]
+    guests = make_guests(guests_count)
+    start = date(2016, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Room), rooms)
+        batch = []
+        for i in range(reservations):
+            guest = rng.choice(guests)
+            check_in = start + timedelta(days=rng.randrange(3650))
+            batch.append({
+                "id": new_id(),
+                "room_id": rng.choice(rooms)["id"],
+                "guest_key": guest_key(guest["guest_name"]),
+                "check_in": check_in,
+                "check_out": check_in + timedelta(days=rng.randint(1, 7)),
+                "status": ReservationStatus.CHECKED_OUT,
+                "guest_city": "Berlin",
+                **guest,
+            })
+            if len(batch) == 20000:
+                conn.execute(insert(Reservation), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Reservation), batch)
+        built = guest_stats.rebuild(conn)
+    return guests, built
+
+
+def queries(guests, count: int):
+    rng = random.Random(3)
+    out = []
+    for _ in range(count):
+        guest = rng.choice(guests)
+        kind = rng.random()
+        name = guest["guest_name"]
+        if kind < 0.5:
+            out.append(name[:rng.randint(2, 8)])
+        elif kind < 0.65:
+            last = name.split()[1]
+            out.append(last[:rng.randint(3, 7)])
+        elif kind < 0.75:
+            out.append(guest["guest_email"][:rng.randint(4, 8)])
+        elif kind < 0.85:
+            digits = guest["guest_phone"].replace(" ", "")[3:]
+            out.append(digits[:rng.randint(4, 7)])
+        else:
+            # Swap two adjacent letters
+            word = name.split()[0].lower()
+            i = rng.randrange(len(word) - 1)
+            out.append(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+    return out
+
+
+def old_search(conn, query: str, limit: int = 10):
+    # The pre-index endpoint (abridged GROUP BY, same scan)
+    return conn.execute(
+        select(Reservation.guest_name, Reservation.guest_email, Reservation.guest_phone,
+               func.max(Reservation.created_at))
+        .where(Reservation.guest_name.ilike(f"%{query}%"))
+        .group_by(Reservation.guest_name, Reservation.guest_email, Reservation.guest_phone)
+        .order_by(func.max(Reservation.created_at).desc())
+        .limit(limit)
+    ).all()
+
+
+def timings(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples
+
+
+def report(name, samples):
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<22} p50 {statistics.median(samples):7.2f} ms   p99 {p99:7.2f} ms   "
+          f"max {samples[-1]:7.2f} ms  ({len(samples)} queries)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reservations", type=int, default=1_000_000)
+    parser.add_argument("--guests", type=int, default=0, help="default: reservations / 4")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--old-queries", type=int, default=20, help="the old scan is slow")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    guests, built = build(args.reservations, args.guests or max(1, args.reservations // 4))
+    print(f"Built {args.reservations} reservations / {built} guests in {time.perf_counter() - start:.1f}s "
+          f"({_DB_DIR})")
+
+    items = queries(guests, args.queries)
+    with engine.connect() as conn:
+        for item in items[:50]:
+            guest_search.search(conn, item)  # warm up the page cache
+        report("old ILIKE + GROUP BY", timings(lambda q: old_search(conn, q), items[:args.old_queries]))
+        report("indexed search", timings(lambda q: guest_search.search(conn, q), items))
+        hits = sum(1 for item in items if guest_search.search(conn, item))
+        print(f"queries with suggestions: {hits}/{len(items)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
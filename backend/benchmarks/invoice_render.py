@@ -0,0 +1,83 @@
+"""
+Micro-benchmark: invoices rendered per second, single core.
+
+    cd backend && python -m benchmarks.invoice_render [--seconds 3]
+
+"per-request setup" mirrors the pre-template renderer: stylesheet and table
+styles rebuilt for every invoice, full platypus document build, ASCII85
+encoded streams. "shared template" is what the API uses now.
+"""
+import argparse
+import time
+from datetime import date
+
+from reportlab import rl_config
+
+from services.invoice_pdf import InvoiceSnapshot, InvoiceTemplate, get_invoice_template
+
+SAMPLE = InvoiceSnapshot(
+    id="3f2b8c1e-0000-4000-8000-000000000000",
+    status="CHECKED_OUT",
+    guest_name="Jane Doe",
+    room_number="201",
+    room_name="Deluxe Double",
+    check_in=date(2026, 3, 2),
+    check_out=date(2026, 3, 5),
+    guest_email="jane@example.com",
+    guest_phone="+49 30 1234567",
+    guest_address="Hauptstraße 1",
+    guest_city="Berlin",
+    guest_postal_code="10115",
+    guest_country="Germany",
+    price_per_night=129.0,
+    breakfast_included=True,
+    total_price=387.0,
+    payment_method="CREDIT_CARD",
+)
+
+
+def per_request_setup():
+    rl_config.useA85 = 1
+    try:
+        return InvoiceTemplate().render(SAMPLE, fast_path=False)
+    finally:
+        rl_config.useA85 = 0
+
+
+def shared_template_full_layout():
+    return get_invoice_template().render(SAMPLE, fast_path=False)
+
+
+def shared_template():
+    return get_invoice_template().render(SAMPLE)
+
+
+def measure(fn, seconds: float) -> float:
+    fn()  # warm up
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="time per scenario")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("per-request setup (before)", per_request_setup),
+        ("shared template, full layout", shared_template_full_layout),
+        ("shared template, one-page fast path", shared_template),
+    ]
+    baseline = None
+    for name, fn in scenarios:
+        rate = measure(fn, args.seconds)
+        baseline = baseline or rate
+        print(f"{name:<38} {rate:8.1f} invoices/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark: encoding large list responses.
+
+    cd backend && python -m benchmarks.list_responses [--rows 10000] [--repeat 10]
+
+Builds a throwaway SQLite database with ``--rows`` reservations, loads them
+the way ``GET /api/reservations`` and the calendar do, then times turning
+them into the response body: FastAPI's ``response_model`` path (validate,
+dump, stdlib json), the same with orjson, and the ListEncoder in validated
+and trusted mode. Checks every path produces the same JSON.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+_DB_DIR = tempfile.mkdtemp(prefix="lobbylobster-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from database import SessionLocal, engine, init_db  # noqa: E402
+from models import Reservation, ReservationStatus, Room, RoomType  # noqa: E402
+from models.ids import new_id  # noqa: E402
+from routes.reservations import CALENDAR_JSON, RESERVATIONS_JSON, calendar_query, with_room  # noqa: E402
+from schemas import ReservationResponse, ReservationWithRoom  # noqa: E402
+from services.fast_json import FastJSONResponse  # noqa: E402
+
+
+def build(rows: int, rooms_count: int = 300) -> date:
+    init_db()
+    rng = random.Random(11)
+    types = list(RoomType)
+    rooms = [{"id": new_id(), "number": str(1000 + i), "name": f"Room {i}",
+              "room_type": types[i % len(types)], "capacity": 2} for i in range(rooms_count)]
+    start = date(2026, 1, 1)
+    reservations = []
+    for i in range(rows):
+        check_in = start + timedelta(days=rng.randrange(60))
+        reservations.append({
+            "id": new_id(), "room_id": rooms[i % rooms_count]["id"],
+            "guest_name": f"Guest {i}", "guest_key": f"guest {i}", "guest_email": f"guest{i}@example.com",
+            "guest_phone": "+49 30 1234567", "guest_city": "Berlin", "guest_country": "DE",
+            "check_in": check_in, "check_out": check_in + timedelta(days=rng.randint(1, 7)),
+            "price_per_night": rng.choice([79.0, 99.5, 120.0]), "total_price": 300.0,
+            "status": ReservationStatus.CONFIRMED, "notes": "Late arrival" if i % 5 == 0 else None,
+        })
+    with engine.begin() as conn:
+        conn.execute(insert(Room), rooms)
+        conn.execute(insert(Reservation), reservations)
+    return start
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def response_model_body(field, content, response_class) -> bytes:
+    """What FastAPI does with a response_model result"""
+    serialized = asyncio.run(serialize_response(field=field, response_content=content()))
+    return response_class(serialized).body
+
+
+def compare(name: str, schema, objects, content, encoder, repeat: int):
+    """Time each path; ``content`` returns what the route used to return"""
+    field = create_model_field(name="Response", type_=List[schema], mode="serialization")
+    paths = {
+        "response_model + json": lambda: response_model_body(field, content, JSONResponse),
+        "response_model + orjson": lambda: response_model_body(field, content, FastJSONResponse),
+        "ListEncoder (validated)": lambda: encoder.encode(objects, validate=True),
+        "ListEncoder (trusted)": lambda: encoder.encode(objects, validate=False),
+    }
+    expected = json.loads(paths["response_model + json"]())
+    print(f"\n{name}: {len(objects)} rows")
+    baseline = None
+    for label, fn in paths.items():
+        if json.loads(fn()) != expected:
+            sys.exit(f"{label} does not match the response_model output")
+        ms = timed(fn, repeat)
+        baseline = baseline or ms
+        print(f"  {label:<26} {ms:8.1f} ms  ({baseline / ms:4.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    start = build(args.rows)
+    with SessionLocal() as db:
+        reservations = db.scalars(select(Reservation).order_by(Reservation.check_in, Reservation.id)).all()
+        compare("GET /api/reservations", ReservationResponse, reservations, lambda: reservations,
+                RESERVATIONS_JSON, args.repeat)
+        # The calendar used to build a dict per reservation before returning
+        calendar = db.scalars(calendar_query(start, start + timedelta(days=90))).all()
+        compare("GET /api/reservations/calendar", ReservationWithRoom, calendar,
+                lambda: [with_room(reservation) for reservation in calendar], CALENDAR_JSON, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
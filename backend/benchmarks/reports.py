@@ -0,0 +1,135 @@
+"""
+Micro-benchmark: occupancy / ADR / RevPAR report over a large history.
+
+    cd backend && python -m benchmarks.reports [--rooms 300] [--years 5]
+
+Builds a throwaway SQLite database with back-to-back stays in every room and
+its daily room-nights rollup, then times the report (rollup query + NumPy)
+per granularity against looping over every night in Python, and checks both
+agree.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+_DB_DIR = tempfile.mkdtemp(prefix="lobbylobster-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/bench.db"
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from database import engine, init_db, open_session  # noqa: E402
+from models import Reservation, ReservationStatus, Room, RoomType  # noqa: E402
+from models.ids import new_id  # noqa: E402
+from services import reports, room_nights  # noqa: E402
+
+STATUSES = [ReservationStatus.CHECKED_OUT] * 8 + [ReservationStatus.CONFIRMED, ReservationStatus.CANCELLED]
+
+
+def build(rooms_count: int, start: date, end: date) -> int:
+    init_db()
+    rng = random.Random(5)
+    types = list(RoomType)
+    rooms = [{"id": new_id(), "number": str(1000 + i), "name": f"Room {i}",
+              "room_type": types[i % len(types)], "capacity": 2} for i in range(rooms_count)]
+    stays = 0
+    with engine.begin() as conn:
+        conn.execute(insert(Room), rooms)
+        batch = []
+        for room in rooms:
+            day = start
+            while day < end:
+                day += timedelta(days=rng.choice([0, 0, 1, 2]))
+                nights = rng.randint(1, 6)
+                batch.append({
+                    "id": new_id(), "room_id": room["id"], "guest_name": "Guest",
+                    "guest_key": "guest", "check_in": day, "check_out": day + timedelta(days=nights),
+                    "status": rng.choice(STATUSES),
+                    "price_per_night": rng.choice([None, 79.0, 99.0, 149.0]),
+                })
+                day += timedelta(days=nights)
+                if len(batch) == 20000:
+                    conn.execute(insert(Reservation), batch)
+                    stays += len(batch)
+                    batch = []
+        conn.execute(insert(Reservation), batch)
+    return stays + len(batch)
+
+
+def stays_query(start: date, end: date):
+    return select(
+        Reservation.check_in, Reservation.check_out, Reservation.price_per_night, Reservation.total_price,
+    ).where(
+        Reservation.status != ReservationStatus.CANCELLED,
+        Reservation.check_in <= end,
+        Reservation.check_out > start,
+    )
+
+
+def loop_report(start: date, end: date):
+    """The old way: every stay, every night, in Python (monthly totals)"""
+    sold = defaultdict(int)
+    revenue = defaultdict(float)
+    with engine.connect() as conn:
+        for check_in, check_out, price, total in conn.execute(stays_query(start, end)):
+            nights = (check_out - check_in).days
+            rate = price if price is not None else (total / nights if total else 0.0)
+            day = max(check_in, start)
+            while day < check_out and day <= end:
+                sold[day.replace(day=1)] += 1
+                revenue[day.replace(day=1)] += rate
+                day += timedelta(days=1)
+    return sold, revenue
+
+
+async def timed_report(start: date, end: date, granularity: str, by_room_type: bool):
+    async with open_session() as db:
+        begin = time.perf_counter()
+        report = await reports.occupancy_report(db, start, end, granularity, by_room_type)
+        return report, (time.perf_counter() - begin) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    start = date(2020, 1, 1)
+    end = date(start.year + args.years, 1, 1) - timedelta(days=1)
+    begin = time.perf_counter()
+    stays = build(args.rooms, start, end)
+    print(f"Built {args.rooms} rooms / {stays} stays in {time.perf_counter() - begin:.1f}s ({_DB_DIR})")
+    # Core inserts skip the flush hooks, as a migration would
+    begin = time.perf_counter()
+    with engine.begin() as conn:
+        cells = room_nights.rebuild(conn)
+    print(f"Rolled up into {cells} days x room types in {time.perf_counter() - begin:.1f}s")
+
+    for granularity in reports.GRANULARITIES:
+        for by_room_type in (False, True):
+            timings = []
+            for _ in range(5):
+                report, ms = asyncio.run(timed_report(start, end, granularity, by_room_type))
+                timings.append(ms)
+            label = f"{granularity}{' x room type' if by_room_type else ''}"
+            print(f"{label:<22} {len(report['rows']):6} rows   best {min(timings):7.1f} ms")
+
+    begin = time.perf_counter()
+    sold, revenue = loop_report(start, end)
+    print(f"{'python nightly loop':<22} {len(sold):6} rows   {(time.perf_counter() - begin) * 1000:12.1f} ms")
+
+    report, _ = asyncio.run(timed_report(start, end, "month", False))
+    for row in report["rows"]:
+        assert row["rooms_sold"] == sold[row["period"]], row
+        assert abs(row["revenue"] - revenue[row["period"]]) < 0.01, row
+    print("monthly figures match the loop")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,32 @@
 """
 Clear all data from the database
 """
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
 from database import SessionLocal, init_db
-from models import Room, Reservation
+from models import Room, Reservation, GuestStats, DailyRoomNights, Tombstone
+from models.change_log import next_version
+
+
+def tombstone_all(db, model, name: str):
+    """Tombstone every row of ``model`` at a new change version.
+
+    Bulk deletes skip the flush hook that does this, and without tombstones
+    calendar clients and the API workers' availability indexes would never
+    learn about the deletions.
+    """
+    # Ids through the ORM type: they are stored as text in the tombstones
+    ids = db.scalars(select(model.id)).all()
+    if not ids:
+        return
+    version = next_version(db)
+    deleted_at = datetime.utcnow()
+    db.execute(insert(Tombstone), [
+        {"model": name, "object_id": object_id, "version": version, "deleted_at": deleted_at}
+        for object_id in ids
+    ])
 
 def clear_database():
     """Remove all data from the database"""
@@ -33,11 +57,16 @@ def clear_database():
             return
         
         # Delete all reservations first (foreign key constraint)
+        tombstone_all(db, Reservation, "reservation")
         db.query(Reservation).delete()
+        # Bulk deletes skip the flush hooks that maintain the statistics
+        db.query(GuestStats).delete()
+        db.query(DailyRoomNights).delete()
         db.commit()
         print("   ✅ Deleted all reservations")
         
         # Delete all rooms
+        tombstone_all(db, Room, "room")
         db.query(Room).delete()
         db.commit()
         print("   ✅ Deleted all rooms")
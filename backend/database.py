@@ -1,32 +1,411 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
 import os
+import time
 
 # Database URL (SQLite for development)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lobbylobster.db")
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# How routes talk to the database:
+#   "async" - async driver (aiosqlite / asyncpg) through an AsyncSession
+#   "sync"  - regular driver, every blocking call is run in the threadpool
+# Either way request handlers never block the event loop.
+DATABASE_MODE = os.getenv("DATABASE_MODE", "async").lower()
+if DATABASE_MODE not in ("async", "sync"):
+    raise ValueError(f"DATABASE_MODE must be 'async' or 'sync', got {DATABASE_MODE!r}")
+
+# Engine tuning:
+#   "auto"     - "sqlite" or "postgres" to match DATABASE_URL, else "default"
+#   "sqlite"   - WAL journal (readers never wait for the writer),
+#                synchronous=NORMAL, memory-mapped reads, a larger page
+#                cache and a busy timeout, set on every connection
+#   "postgres" - sized pool with pre-ping and recycling, statement timeout
+#   "default"  - SQLAlchemy's defaults
+DB_PROFILE = os.getenv("DB_PROFILE", "auto").lower()
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# Optional read replica (e.g. a PostgreSQL standby) for read-only routes,
+# which take their session from get_read_db. Unset: reads use DATABASE_URL.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or None
+# After a successful write a client reads from the primary for this long, so
+# it sees its own change even while the replica lags
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "lobbylobster_wrote"
+
+# Async driver for each sync URL scheme we support out of the box
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Translate a sync database URL into its async driver equivalent"""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        scheme = scheme.split("+", 1)[0]
+    if scheme not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for database URL scheme {scheme!r}, set ASYNC_DATABASE_URL")
+    return f"{ASYNC_DRIVERS[scheme]}{sep}{rest}"
+
+
+def resolve_profile(url: str) -> str:
+    if DB_PROFILE != "auto":
+        if DB_PROFILE not in ("sqlite", "postgres", "default"):
+            raise ValueError(f"DB_PROFILE must be auto, sqlite, postgres or default, got {DB_PROFILE!r}")
+        return DB_PROFILE
+    if url.startswith("sqlite"):
+        return "sqlite"
+    if url.startswith(("postgresql", "postgres")):
+        return "postgres"
+    return "default"
+
+
+def engine_options(url: str, profile: str, read_only: bool = False) -> dict:
+    """create_engine / create_async_engine keyword arguments for ``url``"""
+    options = {"connect_args": {"check_same_thread": False} if url.startswith("sqlite") else {}}
+    pool = dict(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if profile == "sqlite" and ":memory:" not in url and not url.rstrip("/").endswith(":"):
+        # aiosqlite keeps its NullPool: every pooled connection is a non-daemon
+        # thread, and scripts that never dispose the engine would not exit
+        if "+aiosqlite" not in url:
+            options.update(pool)
+    elif profile == "postgres":
+        options.update(pool, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=True)
+        settings = {}
+        if DB_STATEMENT_TIMEOUT_MS:
+            settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        if read_only:
+            settings["default_transaction_read_only"] = "on"
+        if settings and "+asyncpg" in url:
+            options["connect_args"]["server_settings"] = settings
+        elif settings:
+            options["connect_args"]["options"] = " ".join(f"-c {name}={value}" for name, value in settings.items())
+    return options
+
+
+def sqlite_pragmas() -> dict:
+    return {
+        "journal_mode": "WAL",
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        # Negative: size in KiB rather than pages
+        "cache_size": -SQLITE_CACHE_SIZE_KB,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+
+class PoolStats:
+    """Connection pool counters of one engine (see pool_status)"""
+
+    def __init__(self, sync_engine):
+        self.pool = sync_engine.pool
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidated = 0
+        event.listen(sync_engine, "connect", self._on_connect)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidated += 1
+
+    def to_dict(self) -> dict:
+        pool = self.pool
+        stats = {
+            "pool": type(pool).__name__,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidated": self.invalidated,
+        }
+        # Only queue pools have a size; NullPool / StaticPool report counters only
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        return stats
+
+
+def tune(sync_engine, profile: str, read_only: bool = False) -> PoolStats:
+    """Apply per-connection settings of the profile and start counting"""
+    if profile == "sqlite" or (read_only and sync_engine.dialect.name == "sqlite"):
+        pragmas = sqlite_pragmas() if profile == "sqlite" else {}
+        if read_only:
+            pragmas["query_only"] = "ON"
+
+        @event.listens_for(sync_engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    return PoolStats(sync_engine)
+
+
+ENGINE_PROFILE = resolve_profile(DATABASE_URL)
+
+# Create engine (always available: used by init_db and the CLI scripts)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, ENGINE_PROFILE))
+pool_stats = {"sync": tune(engine, ENGINE_PROFILE)}
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory (only when DATABASE_MODE=async, so the
+# async driver is not required for sync deployments)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    to_async_url(DATABASE_URL) if DATABASE_MODE == "async" else None
+)
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, ENGINE_PROFILE))
+    pool_stats["async"] = tune(async_engine.sync_engine, ENGINE_PROFILE)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+# Read engines: the replica when READ_DATABASE_URL is set, else the ones above
+READ_ENGINE_PROFILE = resolve_profile(READ_DATABASE_URL) if READ_DATABASE_URL else ENGINE_PROFILE
+read_engine = engine
+ReadSessionLocal = SessionLocal
+async_read_engine = async_engine
+AsyncReadSessionLocal = AsyncSessionLocal
+if READ_DATABASE_URL:
+    read_engine = create_engine(
+        READ_DATABASE_URL, **engine_options(READ_DATABASE_URL, READ_ENGINE_PROFILE, read_only=True)
+    )
+    pool_stats["read_sync"] = tune(read_engine, READ_ENGINE_PROFILE, read_only=True)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    if DATABASE_MODE == "async":
+        READ_ASYNC_DATABASE_URL = os.getenv("READ_ASYNC_DATABASE_URL") or to_async_url(READ_DATABASE_URL)
+        async_read_engine = create_async_engine(
+            READ_ASYNC_DATABASE_URL,
+            **engine_options(READ_ASYNC_DATABASE_URL, READ_ENGINE_PROFILE, read_only=True),
+        )
+        pool_stats["read_async"] = tune(async_read_engine.sync_engine, READ_ENGINE_PROFILE, read_only=True)
+        AsyncReadSessionLocal = async_sessionmaker(
+            bind=async_read_engine, autoflush=False, expire_on_commit=False
+        )
+
 # Base class for models
 Base = declarative_base()
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
+
+class SyncSessionAdapter:
+    """Awaitable facade over a sync Session (DATABASE_MODE=sync).
+
+    Mirrors the part of the AsyncSession API the routes use, so handlers are
+    written once against ``await db.execute(...)`` and friends. Blocking calls
+    run in the threadpool; results are buffered before they are handed back.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """Run ``fn(sync_session, *args, **kwargs)`` in the threadpool"""
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement, params=None, **kwargs):
+        def _execute(session):
+            return session.execute(statement, params, **kwargs).freeze()()
+        return await self.run_sync(_execute)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+@asynccontextmanager
+async def open_session(read: bool = False):
+    """Session for code outside a request (startup, background tasks).
+
+    Yields an AsyncSession, or a SyncSessionAdapter with the same awaitable
+    interface when DATABASE_MODE=sync. ``read=True`` opens it on the read
+    replica (if one is configured); such a session must not write.
+    """
+    if DATABASE_MODE == "async":
+        async with (AsyncReadSessionLocal if read else AsyncSessionLocal)() as db:
+            yield db
+    else:
+        db = SyncSessionAdapter((ReadSessionLocal if read else SessionLocal)(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+async def get_db():
+    """Dependency to get database session (see open_session)"""
+    async with open_session() as db:
+        yield db
+
+
+def wrote_recently(request) -> bool:
+    """Whether the client made a write within READ_YOUR_WRITES_SECONDS"""
     try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def use_replica(request) -> bool:
+    """Whether reads for this request may go to the replica"""
+    return READ_DATABASE_URL is not None and not wrote_recently(request)
+
+
+async def get_read_db(request: Request):
+    """Dependency for read-only routes: a replica session, unless the client
+    has just written (then the primary, so it reads its own writes)"""
+    async with open_session(read=use_replica(request)) as db:
         yield db
-    finally:
-        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients after a successful write (see wrote_recently).
+
+    The mark is a short-lived cookie holding its expiry time, so it works
+    whichever worker serves the client's next read.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={until:.3f}; Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
+
+
+def add_missing_columns(conn):
+    """Add columns and indexes that models gained after the table was created.
+
+    Lightweight stand-in for migrations: only ever adds, so new columns need
+    to be nullable or have a server default.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing]
+        for column in missing:
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            print(f"   ➕ Added column {table.name}.{column.name}")
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(conn)
+                if not missing:
+                    print(f"   ➕ Added index {index.name}")
+
 
 def init_db():
     """Initialize database (create tables)"""
-    Base.metadata.create_all(bind=engine)
+    from models.ids import check_id_storage
+    from models.guest_search import create_search_index, fill_search_index
+
+    check_id_storage(engine)
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        add_missing_columns(conn)
+        if create_search_index(conn):
+            fill_search_index(conn)
     print("✅ Database initialized successfully")
+
+
+def pool_status() -> dict:
+    """Engine profile and pool counters, for monitoring"""
+    status = {"profile": ENGINE_PROFILE, "dialect": engine.dialect.name}
+    if READ_DATABASE_URL:
+        status["read_replica"] = {"profile": READ_ENGINE_PROFILE, "dialect": read_engine.dialect.name}
+    status.update({name: stats.to_dict() for name, stats in pool_stats.items()})
+    if ENGINE_PROFILE == "sqlite":
+        with engine.connect() as conn:
+            status["pragmas"] = {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in sqlite_pragmas()
+            }
+    return status
+
+
+async def dispose_engines():
+    """Close pooled connections of both engines"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if READ_DATABASE_URL:
+        if async_read_engine is not None:
+            await async_read_engine.dispose()
+        read_engine.dispose()
+    if ENGINE_PROFILE == "sqlite":
+        # Refresh query planner statistics the session found worth updating
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+    engine.dispose()
@@ -0,0 +1,62 @@
+"""
+Bulk-import reservations from a JSON or CSV file.
+
+    python import_reservations.py reservations.csv [--dry-run] [--atomic] [--report report.json]
+
+Rows use the reservation fields of the API (``room_number`` may replace
+``room_id``). Nothing invalid is written; every rejected row is listed with
+its reason. See services/reservation_import.py.
+"""
+import argparse
+import json
+import sys
+
+from database import init_db
+from services.reservation_import import ImportFormatError, import_file
+
+# Rejected rows printed to the console (all are in --report)
+SHOWN_ERRORS = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import reservations from a JSON or CSV file")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["json", "csv"], help="default: from the file extension")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--atomic", action="store_true", help="import nothing unless every row is valid")
+    parser.add_argument("--report", help="write the full report (errors, created ids) as JSON")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "json")
+    init_db()
+    with open(args.file, "rb") as f:
+        data = f.read()
+
+    print(f"📥 Importing {args.file}...")
+    try:
+        report = import_file(
+            data, fmt, dry_run=args.dry_run, atomic=args.atomic,
+            progress=lambda done, total: print(f"   {done}/{total} rows written"),
+        )
+    except ImportFormatError as e:
+        print(f"❌ {e}")
+        return 1
+
+    for error in report.errors[:SHOWN_ERRORS]:
+        print(f"   ⚠️  row {error['row']}: {'; '.join(error['errors'])}")
+    if len(report.errors) > SHOWN_ERRORS:
+        print(f"   ... and {len(report.errors) - SHOWN_ERRORS} more")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report.to_dict(), f, indent=2, default=str)
+
+    if args.dry_run:
+        print(f"✅ {report.total} rows checked, {report.total - len(report.errors)} would be imported, "
+              f"{len(report.errors)} rejected")
+    else:
+        print(f"✅ {report.total} rows, {report.imported} imported, {len(report.errors)} rejected")
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,14 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import init_db
-from routes import rooms, reservations, guests, invoices
+from database import init_db, dispose_engines, open_session, engine, READ_DATABASE_URL, ReadYourWritesMiddleware
+from routes import rooms, reservations, guests, invoices, admin, events, reports, availability
+from services import availability_index, change_sync, guest_stats, room_catalog, room_nights
+from services.event_fanout import event_fanout, EVENT_FANOUT
+from services.fast_json import FastJSONResponse
+from services.http_cache import CompressionMiddleware
+from services.invoice_renderer import invoice_renderer
+from services.live_updates import live_updates
 
 
 @asynccontextmanager
@@ -11,9 +17,37 @@ async def lifespan(app: FastAPI):
     """Lifespan event handler for startup/shutdown"""
     # Startup
     init_db()
+    with engine.begin() as conn:
+        if guest_stats.needs_backfill(conn):
+            built = guest_stats.rebuild(conn)
+            print(f"👥 Guest statistics built for {built} guests")
+        if room_nights.needs_backfill(conn):
+            built = room_nights.rebuild(conn)
+            print(f"🛏️ Daily room nights built for {built} days x room types")
+    async with open_session() as db:
+        pruned = await change_sync.prune_tombstones(db)
+    if pruned:
+        print(f"🪦 Pruned {pruned} old tombstones")
+    # Before the index warm-up, so other workers' writes during it are replayed
+    if EVENT_FANOUT:
+        event_fanout.start()
+        print(f"📡 Change fan-out listening at {event_fanout.path}")
+    live_updates.start()
+    async with open_session() as db:
+        loaded = await room_catalog.rebuild(db)
+    print(f"🏨 Room catalog loaded with {loaded} rooms")
+    if availability_index.AVAILABILITY_INDEX:
+        async with open_session() as db:
+            stays = await availability_index.rebuild(db)
+        print(f"📅 Availability index warmed with {stays} stays")
+    invoice_renderer.start()
     print("🦞 LobbyLobster API started successfully!")
     yield
-    # Shutdown (if needed in the future)
+    # Shutdown
+    live_updates.shutdown()
+    event_fanout.shutdown()
+    invoice_renderer.shutdown()
+    await dispose_engines()
     print("👋 LobbyLobster API shutting down...")
 
 
@@ -21,7 +55,9 @@ app = FastAPI(
     title="LobbyLobster API",
     description="Modern hotel management system backend",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson instead of the stdlib for every JSON response
+    default_response_class=FastJSONResponse,
 )
 
 # CORS middleware for frontend communication
@@ -31,8 +67,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Prev-Cursor"],
 )
 
+# gzip / brotli for large JSON bodies
+app.add_middleware(CompressionMiddleware)
+
+# Send a client's reads to the primary for a moment after it writes
+if READ_DATABASE_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -44,7 +88,8 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "rooms": "/api/rooms",
-            "reservations": "/api/reservations"
+            "reservations": "/api/reservations",
+            "events": "/api/events"
         }
     }
 
@@ -63,6 +108,10 @@ app.include_router(rooms.router, prefix="/api/rooms", tags=["rooms"])
 app.include_router(reservations.router, prefix="/api/reservations", tags=["reservations"])
 app.include_router(guests.router, prefix="/api/guests", tags=["guests"])
 app.include_router(invoices.router, prefix="/api/invoices", tags=["invoices"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(availability.router, prefix="/api/availability", tags=["availability"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 if __name__ == "__main__":
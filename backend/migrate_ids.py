@@ -0,0 +1,89 @@
+"""
+Copy a database with string IDs into a new database with compact binary IDs.
+
+    python migrate_ids.py sqlite:///./lobbylobster_compact.db
+
+Reads rooms and reservations from DATABASE_URL and writes them to the target
+URL using the ID_STORAGE=binary schema. Existing UUIDs keep their value, so
+every public ID (bookmarks, invoice links, integrations) stays valid; only
+the storage changes. The source database is not modified. Afterwards point
+DATABASE_URL at the target and set ID_STORAGE=binary.
+"""
+import os
+import sys
+import uuid
+
+# The target schema is built from the models, so pick binary IDs before
+# anything imports them
+os.environ["ID_STORAGE"] = "binary"
+
+from sqlalchemy import MetaData, create_engine, insert, select
+
+from database import DATABASE_URL, Base
+from models import Room, Reservation
+
+BATCH_SIZE = 5000
+
+
+def _engine(url: str):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {}
+    )
+
+
+def _copy_table(source_conn, target_conn, source_table, target_table) -> int:
+    """Copy all rows, validating ID columns on the way"""
+    id_columns = [c for c in ("id", "room_id") if c in source_table.c]
+    target_columns = set(target_table.c.keys())
+    copied = 0
+    result = source_conn.execution_options(stream_results=True).execute(select(source_table))
+    for rows in result.mappings().partitions(BATCH_SIZE):
+        batch = []
+        for row in rows:
+            values = {k: v for k, v in row.items() if k in target_columns}
+            for column in id_columns:
+                # Raises on anything that is not a UUID instead of silently
+                # writing a row that can never be found again
+                values[column] = str(uuid.UUID(values[column]))
+            batch.append(values)
+        target_conn.execute(insert(target_table), batch)
+        copied += len(batch)
+    return copied
+
+
+def migrate(target_url: str):
+    print(f"🔁 Migrating {DATABASE_URL} -> {target_url} (binary IDs)")
+    source_engine = _engine(DATABASE_URL)
+    target_engine = _engine(target_url)
+
+    source_meta = MetaData()
+    source_meta.reflect(bind=source_engine, only=["rooms", "reservations"])
+
+    with target_engine.begin() as target_conn:
+        existing = target_conn.execute(select(Room.__table__.c.id).limit(1)).first() \
+            if target_engine.dialect.has_table(target_conn, "rooms") else None
+        if existing:
+            print("❌ Target database already contains rooms, refusing to overwrite")
+            return
+        Base.metadata.create_all(bind=target_conn)
+
+        with source_engine.connect() as source_conn:
+            # Rooms first (foreign key constraint)
+            rooms = _copy_table(source_conn, target_conn,
+                                source_meta.tables["rooms"], Room.__table__)
+            print(f"   ✅ Copied {rooms} rooms")
+            reservations = _copy_table(source_conn, target_conn,
+                                       source_meta.tables["reservations"], Reservation.__table__)
+            print(f"   ✅ Copied {reservations} reservations")
+
+    print("\n✅ Migration complete. Now set:")
+    print(f"   DATABASE_URL={target_url}")
+    print("   ID_STORAGE=binary")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    migrate(sys.argv[1])
@@ -1,5 +1,18 @@
 # Models package
 from .room import Room, RoomType
 from .reservation import Reservation, ReservationStatus, PaymentMethod
+from .change_log import SyncVersion, Tombstone
+from .guest_stats import GuestStats
+from .daily_room_nights import DailyRoomNights
 
-__all__ = ["Room", "RoomType", "Reservation", "ReservationStatus", "PaymentMethod"]
+__all__ = [
+    "Room",
+    "RoomType",
+    "Reservation",
+    "ReservationStatus",
+    "PaymentMethod",
+    "SyncVersion",
+    "Tombstone",
+    "GuestStats",
+    "DailyRoomNights",
+]
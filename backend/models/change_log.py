@@ -0,0 +1,76 @@
+from sqlalchemy import Column, String, Integer, DateTime, event, select, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from database import Base
+from .room import Room
+from .reservation import Reservation
+
+# Models carrying a change version, and the name tombstones use for them
+VERSIONED_MODELS = {
+    Room: "room",
+    Reservation: "reservation",
+}
+
+
+class SyncVersion(Base):
+    """Single-row counter handing out change versions.
+
+    Bumping it takes a row lock that is held until the writing transaction
+    commits, so versions become visible in the order they were assigned and
+    a reader that saw version N never later finds an uncommitted N-1.
+    """
+    __tablename__ = "sync_versions"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    # Highest version whose tombstones were pruned; deltas from before it
+    # cannot be served anymore
+    pruned_through = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class Tombstone(Base):
+    """Record of a deleted room or reservation for delta sync"""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    model = Column(String, nullable=False)
+    object_id = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Tombstone {self.model} {self.object_id} @{self.version}>"
+
+
+def next_version(session: Session) -> int:
+    """Increment and return the change version inside the current transaction"""
+    table = SyncVersion.__table__
+    result = session.execute(
+        update(table).where(table.c.id == 1).values(value=table.c.value + 1)
+    )
+    if result.rowcount == 0:
+        session.execute(table.insert().values(id=1, value=1))
+        return 1
+    return session.execute(select(table.c.value).where(table.c.id == 1)).scalar_one()
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_versions(session: Session, flush_context, instances):
+    """Give every written room/reservation the next version; tombstone deletes"""
+    written = [
+        obj for obj in session.new
+        if type(obj) in VERSIONED_MODELS
+    ] + [
+        obj for obj in session.dirty
+        if type(obj) in VERSIONED_MODELS and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj for obj in session.deleted if type(obj) in VERSIONED_MODELS]
+    if not written and not deleted:
+        return
+
+    version = next_version(session)
+    for obj in written:
+        obj.version = version
+    for obj in deleted:
+        session.add(Tombstone(model=VERSIONED_MODELS[type(obj)], object_id=obj.id, version=version))
@@ -0,0 +1,166 @@
+from sqlalchemy import Column, Integer, Float, Date, Enum as SQLEnum, event, select, update, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database import Base
+from .room import Room, RoomType
+from .reservation import Reservation, ReservationStatus
+
+# Reservation fields a stay's contribution is derived from
+ROLLUP_FIELDS = ("room_id", "check_in", "check_out", "status", "price_per_night", "total_price")
+# Counter columns, in the order deltas are kept
+COUNTERS = ("rooms_sold", "revenue", "arrivals", "departures")
+
+
+def nightly_rate(price_per_night: Optional[float], total_price: Optional[float], nights: int) -> float:
+    """Revenue per night of a stay: its price per night, else its total spread over the nights"""
+    if price_per_night is not None:
+        return price_per_night
+    if total_price is not None and nights > 0:
+        return total_price / nights
+    return 0.0
+
+
+class DailyRoomNights(Base):
+    """Rooms sold, revenue, arrivals and departures per day and room type.
+
+    Maintained from every reservation write by adding the difference between
+    a stay's old and new contribution; cancelled stays contribute nothing.
+    """
+    __tablename__ = "daily_room_nights"
+
+    day = Column(Date, primary_key=True)
+    room_type = Column(SQLEnum(RoomType), primary_key=True)
+    rooms_sold = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue = Column(Float, nullable=False, default=0, server_default="0")
+    arrivals = Column(Integer, nullable=False, default=0, server_default="0")
+    departures = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<DailyRoomNights {self.day} {self.room_type}: {self.rooms_sold} sold>"
+
+
+Deltas = Dict[Tuple[date, RoomType], List[float]]
+
+
+def add_stay(deltas: Deltas, room_type: RoomType, check_in: date, check_out: date,
+             status, price_per_night, total_price, sign: int = 1):
+    """Add (or with sign=-1 take away) one stay's contribution"""
+    if status == ReservationStatus.CANCELLED or room_type is None or check_out <= check_in:
+        return
+    nights = (check_out - check_in).days
+    rate = nightly_rate(price_per_night, total_price, nights)
+    for offset in range(nights):
+        counters = deltas[(check_in + timedelta(days=offset), room_type)]
+        counters[0] += sign
+        counters[1] += sign * rate
+    deltas[(check_in, room_type)][2] += sign
+    deltas[(check_out, room_type)][3] += sign
+
+
+def new_deltas() -> Deltas:
+    return defaultdict(lambda: [0, 0.0, 0, 0])
+
+
+def apply_deltas(conn, deltas: Deltas):
+    """Add the counters to their rows, creating missing ones"""
+    rows = [
+        {"day": day, "room_type": room_type, **dict(zip(COUNTERS, counters))}
+        for (day, room_type), counters in deltas.items()
+        if any(counters)
+    ]
+    if not rows:
+        return
+    table = DailyRoomNights.__table__
+    dialect_insert = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}.get(conn.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.room_type],
+            set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS},
+        )
+        conn.execute(statement, rows)
+        return
+    for row in rows:
+        result = conn.execute(
+            update(table)
+            .where(table.c.day == row["day"], table.c.room_type == row["room_type"])
+            .values({name: table.c[name] + row[name] for name in COUNTERS})
+        )
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(row))
+
+
+def rollup_rows(stays: Iterable) -> Deltas:
+    """Counters from ``(room_type, check_in, check_out, status, price, total)`` rows"""
+    deltas = new_deltas()
+    for room_type, check_in, check_out, status, price, total in stays:
+        add_stay(deltas, room_type, check_in, check_out, status, price, total)
+    return deltas
+
+
+def _old(attrs, name):
+    """Value of an attribute before the pending changes"""
+    history = attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else attrs[name].value
+
+
+@event.listens_for(Session, "before_flush")
+def _update_room_nights(session: Session, flush_context, instances):
+    """Move the pending reservation (and room type) changes into the rollup"""
+    new = [obj for obj in session.new if isinstance(obj, Reservation)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Reservation)]
+    dirty = [
+        obj for obj in session.dirty
+        if isinstance(obj, Reservation)
+        and any(inspect(obj).attrs[name].history.has_changes() for name in ROLLUP_FIELDS)
+    ]
+    retyped = {
+        obj.id: obj for obj in session.dirty
+        if isinstance(obj, Room) and inspect(obj).attrs.room_type.history.has_changes()
+    }
+    if not new and not deleted and not dirty and not retyped:
+        return
+
+    # Room types as stored (before this flush) and as they will be after it
+    room_ids = {obj.room_id for obj in new + dirty}
+    room_ids |= {_old(inspect(obj).attrs, "room_id") for obj in deleted + dirty}
+    room_ids |= set(retyped)
+    stored = dict(session.execute(
+        select(Room.id, Room.room_type).where(Room.id.in_(room_ids - {None}))
+    ).all())
+    pending = {obj.id: obj.room_type for obj in session.new if isinstance(obj, Room)}
+    pending.update({room_id: room.room_type for room_id, room in retyped.items()})
+    deleted_rooms = {obj.id for obj in session.deleted if isinstance(obj, Room)}
+
+    def type_after(room_id):
+        return None if room_id in deleted_rooms else pending.get(room_id, stored.get(room_id))
+
+    deltas = new_deltas()
+    for obj in deleted + dirty:
+        attrs = inspect(obj).attrs
+        add_stay(deltas, stored.get(_old(attrs, "room_id")),
+                 *(_old(attrs, name) for name in ROLLUP_FIELDS[1:]), sign=-1)
+    for obj in new + dirty:
+        add_stay(deltas, type_after(obj.room_id), obj.check_in, obj.check_out,
+                 obj.status or ReservationStatus.CONFIRMED, obj.price_per_night, obj.total_price)
+
+    # Unchanged stays of a room whose type changes move to the new type
+    if retyped:
+        touched = {obj.id for obj in new + dirty + deleted}
+        stays = session.execute(
+            select(Reservation.id, Reservation.room_id, *(getattr(Reservation, name) for name in ROLLUP_FIELDS[1:]))
+            .where(Reservation.room_id.in_(retyped))
+        ).all()
+        for reservation_id, room_id, *values in stays:
+            if reservation_id in touched:
+                continue
+            add_stay(deltas, stored.get(room_id), *values, sign=-1)
+            add_stay(deltas, type_after(room_id), *values)
+
+    apply_deltas(session.connection(), deltas)
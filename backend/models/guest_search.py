@@ -0,0 +1,147 @@
+"""
+Search index over guest_stats for autocomplete.
+
+SQLite: an FTS5 table with the trigram tokenizer (``guest_search``), one row
+per guest, holding accent-folded name, email, phone (plus its digits) and
+company. Its rowid is derived from the guest key, so a guest's row is
+replaced with an indexed lookup whenever models.guest_stats refreshes the
+guest. PostgreSQL: a pg_trgm GIN index on the same text computed from
+guest_stats itself, so there is nothing to maintain. Elsewhere (or without
+FTS5/pg_trgm) searches fall back to LIKE over guest_stats.
+"""
+import hashlib
+import re
+import sqlite3
+import unicodedata
+from typing import Dict, Iterable, List
+
+from sqlalchemy import text
+
+SEARCH_TABLE = "guest_search"
+BATCH_SIZE = 5000
+
+
+def _sqlite_has_trigram() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute(
+            "CREATE VIRTUAL TABLE probe USING fts5(value, tokenize='trigram')"
+        )
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+SQLITE_TRIGRAM = _sqlite_has_trigram()
+# Set by create_search_index once the extension is known to be installed
+_pg_trgm_ready = False
+
+# pg_trgm needs the text as one expression for its index
+PG_SEARCH_TEXT = (
+    "lower(coalesce(guest_name, '') || ' ' || coalesce(guest_email, '') || ' ' || "
+    "coalesce(guest_phone, '') || ' ' || coalesce(guest_company, ''))"
+)
+
+
+def fold(value) -> str:
+    """Lowercase and strip accents, so 'Díaz' is found by 'diaz'"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def phone_text(phone) -> str:
+    # Digits alone as well, so '0301234' finds '+49 30 1234567'
+    digits = re.sub(r"\D", "", phone or "")
+    return f"{phone} {digits}" if phone else ""
+
+
+def search_rowid(key: str) -> int:
+    """Stable signed 64-bit rowid for a guest key"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def search_backend(conn) -> str:
+    """"fts5", "pg_trgm" or "like" for this connection's database"""
+    if conn.dialect.name == "sqlite" and SQLITE_TRIGRAM:
+        return "fts5"
+    if conn.dialect.name == "postgresql" and _pg_trgm_ready:
+        return "pg_trgm"
+    return "like"
+
+
+def create_search_index(conn) -> bool:
+    """Create the index if missing; True when it was created and needs filling"""
+    global _pg_trgm_ready
+    if conn.dialect.name == "sqlite" and SQLITE_TRIGRAM:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": SEARCH_TABLE},
+        ).first()
+        if exists:
+            return False
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "guest_key UNINDEXED, guest_name, guest_email, guest_phone, guest_company, "
+            "tokenize='trigram')"
+        ))
+        return True
+    if conn.dialect.name == "postgresql":
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_guest_stats_search "
+                    f"ON guest_stats USING gin (({PG_SEARCH_TEXT}) gin_trgm_ops)"
+                ))
+            _pg_trgm_ready = True
+        except Exception as e:
+            print(f"⚠️  pg_trgm unavailable, guest search falls back to LIKE: {e}")
+    return False
+
+
+def _search_row(row: Dict) -> Dict:
+    return {
+        "rowid": search_rowid(row["guest_key"]),
+        "guest_key": row["guest_key"],
+        "guest_name": fold(row["guest_name"]),
+        "guest_email": fold(row["guest_email"]),
+        "guest_phone": phone_text(row["guest_phone"]),
+        "guest_company": fold(row["guest_company"]),
+    }
+
+
+_INSERT = text(
+    f"INSERT INTO {SEARCH_TABLE} (rowid, guest_key, guest_name, guest_email, guest_phone, guest_company) "
+    "VALUES (:rowid, :guest_key, :guest_name, :guest_email, :guest_phone, :guest_company)"
+)
+
+
+def update_search_rows(conn, rows: List[Dict], gone: Iterable[str]):
+    """Mirror refreshed guest_stats rows (and removed guests) into the index"""
+    if search_backend(conn) != "fts5":
+        return
+    rowids = [search_rowid(key) for key in gone] + [search_rowid(row["guest_key"]) for row in rows]
+    if rowids:
+        conn.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({','.join(str(r) for r in rowids)})")
+        )
+    if rows:
+        conn.execute(_INSERT, [_search_row(row) for row in rows])
+
+
+def fill_search_index(conn) -> int:
+    """Rebuild the index from guest_stats; returns the number of guests"""
+    if search_backend(conn) != "fts5":
+        return 0
+    conn.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    result = conn.execute(text(
+        "SELECT guest_key, guest_name, guest_email, guest_phone, guest_company FROM guest_stats"
+    )).mappings()
+    filled = 0
+    while True:
+        rows = result.fetchmany(BATCH_SIZE)
+        if not rows:
+            return filled
+        conn.execute(_INSERT, [_search_row(row) for row in rows])
+        filled += len(rows)
@@ -0,0 +1,152 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, Index, event, select, delete, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from database import Base
+from .reservation import Reservation
+from .guest_search import update_search_rows
+
+# Reservation fields the aggregate is derived from
+AGGREGATED_FIELDS = (
+    "guest_name", "guest_email", "guest_phone", "guest_company", "check_in", "check_out",
+)
+# Guests refreshed per query
+REFRESH_CHUNK = 500
+
+
+def guest_key(name: str) -> str:
+    """Identity reservations are grouped under (case- and whitespace-insensitive name)"""
+    return (name or "").strip().lower()
+
+
+class GuestStats(Base):
+    """Per-guest totals over all reservations, maintained on every write"""
+    __tablename__ = "guest_stats"
+
+    guest_key = Column(String, primary_key=True)
+    # Name and contact details as on the most recent stay
+    guest_name = Column(String, nullable=False)
+    guest_email = Column(String, nullable=True)
+    guest_phone = Column(String, nullable=True)
+    guest_company = Column(String, nullable=True)
+
+    total_stays = Column(Integer, nullable=False, default=0)
+    total_nights = Column(Integer, nullable=False, default=0)
+    first_visit = Column(Date, nullable=True)
+    last_visit = Column(Date, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # One per listing sort, ending in the key so cursors are unique
+    __table_args__ = (
+        Index("ix_guest_stats_stays_key", "total_stays", "total_nights", "guest_key"),
+        Index("ix_guest_stats_nights_key", "total_nights", "guest_key"),
+        Index("ix_guest_stats_first_visit_key", "first_visit", "guest_key"),
+        Index("ix_guest_stats_last_visit_key", "last_visit", "guest_key"),
+    )
+
+    def __repr__(self):
+        return f"<GuestStats {self.guest_name}: {self.total_stays} stays>"
+
+
+def _source_query(keys):
+    return (
+        select(
+            Reservation.guest_key, Reservation.guest_name, Reservation.guest_email,
+            Reservation.guest_phone, Reservation.guest_company,
+            Reservation.check_in, Reservation.check_out,
+        )
+        .where(Reservation.guest_key.in_(keys))
+        .order_by(Reservation.guest_key, Reservation.check_in, Reservation.created_at)
+    )
+
+
+def aggregate_rows(rows: Iterable) -> Iterable[Dict]:
+    """Guest stats rows from reservation rows sorted by (guest_key, check_in)"""
+    current = None
+    for key, name, email, phone, company, check_in, check_out in rows:
+        if current is None or current["guest_key"] != key:
+            if current is not None:
+                yield current
+            current = {
+                "guest_key": key,
+                "total_stays": 0,
+                "total_nights": 0,
+                "first_visit": check_in,
+                "updated_at": datetime.utcnow(),
+            }
+        current["total_stays"] += 1
+        current["total_nights"] += (check_out - check_in).days
+        # Rows are in check-in order, so the last one is the latest stay
+        current.update(
+            last_visit=check_in,
+            guest_name=name,
+            guest_email=email,
+            guest_phone=phone,
+            guest_company=company,
+        )
+    if current is not None:
+        yield current
+
+
+def upsert_guest_stats(conn, rows: List[Dict]):
+    if not rows:
+        return
+    table = GuestStats.__table__
+    dialect_insert = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}.get(conn.dialect.name)
+    if dialect_insert is None:
+        conn.execute(delete(table).where(table.c.guest_key.in_([row["guest_key"] for row in rows])))
+        conn.execute(table.insert(), rows)
+        return
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.guest_key],
+        set_={name: statement.excluded[name] for name in rows[0] if name != "guest_key"},
+    )
+    conn.execute(statement, rows)
+
+
+def refresh_guests(conn, keys: Set[str]):
+    """Recompute the stats of the given guests from their reservations"""
+    keys = sorted(keys)
+    table = GuestStats.__table__
+    for start in range(0, len(keys), REFRESH_CHUNK):
+        chunk = keys[start:start + REFRESH_CHUNK]
+        rows = list(aggregate_rows(conn.execute(_source_query(chunk))))
+        gone = set(chunk) - {row["guest_key"] for row in rows}
+        if gone:
+            conn.execute(delete(table).where(table.c.guest_key.in_(gone)))
+        upsert_guest_stats(conn, rows)
+        update_search_rows(conn, rows, gone)
+
+
+@event.listens_for(Session, "before_flush")
+def _set_guest_keys(session: Session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Reservation):
+            key = guest_key(obj.guest_name)
+            if obj.guest_key != key:
+                obj.guest_key = key
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_guest_stats(session: Session, flush_context):
+    keys: Set[str] = set()
+    for obj in session.new:
+        if isinstance(obj, Reservation):
+            keys.add(obj.guest_key)
+    for obj in session.deleted:
+        if isinstance(obj, Reservation):
+            keys.add(obj.guest_key or guest_key(obj.guest_name))
+    for obj in session.dirty:
+        if not isinstance(obj, Reservation):
+            continue
+        attrs = inspect(obj).attrs
+        if not any(attrs[name].history.has_changes() for name in AGGREGATED_FIELDS):
+            continue
+        keys.add(obj.guest_key)
+        # A renamed guest also leaves the old aggregate
+        keys.update(k for k in attrs.guest_key.history.deleted if k is not None)
+    if keys:
+        refresh_guests(session.connection(), keys)
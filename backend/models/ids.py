@@ -0,0 +1,94 @@
+"""
+Primary key storage for rooms and reservations.
+
+The API always exposes IDs as canonical UUID strings. How they are stored is
+a per-deployment schema choice (ID_STORAGE):
+
+  "string" - 36-character VARCHAR holding a random uuid4 (original schema)
+  "binary" - 16-byte time-ordered UUIDv7: BLOB on SQLite, native UUID on
+             PostgreSQL. Less than half the index size, and new rows land at
+             the right-hand edge of the primary key B-tree instead of at
+             random pages.
+
+Both modes hand plain strings to the application, so routes and schemas do
+not care which one is active. Existing databases are converted with
+``python migrate_ids.py``.
+"""
+import os
+import secrets
+import time
+import uuid
+
+from sqlalchemy import String, LargeBinary, inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+ID_STORAGE = os.getenv("ID_STORAGE", "string").lower()
+if ID_STORAGE not in ("string", "binary"):
+    raise ValueError(f"ID_STORAGE must be 'string' or 'binary', got {ID_STORAGE!r}")
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7): 48-bit ms timestamp + random"""
+    value = (time.time_ns() // 1_000_000) << 80
+    value |= 0x7 << 76
+    value |= secrets.randbits(12) << 64
+    value |= 0b10 << 62
+    value |= secrets.randbits(62)
+    return uuid.UUID(int=value)
+
+
+class CompactUUID(TypeDecorator):
+    """UUID string in Python, 16 bytes in the database"""
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            parsed = value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+        except (TypeError, ValueError, AttributeError):
+            # Not a UUID, so it cannot match any row; bind something that
+            # never will instead of failing the whole statement
+            return None
+        return parsed if dialect.name == "postgresql" else parsed.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
+def id_type():
+    """Column type for primary keys and the foreign keys pointing at them"""
+    return CompactUUID() if ID_STORAGE == "binary" else String
+
+
+def new_id() -> str:
+    """Default for new primary keys"""
+    if ID_STORAGE == "binary":
+        return str(uuid7())
+    return str(uuid.uuid4())
+
+
+def check_id_storage(engine):
+    """Refuse to start against a database created with the other ID storage"""
+    inspector = inspect(engine)
+    if not inspector.has_table("rooms"):
+        return
+    column = next(c for c in inspector.get_columns("rooms") if c["name"] == "id")
+    is_string = isinstance(column["type"], String)
+    if is_string != (ID_STORAGE == "string"):
+        raise RuntimeError(
+            f"Database stores {'string' if is_string else 'binary'} IDs but ID_STORAGE={ID_STORAGE}. "
+            "Set ID_STORAGE to match or convert the database with migrate_ids.py."
+        )
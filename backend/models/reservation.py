@@ -1,10 +1,10 @@
-from sqlalchemy import Column, String, DateTime, Date, ForeignKey, Enum as SQLEnum, Float, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Enum as SQLEnum, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
-import uuid
 
 from database import Base
+from .ids import id_type, new_id
 
 
 class ReservationStatus(str, enum.Enum):
@@ -27,11 +27,13 @@ class Reservation(Base):
     """Reservation model representing a room booking"""
     __tablename__ = "reservations"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    room_id = Column(String, ForeignKey("rooms.id"), nullable=False)
+    id = Column(id_type(), primary_key=True, default=new_id)
+    room_id = Column(id_type(), ForeignKey("rooms.id"), nullable=False)
     
     # Guest information
     guest_name = Column(String, nullable=False, index=True)
+    # Normalized name the guest statistics are grouped by (see models.guest_stats)
+    guest_key = Column(String, nullable=True, index=True)
     guest_email = Column(String, nullable=True)
     guest_phone = Column(String, nullable=True)
     guest_address = Column(String, nullable=True)
@@ -62,9 +64,17 @@ class Reservation(Base):
     notes = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Change version for delta sync (see models.change_log)
+    version = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
     # Relationship to room
     room = relationship("Room", back_populates="reservations")
 
+    # Keyset pagination orders (see services.pagination)
+    __table_args__ = (
+        Index("ix_reservations_check_in_id", "check_in", "id"),
+        Index("ix_reservations_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<Reservation {self.guest_name} in Room {self.room_id} ({self.check_in} - {self.check_out})>"
@@ -1,10 +1,10 @@
-from sqlalchemy import Column, String, Integer, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
-import uuid
 
 from database import Base
+from .ids import id_type, new_id
 
 
 class RoomType(str, enum.Enum):
@@ -19,7 +19,7 @@ class Room(Base):
     """Room model representing a hotel room"""
     __tablename__ = "rooms"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(id_type(), primary_key=True, default=new_id)
     number = Column(String, unique=True, nullable=False, index=True)
     name = Column(String, nullable=False)
     room_type = Column(SQLEnum(RoomType), nullable=False)
@@ -28,9 +28,16 @@ class Room(Base):
     description = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Change version for delta sync (see models.change_log)
+    version = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
     # Relationship to reservations
     reservations = relationship("Reservation", back_populates="room", cascade="all, delete-orphan")
 
+    # Keyset pagination order (see services.pagination)
+    __table_args__ = (
+        Index("ix_rooms_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<Room {self.number}: {self.name} ({self.room_type})>"
@@ -0,0 +1,26 @@
+"""
+Rebuild derived statistics tables from the reservations.
+
+    python rebuild_stats.py
+
+Needed after writes that bypassed the ORM (bulk deletes, manual SQL); normal
+API and script writes keep the tables current on their own.
+"""
+from database import engine, init_db
+from services import guest_stats, room_nights
+
+
+def rebuild_all():
+    init_db()
+    print("🔁 Rebuilding guest statistics...")
+    with engine.begin() as conn:
+        guests = guest_stats.rebuild(conn)
+    print(f"   ✅ {guests} guests")
+    print("🔁 Rebuilding daily room nights...")
+    with engine.begin() as conn:
+        days = room_nights.rebuild(conn)
+    print(f"   ✅ {days} days x room types")
+
+
+if __name__ == "__main__":
+    rebuild_all()
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from database import get_db, pool_status
+from services import availability_index as availability
+from services.event_fanout import event_fanout
+from services.live_updates import live_updates
+
+router = APIRouter()
+
+
+@router.get("/availability-index")
+async def verify_availability_index(db: AsyncSession = Depends(get_db)):
+    """Compare the in-memory availability index with the database"""
+    if not availability.AVAILABILITY_INDEX:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Availability index is disabled (AVAILABILITY_INDEX=0)"
+        )
+    return await availability.verify(db)
+
+
+@router.post("/availability-index/rebuild")
+async def rebuild_availability_index(db: AsyncSession = Depends(get_db)):
+    """Reload the in-memory availability index from the database"""
+    if not availability.AVAILABILITY_INDEX:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Availability index is disabled (AVAILABILITY_INDEX=0)"
+        )
+    stays = await availability.rebuild(db)
+    return {"stays": stays}
+
+
+@router.get("/live-updates")
+async def live_update_stats():
+    """Connected event streams and cross-worker fan-out counters"""
+    return {
+        "clients": live_updates.client_count,
+        "dropped_clients": live_updates.dropped_clients,
+        "fanout": event_fanout.stats(),
+    }
+
+
+@router.get("/database")
+async def database_status():
+    """Engine profile, connection pool counters and (SQLite) effective pragmas"""
+    return await run_in_threadpool(pool_status)
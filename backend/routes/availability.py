@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import List, Optional
+
+from database import get_read_db
+from models import Room, RoomType
+from schemas import RoomResponse, AssignmentRequest, AssignmentPlan
+from services.availability_index import AVAILABILITY_INDEX, availability_index, free_rooms_query
+from services.fast_json import ListEncoder
+from services.room_assignment import MAX_REPACK_DAYS, propose_assignment, repack_window
+
+router = APIRouter()
+
+ROOMS_JSON = ListEncoder(RoomResponse)
+
+
+@router.get("/search", response_model=List[RoomResponse])
+async def search_free_rooms(
+    check_in: date,
+    check_out: date,
+    min_capacity: int = Query(1, ge=1),
+    room_type: Optional[RoomType] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Rooms with at least ``min_capacity`` beds (and of ``room_type``) that are
+    free for the whole stay, by room number"""
+    if check_out <= check_in:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Check-out date must be after check-in date"
+        )
+    if AVAILABILITY_INDEX and availability_index.ready:
+        await availability_index.ensure_current()
+        room_ids = availability_index.free_rooms(check_in, check_out, min_capacity, room_type)
+        if not room_ids:
+            return ROOMS_JSON.response([])
+        query = select(Room).where(Room.id.in_(room_ids))
+    else:
+        query = free_rooms_query(check_in, check_out, min_capacity, room_type)
+    result = await db.execute(query.order_by(Room.number))
+    return ROOMS_JSON.response(result.scalars().all())
+
+
+@router.post("/assign", response_model=AssignmentPlan)
+async def assign_rooms(request: AssignmentRequest, db: AsyncSession = Depends(get_read_db)):
+    """Propose rooms for the requested stays and, with ``repack``, moves of
+    confirmed future reservations that close unsellable gaps (nothing is saved)"""
+    repack_from, repack_until = repack_window(request)
+    if repack_until <= repack_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="repack_until must be after repack_from"
+        )
+    if (repack_until - repack_from).days > MAX_REPACK_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Repack at most {MAX_REPACK_DAYS} days at a time"
+        )
+    return await propose_assignment(db, request)
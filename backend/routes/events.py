@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from services import change_sync
+from services.live_updates import live_updates, TooManyClients
+
+router = APIRouter()
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+# Client reconnect delay advertised to EventSource (ms)
+RETRY_MS = 3000
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get("")
+async def stream_events(db: AsyncSession = Depends(get_db)):
+    """Server-sent events for room and reservation changes.
+
+    The first ``hello`` event carries the current change version; apply
+    ``changes`` events on top of it, and after a reconnect (or a ``resync``
+    event) fetch ``/api/reservations/calendar/changes?since=<version>``.
+    """
+    try:
+        client = live_updates.connect()
+    except TooManyClients:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live update streams, try again later",
+            headers={"Retry-After": str(RETRY_MS // 1000)},
+        )
+    # Connected before reading the version, so nothing committed in between is missed
+    try:
+        version, _ = await change_sync.sync_state(db)
+    except Exception:
+        live_updates.disconnect(client)
+        raise
+
+    async def stream():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            yield sse_event("hello", {"version": version})
+            while True:
+                try:
+                    batch = await asyncio.wait_for(client.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if batch is None:
+                    if client.dropped:
+                        # Fell behind; events were lost, so tell the client
+                        yield sse_event("resync", {"reason": "slow consumer"})
+                    return
+                yield sse_event("changes", {"changes": batch})
+        finally:
+            live_updates.disconnect(client)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
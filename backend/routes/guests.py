@@ -1,89 +1,92 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
-from typing import List
-from datetime import date
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 
-from database import get_db
-from models import Reservation, Room
+from database import get_read_db
+from models import Reservation, Room, GuestStats
+from services.pagination import Keyset, fetch_page, sort_options
 
 router = APIRouter()
 
+# Page size when only a cursor is given
+GUEST_PAGE_SIZE = 100
+
+# Sort keys; guest_key breaks ties so pages never overlap
+GUEST_SORTS = {
+    keyset.name: keyset for keyset in (
+        Keyset("stays", (GuestStats.total_stays, GuestStats.total_nights, GuestStats.guest_key)),
+        Keyset("nights", (GuestStats.total_nights, GuestStats.guest_key)),
+        Keyset("last_visit", (GuestStats.last_visit, GuestStats.guest_key)),
+        Keyset("first_visit", (GuestStats.first_visit, GuestStats.guest_key)),
+        Keyset("name", (GuestStats.guest_key,)),
+    )
+}
+
 
 @router.get("/")
 async def get_guests(
-    db: Session = Depends(get_db)
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    sort: str = Query("stays", pattern=sort_options(GUEST_SORTS.values())),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    include_reservations: bool = True,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all unique guests with their reservation history"""
-    
-    # Get all reservations with room details, ordered by most recent
-    reservations = (
-        db.query(Reservation)
-        .join(Room)
-        .order_by(Reservation.check_in.desc())
-        .all()
-    )
-    
-    # Group by guest name (could use email as better identifier in future)
-    guests_dict = {}
-    
-    for res in reservations:
-        guest_key = res.guest_name.lower().strip()
-        
-        if guest_key not in guests_dict:
-            guests_dict[guest_key] = {
-                "guest_name": res.guest_name,
-                "guest_email": res.guest_email,
-                "guest_phone": res.guest_phone,
-                "guest_company": res.guest_company,
-                "total_stays": 0,
-                "total_nights": 0,
-                "last_visit": None,
-                "first_visit": None,
-                "reservations": []
-            }
-        
-        guest = guests_dict[guest_key]
-        guest["total_stays"] += 1
-        
-        # Calculate nights
-        nights = (res.check_out - res.check_in).days
-        guest["total_nights"] += nights
-        
-        # Track first and last visits
-        if guest["last_visit"] is None or res.check_in > guest["last_visit"]:
-            guest["last_visit"] = res.check_in
-            # Update contact info with most recent
-            guest["guest_email"] = res.guest_email
-            guest["guest_phone"] = res.guest_phone
-            guest["guest_company"] = res.guest_company
-        
-        if guest["first_visit"] is None or res.check_in < guest["first_visit"]:
-            guest["first_visit"] = res.check_in
-        
-        # Add reservation details
-        guest["reservations"].append({
-            "id": res.id,
-            "room_number": res.room.number,
-            "room_name": res.room.name,
-            "check_in": res.check_in.isoformat(),
-            "check_out": res.check_out.isoformat(),
-            "status": res.status,
-            "nights": nights
-        })
-    
-    # Convert to list and sort by total stays (most frequent guests first)
-    guests_list = sorted(
-        guests_dict.values(),
-        key=lambda x: (x["total_stays"], x["total_nights"]),
-        reverse=True
-    )
-    
-    # Format dates for JSON
-    for guest in guests_list:
-        if guest["last_visit"]:
-            guest["last_visit"] = guest["last_visit"].isoformat()
-        if guest["first_visit"]:
-            guest["first_visit"] = guest["first_visit"].isoformat()
-    
-    return guests_list
+    """Get unique guests with their reservation history, one page at a time.
+
+    Totals come from the guest statistics table; the full count is in the
+    X-Total-Count header, cursors for the adjacent pages in X-Next-Cursor and
+    X-Prev-Cursor. Without ``limit`` and ``cursor`` every guest is returned,
+    as before pagination existed (the guest list of the frontend relies on it).
+    """
+    keyset = GUEST_SORTS[sort]
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        page = await fetch_page(
+            db, select(GuestStats), keyset, limit or GUEST_PAGE_SIZE,
+            cursor=cursor, descending=order == "desc", offset=skip
+        )
+        page.set_headers(response)
+        stats = page.items
+    else:
+        ordering = [column.desc() if order == "desc" else column.asc() for column in keyset.columns]
+        stats = (await db.execute(select(GuestStats).order_by(*ordering).offset(skip))).scalars().all()
+    response.headers["X-Total-Count"] = str(await db.scalar(select(func.count()).select_from(GuestStats)))
+
+    history: Dict[str, List[dict]] = {}
+    if include_reservations and stats:
+        query = select(
+            Reservation.guest_key, Reservation.id, Room.number, Room.name,
+            Reservation.check_in, Reservation.check_out, Reservation.status,
+        ).join(Room)
+        if paginated:
+            query = query.where(Reservation.guest_key.in_([guest.guest_key for guest in stats]))
+        rows = await db.execute(query.order_by(Reservation.check_in.desc()))
+        for key, res_id, room_number, room_name, check_in, check_out, res_status in rows:
+            history.setdefault(key, []).append({
+                "id": res_id,
+                "room_number": room_number,
+                "room_name": room_name,
+                "check_in": check_in.isoformat(),
+                "check_out": check_out.isoformat(),
+                "status": res_status,
+                "nights": (check_out - check_in).days
+            })
+
+    return [
+        {
+            "guest_name": guest.guest_name,
+            "guest_email": guest.guest_email,
+            "guest_phone": guest.guest_phone,
+            "guest_company": guest.guest_company,
+            "total_stays": guest.total_stays,
+            "total_nights": guest.total_nights,
+            "last_visit": guest.last_visit.isoformat() if guest.last_visit else None,
+            "first_visit": guest.first_visit.isoformat() if guest.first_visit else None,
+            "reservations": history.get(guest.guest_key, []),
+        }
+        for guest in stats
+    ]
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+
+from database import get_read_db
+from schemas import OccupancyReport
+from services.reports import GRANULARITIES, MAX_REPORT_DAYS, occupancy_report
+
+router = APIRouter()
+
+
+@router.get("/", response_model=OccupancyReport)
+async def get_report(
+    start_date: date,
+    end_date: date,
+    granularity: str = Query("month", pattern="^(" + "|".join(GRANULARITIES) + ")$"),
+    by_room_type: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Occupancy %, ADR and RevPAR per day, week or month (both dates inclusive)"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Reports span at most {MAX_REPORT_DAYS} days")
+    return await occupancy_report(db, start_date, end_date, granularity, by_room_type)
@@ -1,91 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime
 
-from database import get_db
-from models import Reservation, Room
-from schemas import ReservationCreate, ReservationUpdate, ReservationResponse, ReservationWithRoom
+from database import get_db, get_read_db, use_replica
+from models import Reservation, Room, Tombstone
+from schemas import (
+    ReservationCreate,
+    ReservationUpdate,
+    ReservationResponse,
+    ReservationWithRoom,
+    ReservationBatch,
+    ReservationBatchResponse,
+    CalendarGrid,
+    CalendarChanges,
+)
+from services import guest_search
+from services.availability_index import AVAILABILITY_INDEX, availability_index
+from services.calendar_grid import grid_query, build_grid
+from services.change_sync import SYNC_MAX_CHANGES, sync_state
+from services.fast_json import ListEncoder
+from services.http_cache import change_version, make_etag, not_modified, row_version, tag
+from services.model_events import column_values
+from services.pagination import Keyset, fetch_page, sort_options
+from services.reservation_batch import BatchRejected, apply_batch
+from services.reservation_export import MEDIA_TYPES, export_query, stream_export
+from services.reservation_import import IMPORT_MAX_ROWS, ImportFormatError, import_file
+from services.room_catalog import room_catalog
 
 router = APIRouter()
 
+RESERVATION_SORTS = {
+    keyset.name: keyset for keyset in (
+        Keyset("check_in", (Reservation.check_in, Reservation.id)),
+        Keyset("created_at", (Reservation.created_at, Reservation.id)),
+        Keyset("id", (Reservation.id,)),
+    )
+}
+
+RESERVATIONS_JSON = ListEncoder(ReservationResponse)
+CALENDAR_JSON = ListEncoder(ReservationWithRoom, computed={
+    "room_number": lambda reservation: reservation.room.number,
+    "room_name": lambda reservation: reservation.room.name,
+})
+
 
 @router.get("/search-guests")
 async def search_guests(
     query: str,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Search for guests by name for autocomplete"""
-    if not query or len(query) < 2:
-        return []
-    
-    # Search for unique guests matching the query
-    results = (
-        db.query(
-            Reservation.guest_name,
-            Reservation.guest_email,
-            Reservation.guest_phone,
-            Reservation.guest_address,
-            Reservation.guest_city,
-            Reservation.guest_postal_code,
-            Reservation.guest_country,
-            Reservation.guest_company,
-            Reservation.company_address,
-            Reservation.company_city,
-            Reservation.company_postal_code,
-            Reservation.company_country,
-            func.max(Reservation.created_at).label('last_visit')
-        )
-        .filter(Reservation.guest_name.ilike(f"%{query}%"))
-        .group_by(
-            Reservation.guest_name,
-            Reservation.guest_email,
-            Reservation.guest_phone,
-            Reservation.guest_address,
-            Reservation.guest_city,
-            Reservation.guest_postal_code,
-            Reservation.guest_country,
-            Reservation.guest_company,
-            Reservation.company_address,
-            Reservation.company_city,
-            Reservation.company_postal_code,
-            Reservation.company_country
-        )
-        .order_by(func.max(Reservation.created_at).desc())
-        .limit(limit)
-        .all()
-    )
-    
-    return [
-        {
-            "guest_name": r.guest_name,
-            "guest_email": r.guest_email,
-            "guest_phone": r.guest_phone,
-            "guest_address": r.guest_address,
-            "guest_city": r.guest_city,
-            "guest_postal_code": r.guest_postal_code,
-            "guest_country": r.guest_country,
-            "guest_company": r.guest_company,
-            "company_address": r.company_address,
-            "company_city": r.company_city,
-            "company_postal_code": r.company_postal_code,
-            "company_country": r.company_country,
-        }
-        for r in results
-    ]
+    """Search guests by name, email, phone or company for autocomplete"""
+    return await guest_search.search_guests(db, query, limit)
 
 
-def check_room_availability(
-    db: Session,
+async def check_room_availability(
+    db: AsyncSession,
     room_id: str,
     check_in: date,
     check_out: date,
     exclude_reservation_id: Optional[str] = None
 ) -> bool:
     """Check if a room is available for the given dates"""
-    query = db.query(Reservation).filter(
+    if AVAILABILITY_INDEX and availability_index.ready:
+        await availability_index.ensure_current()
+        return availability_index.is_available(room_id, check_in, check_out, exclude_reservation_id)
+    
+    query = select(Reservation.id).where(
         Reservation.room_id == room_id,
         Reservation.status.in_(["CONFIRMED", "CHECKED_IN"]),
         or_(
@@ -109,40 +95,48 @@ def check_room_availability(
     
     # Exclude the current reservation if updating
     if exclude_reservation_id:
-        query = query.filter(Reservation.id != exclude_reservation_id)
+        query = query.where(Reservation.id != exclude_reservation_id)
     
-    conflicting = query.first()
+    conflicting = await db.scalar(query.limit(1))
     return conflicting is None
 
 
 @router.get("/", response_model=List[ReservationResponse])
 async def get_reservations(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
     room_id: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: str = Query("check_in", pattern=sort_options(RESERVATION_SORTS.values())),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all reservations with optional filters"""
-    query = db.query(Reservation)
+    """Get all reservations with optional filters.
+
+    Pass the X-Next-Cursor / X-Prev-Cursor header of a response as ``cursor``
+    (with the same sort and order) to get the adjacent page; ``skip`` still
+    works but gets slower the deeper it goes.
+    """
+    query = select(Reservation)
     
     if room_id:
-        query = query.filter(Reservation.room_id == room_id)
+        query = query.where(Reservation.room_id == room_id)
     if status:
-        query = query.filter(Reservation.status == status)
+        query = query.where(Reservation.status == status)
     
-    reservations = query.offset(skip).limit(limit).all()
-    return reservations
+    page = await fetch_page(
+        db, query, RESERVATION_SORTS[sort], limit,
+        cursor=cursor, descending=order == "desc", offset=skip
+    )
+    response = RESERVATIONS_JSON.response(page.items)
+    page.set_headers(response)
+    return response
 
 
-@router.get("/calendar", response_model=List[ReservationWithRoom])
-async def get_calendar_reservations(
-    start_date: date,
-    end_date: date,
-    db: Session = Depends(get_db)
-):
-    """Get all reservations for the calendar view within a date range"""
-    reservations = db.query(Reservation).join(Room).filter(
+def calendar_query(start_date: date, end_date: date):
+    """Active reservations (with their room) shown in a calendar date range"""
+    return select(Reservation).join(Room).options(contains_eager(Reservation.room)).where(
         or_(
             # Reservations that start in the range
             and_(
@@ -161,40 +155,164 @@ async def get_calendar_reservations(
             )
         ),
         Reservation.status.in_(["CONFIRMED", "CHECKED_IN"])
-    ).all()
+    )
+
+
+def with_room(reservation: Reservation) -> dict:
+    """Reservation columns plus room number/name (room must be loaded)"""
+    return {
+        **column_values(reservation),
+        "room_number": reservation.room.number,
+        "room_name": reservation.room.name
+    }
+
+
+@router.get("/export")
+async def export_reservations(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[str] = None,
+    room_id: Optional[str] = None,
+):
+    """Stream every matching reservation as NDJSON or CSV.
+
+    The date range selects stays overlapping ``start_date``..``end_date``
+    (either end optional). Rows are encoded as they are read, so multi-year
+    exports do not build up in memory.
+    """
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    query = export_query(start_date, end_date, status, room_id)
+    filename = f"reservations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_export(query, format, replica=use_replica(request)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/calendar", response_model=List[ReservationWithRoom])
+async def get_calendar_reservations(
+    request: Request,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get all reservations for the calendar view within a date range"""
+    etag = make_etag("calendar", start_date, end_date, await change_version(db))
+    if cached := not_modified(request, etag):
+        return cached
+    reservations = (await db.execute(calendar_query(start_date, end_date))).scalars().all()
+    return tag(CALENDAR_JSON.response(reservations), etag)
+
+
+@router.get("/calendar/changes", response_model=CalendarChanges)
+async def get_calendar_changes(
+    start_date: date,
+    end_date: date,
+    since: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Delta sync for the calendar.
+
+    Without ``since`` (or when the delta can no longer be served) returns a
+    full snapshot; otherwise only rooms and reservations written after
+    version ``since`` plus tombstones for deletions.
+    """
+    # Read the version first: anything committed meanwhile is at worst sent twice
+    version, pruned_through = await sync_state(db)
+    full = since is None or since < pruned_through or since > version
     
-    # Add room details to response
-    result = []
-    for reservation in reservations:
-        result.append({
-            **reservation.__dict__,
-            "room_number": reservation.room.number,
-            "room_name": reservation.room.name
-        })
+    if not full:
+        reservations = (await db.execute(
+            select(Reservation).join(Room).options(contains_eager(Reservation.room))
+            .where(Reservation.version > since)
+            .order_by(Reservation.version)
+            .limit(SYNC_MAX_CHANGES + 1)
+        )).scalars().all()
+        full = len(reservations) > SYNC_MAX_CHANGES
     
-    return result
+    if full:
+        rooms = (await db.execute(select(Room).order_by(Room.number))).scalars().all()
+        reservations = (await db.execute(calendar_query(start_date, end_date))).scalars().all()
+        return {
+            "version": version,
+            "full": True,
+            "rooms": rooms,
+            "reservations": [with_room(r) for r in reservations],
+        }
+    
+    rooms = (await db.execute(select(Room).where(Room.version > since))).scalars().all()
+    tombstones = (await db.execute(
+        select(Tombstone.model, Tombstone.object_id).where(Tombstone.version > since)
+    )).all()
+    return {
+        "version": version,
+        "full": False,
+        "rooms": rooms,
+        "reservations": [with_room(r) for r in reservations],
+        "deleted_rooms": [t.object_id for t in tombstones if t.model == "room"],
+        "deleted_reservations": [t.object_id for t in tombstones if t.model == "reservation"],
+    }
+
+
+@router.get("/calendar/grid", response_model=CalendarGrid)
+async def get_calendar_grid(
+    request: Request,
+    response: Response,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Occupancy grid (rooms × nights) for the calendar view.
+
+    Every room gets a run-length encoded row of reservation references, and
+    each reservation's details are included once.
+    """
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
+        )
+    etag = make_etag("calendar-grid", start_date, end_date, await change_version(db))
+    if cached := not_modified(request, etag):
+        return cached
+    result = await db.execute(grid_query(start_date, end_date))
+    tag(response, etag)
+    return build_grid(result, start_date, end_date)
 
 
 @router.get("/{reservation_id}", response_model=ReservationResponse)
-async def get_reservation(reservation_id: str, db: Session = Depends(get_db)):
+async def get_reservation(
+    reservation_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific reservation by ID"""
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    version = await row_version(db, Reservation, reservation_id)
+    if version is not None and (cached := not_modified(request, make_etag("reservation", reservation_id, version))):
+        return cached
+    reservation = await db.get(Reservation, reservation_id)
     if not reservation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Reservation with id {reservation_id} not found"
         )
+    tag(response, make_etag("reservation", reservation_id, reservation.version))
     return reservation
 
 
 @router.post("/", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
 async def create_reservation(
     reservation_data: ReservationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new reservation"""
     # Check if room exists
-    room = db.query(Room).filter(Room.id == reservation_data.room_id).first()
+    room = await db.get(Room, reservation_data.room_id)
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -202,7 +320,7 @@ async def create_reservation(
         )
     
     # Check availability
-    if not check_room_availability(
+    if not await check_room_availability(
         db,
         reservation_data.room_id,
         reservation_data.check_in,
@@ -222,19 +340,67 @@ async def create_reservation(
     # Create reservation
     reservation = Reservation(**data_dict)
     db.add(reservation)
-    db.commit()
-    db.refresh(reservation)
+    await db.commit()
+    await db.refresh(reservation)
     return reservation
 
 
+@router.post("/batch", response_model=ReservationBatchResponse)
+async def batch_reservations(batch: ReservationBatch, db: AsyncSession = Depends(get_db)):
+    """Apply several creates, updates and deletes atomically.
+
+    Availability is checked against the state after all operations, so
+    swaps and group moves work in one call. If anything is wrong nothing is
+    applied and every rejected operation is listed by index (409 for room
+    conflicts, 422 otherwise).
+    """
+    try:
+        results = await apply_batch(db, batch)
+    except BatchRejected as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT if e.conflict else status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"message": str(e), "errors": e.errors}
+        )
+    return {"results": results}
+
+
+@router.post("/import")
+async def import_reservations(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(json|csv)$"),
+    dry_run: bool = False,
+    atomic: bool = False,
+):
+    """Import many reservations from a JSON or CSV request body.
+
+    The format follows the Content-Type unless given. Rows may name the room
+    by ``room_id`` or ``room_number``; the whole file is checked for room
+    conflicts (with existing bookings and with each other) before anything is
+    written. Returns counts, the id of every created row and the errors of
+    every rejected one. ``dry_run`` only validates; ``atomic`` imports
+    nothing unless every row is valid.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "json"
+    data = await request.body()
+    try:
+        report = await run_in_threadpool(
+            import_file, data, format, dry_run=dry_run, atomic=atomic, max_rows=IMPORT_MAX_ROWS
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return report.to_dict()
+
+
 @router.put("/{reservation_id}", response_model=ReservationResponse)
 async def update_reservation(
     reservation_id: str,
     reservation_data: ReservationUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an existing reservation"""
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    reservation = await db.get(Reservation, reservation_id)
     if not reservation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -247,15 +413,22 @@ async def update_reservation(
     check_in = update_dict.get("check_in", reservation.check_in)
     check_out = update_dict.get("check_out", reservation.check_out)
     
+    if "room_id" in update_dict and not await db.get(Room, room_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Room with id {room_id} not found"
+        )
+    
     if any(k in update_dict for k in ["room_id", "check_in", "check_out"]):
-        if not check_room_availability(
+        if not await check_room_availability(
             db,
             room_id,
             check_in,
             check_out,
             exclude_reservation_id=reservation_id
         ):
-            room = db.query(Room).filter(Room.id == room_id).first()
+            # Display only; existence is checked in this transaction above
+            room = room_catalog.get(room_id)
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail=f"Room {room.number if room else room_id} is not available for the selected dates"
@@ -265,21 +438,21 @@ async def update_reservation(
     for field, value in update_dict.items():
         setattr(reservation, field, value)
     
-    db.commit()
-    db.refresh(reservation)
+    await db.commit()
+    await db.refresh(reservation)
     return reservation
 
 
 @router.delete("/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_reservation(reservation_id: str, db: Session = Depends(get_db)):
+async def delete_reservation(reservation_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a reservation"""
-    reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    reservation = await db.get(Reservation, reservation_id)
     if not reservation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Reservation with id {reservation_id} not found"
         )
     
-    db.delete(reservation)
-    db.commit()
+    await db.delete(reservation)
+    await db.commit()
     return None
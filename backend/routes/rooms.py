@@ -1,42 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Room
 from schemas import RoomCreate, RoomUpdate, RoomResponse
+from services.fast_json import ListEncoder
+from services.http_cache import make_etag, not_modified, tag
+from services.pagination import Keyset, page_of, sort_options
+from services.room_catalog import room_catalog
 
 router = APIRouter()
 
+ROOM_SORTS = {
+    keyset.name: keyset for keyset in (
+        Keyset("number", (Room.number,)),
+        Keyset("created_at", (Room.created_at, Room.id)),
+    )
+}
+
+ROOMS_JSON = ListEncoder(RoomResponse)
+
 
 @router.get("/", response_model=List[RoomResponse])
 async def get_rooms(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    sort: str = Query("number", pattern=sort_options(ROOM_SORTS.values())),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
 ):
-    """Get all rooms with pagination"""
-    rooms = db.query(Room).offset(skip).limit(limit).all()
-    return rooms
+    """Get all rooms with pagination (cursor in X-Next-Cursor / X-Prev-Cursor).
+
+    Served from the room catalog, without a database query.
+    """
+    await room_catalog.ensure_current()
+    version, rooms = room_catalog.snapshot(ROOM_SORTS[sort])
+    etag = make_etag("rooms", request.url.query, *version)
+    if cached := not_modified(request, etag):
+        return cached
+    page = page_of(rooms, ROOM_SORTS[sort], limit, cursor=cursor, descending=order == "desc", offset=skip)
+    response = ROOMS_JSON.response(page.items)
+    page.set_headers(response)
+    return tag(response, etag)
 
 
 @router.get("/{room_id}", response_model=RoomResponse)
-async def get_room(room_id: str, db: Session = Depends(get_db)):
+async def get_room(
+    room_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific room by ID"""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    await room_catalog.ensure_current()
+    # Not in the catalog (yet) if another worker just created it
+    room = room_catalog.get(room_id) or await db.get(Room, room_id)
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Room with id {room_id} not found"
         )
+    etag = make_etag("room", room_id, room.version)
+    if cached := not_modified(request, etag):
+        return cached
+    tag(response, etag)
     return room
 
 
 @router.post("/", response_model=RoomResponse, status_code=status.HTTP_201_CREATED)
-async def create_room(room_data: RoomCreate, db: Session = Depends(get_db)):
+async def create_room(room_data: RoomCreate, db: AsyncSession = Depends(get_db)):
     """Create a new room"""
     # Check if room number already exists
-    existing = db.query(Room).filter(Room.number == room_data.number).first()
+    existing = await db.scalar(select(Room).where(Room.number == room_data.number))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,8 +84,8 @@ async def create_room(room_data: RoomCreate, db: Session = Depends(get_db)):
     # Create new room
     room = Room(**room_data.model_dump())
     db.add(room)
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await db.refresh(room)
     return room
 
 
@@ -55,10 +93,10 @@ async def create_room(room_data: RoomCreate, db: Session = Depends(get_db)):
 async def update_room(
     room_id: str,
     room_data: RoomUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update an existing room"""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    room = await db.get(Room, room_id)
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,7 +105,7 @@ async def update_room(
     
     # Check if updating room number to one that already exists
     if room_data.number and room_data.number != room.number:
-        existing = db.query(Room).filter(Room.number == room_data.number).first()
+        existing = await db.scalar(select(Room).where(Room.number == room_data.number))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -79,21 +117,21 @@ async def update_room(
     for field, value in update_data.items():
         setattr(room, field, value)
     
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await db.refresh(room)
     return room
 
 
 @router.delete("/{room_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_room(room_id: str, db: Session = Depends(get_db)):
+async def delete_room(room_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a room"""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    room = await db.get(Room, room_id)
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Room with id {room_id} not found"
         )
     
-    db.delete(room)
-    db.commit()
+    await db.delete(room)
+    await db.commit()
     return None
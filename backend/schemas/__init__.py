@@ -3,10 +3,17 @@ from .room import RoomBase, RoomCreate, RoomUpdate, RoomResponse
 from .reservation import (
     ReservationBase,
     ReservationCreate,
+    ReservationImport,
     ReservationUpdate,
     ReservationResponse,
     ReservationWithRoom,
+    ReservationBatch,
+    ReservationBatchResult,
+    ReservationBatchResponse,
 )
+from .calendar import CalendarGrid, CalendarGridRoom, CalendarGridReservation, CalendarChanges
+from .report import ReportMetrics, ReportRow, OccupancyReport
+from .assignment import RequestedStay, AssignmentRequest, StayPlacement, ProposedMove, AssignmentPlan
 
 __all__ = [
     "RoomBase",
@@ -15,7 +22,23 @@ __all__ = [
     "RoomResponse",
     "ReservationBase",
     "ReservationCreate",
+    "ReservationImport",
     "ReservationUpdate",
     "ReservationResponse",
     "ReservationWithRoom",
+    "ReservationBatch",
+    "ReservationBatchResult",
+    "ReservationBatchResponse",
+    "CalendarGrid",
+    "CalendarGridRoom",
+    "CalendarGridReservation",
+    "CalendarChanges",
+    "ReportMetrics",
+    "ReportRow",
+    "OccupancyReport",
+    "RequestedStay",
+    "AssignmentRequest",
+    "StayPlacement",
+    "ProposedMove",
+    "AssignmentPlan",
 ]
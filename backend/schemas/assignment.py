@@ -0,0 +1,80 @@
+from pydantic import BaseModel, Field, field_validator, model_validator
+from datetime import date
+from typing import List, Optional
+
+from models.room import RoomType
+
+
+class RequestedStay(BaseModel):
+    """A stay to place in any suitable room (e.g. one room of a group booking)"""
+    label: Optional[str] = Field(None, description="Caller's reference, echoed back")
+    check_in: date
+    check_out: date
+    room_type: Optional[RoomType] = None
+    min_capacity: int = Field(1, ge=1)
+
+    @field_validator("check_out")
+    @classmethod
+    def check_out_after_check_in(cls, check_out, info):
+        """Validate that check-out is after check-in"""
+        check_in = info.data.get("check_in")
+        if check_in and check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        return check_out
+
+
+class AssignmentRequest(BaseModel):
+    """Stays to place and, optionally, future reservations that may be moved"""
+    stays: List[RequestedStay] = Field(default_factory=list, max_length=1000)
+    repack: bool = Field(False, description="Also move confirmed future reservations to close gaps")
+    repack_from: Optional[date] = Field(None, description="First check-in that may move (default tomorrow)")
+    repack_until: Optional[date] = Field(None, description="Last check-out that may move (default 180 days on)")
+    locked: List[str] = Field(default_factory=list, description="Reservation ids that must stay put")
+    min_gap: int = Field(2, ge=1, description="Free runs shorter than this many nights count as unsellable")
+    move_cost: float = Field(
+        0.5, ge=0,
+        description="Unsellable gaps a moved reservation costs; a swap is kept only if it closes more than it costs",
+    )
+    max_moves: Optional[int] = Field(None, ge=0, description="Most reservations the plan may move (default no limit)")
+    time_budget: float = Field(2.0, gt=0, le=30, description="Seconds to spend improving the plan")
+
+    @model_validator(mode="after")
+    def something_to_do(self):
+        """Validate that there are stays to place or reservations to repack"""
+        if not self.stays and not self.repack:
+            raise ValueError("Give stays to place or set repack")
+        return self
+
+
+class StayPlacement(BaseModel):
+    """Where a requested stay would go (no room if none fits)"""
+    index: int
+    label: Optional[str] = None
+    room_id: Optional[str] = None
+    room_number: Optional[str] = None
+
+
+class ProposedMove(BaseModel):
+    """An existing reservation the plan moves to another room"""
+    reservation_id: str
+    guest_name: str
+    check_in: date
+    check_out: date
+    from_room_id: str
+    from_room_number: str
+    to_room_id: str
+    to_room_number: str
+
+
+class AssignmentPlan(BaseModel):
+    """Proposed placements and moves; nothing is written"""
+    placements: List[StayPlacement]
+    moves: List[ProposedMove]
+    unplaced: int
+    # Unsellable gaps (free runs shorter than min_gap) before and with the
+    # plan, and how many reservations it moves to get there
+    gaps_before: int
+    gaps_after: int
+    moved: int
+    passes: int
+    elapsed_ms: float
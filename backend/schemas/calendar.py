@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import List, Optional, Tuple
+
+from models.room import RoomType
+from models.reservation import ReservationStatus
+from .room import RoomResponse
+from .reservation import ReservationWithRoom
+
+
+class CalendarGridRoom(BaseModel):
+    """Room row of the occupancy grid"""
+    id: str
+    number: str
+    name: str
+    room_type: RoomType
+    capacity: int
+    floor: Optional[int] = None
+
+
+class CalendarGridReservation(BaseModel):
+    """Reservation referenced from the occupancy grid (sent once)"""
+    id: str
+    room_id: str
+    guest_name: str
+    guest_company: Optional[str] = None
+    check_in: date
+    check_out: date
+    status: ReservationStatus
+    breakfast_included: Optional[bool] = None
+    total_price: Optional[float] = None
+
+
+class CalendarGrid(BaseModel):
+    """Rooms × days occupancy matrix.
+
+    ``rows[i]`` belongs to ``rooms[i]`` and is run-length encoded as
+    ``[reservation_index, days]`` pairs covering the whole range;
+    ``reservation_index`` points into ``reservations`` and is null for free
+    nights.
+    """
+    start_date: date
+    end_date: date
+    days: int = Field(..., description="Number of nights in the range (end date inclusive)")
+    rooms: List[CalendarGridRoom]
+    rows: List[List[Tuple[Optional[int], int]]]
+    reservations: List[CalendarGridReservation]
+
+
+class CalendarChanges(BaseModel):
+    """Calendar data changed since a sync version.
+
+    With ``full`` the payload is a complete snapshot (all rooms, active
+    reservations in the range) that replaces the client's copy. Otherwise it
+    holds every room and reservation written after ``since`` (whatever their
+    dates or status) plus the IDs deleted since then. Clients keep ``version``
+    and pass it as ``since`` next time.
+    """
+    version: int
+    full: bool
+    rooms: List[RoomResponse]
+    reservations: List[ReservationWithRoom]
+    deleted_rooms: List[str] = []
+    deleted_reservations: List[str] = []
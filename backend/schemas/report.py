@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Optional
+
+from models.room import RoomType
+
+
+class ReportMetrics(BaseModel):
+    """Occupancy and revenue figures of one period (or the whole range)"""
+    rooms_available: int
+    rooms_sold: int
+    revenue: float
+    arrivals: int
+    departures: int
+    occupancy: Optional[float] = None  # percent
+    adr: Optional[float] = None
+    revpar: Optional[float] = None
+
+
+class ReportRow(ReportMetrics):
+    """One period, for all rooms or one room type"""
+    period: date
+    room_type: Optional[RoomType] = None
+
+
+class OccupancyReport(BaseModel):
+    """Occupancy, ADR and RevPAR per period"""
+    start_date: date
+    end_date: date
+    granularity: str
+    rows: List[ReportRow]
+    totals: ReportMetrics
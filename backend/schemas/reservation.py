@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
 from datetime import date, datetime
-from typing import Optional
+from typing import Annotated, List, Literal, Optional, Union
 
 from models.reservation import ReservationStatus, PaymentMethod
 
@@ -50,6 +50,22 @@ class ReservationCreate(ReservationBase):
     pass
 
 
+class ReservationImport(ReservationCreate):
+    """One row of a bulk import; the room is given by id or by number"""
+    room_id: Optional[str] = Field(None, description="ID of the room being reserved")
+    room_number: Optional[str] = Field(None, description="Room number, instead of room_id")
+    status: ReservationStatus = ReservationStatus.CONFIRMED
+    total_price: Optional[float] = None
+    payment_method: Optional[PaymentMethod] = None
+
+    @model_validator(mode="after")
+    def room_given(self):
+        """Validate that the room is identified somehow"""
+        if not self.room_id and not self.room_number:
+            raise ValueError("room_id or room_number is required")
+        return self
+
+
 class ReservationUpdate(BaseModel):
     """Schema for updating a reservation (all fields optional)"""
     room_id: Optional[str] = None
@@ -83,6 +99,7 @@ class ReservationResponse(ReservationBase):
     payment_method: Optional[PaymentMethod] = None
     created_at: datetime
     updated_at: datetime
+    version: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -93,3 +110,45 @@ class ReservationWithRoom(ReservationResponse):
     room_name: str
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ReservationCreateOperation(BaseModel):
+    """Batch operation: create a reservation"""
+    op: Literal["create"]
+    data: ReservationCreate
+
+
+class ReservationUpdateOperation(BaseModel):
+    """Batch operation: change fields of a reservation"""
+    op: Literal["update"]
+    id: str
+    data: ReservationUpdate
+
+
+class ReservationDeleteOperation(BaseModel):
+    """Batch operation: delete a reservation"""
+    op: Literal["delete"]
+    id: str
+
+
+ReservationOperation = Annotated[
+    Union[ReservationCreateOperation, ReservationUpdateOperation, ReservationDeleteOperation],
+    Field(discriminator="op"),
+]
+
+
+class ReservationBatch(BaseModel):
+    """Operations applied together in one transaction"""
+    operations: List[ReservationOperation] = Field(..., min_length=1, max_length=500)
+
+
+class ReservationBatchResult(BaseModel):
+    """Outcome of one batch operation (no reservation for deletes)"""
+    op: str
+    id: str
+    reservation: Optional[ReservationResponse] = None
+
+
+class ReservationBatchResponse(BaseModel):
+    """Results in the order of the operations"""
+    results: List[ReservationBatchResult]
@@ -35,5 +35,6 @@ class RoomResponse(RoomBase):
     id: str
     created_at: datetime
     updated_at: datetime
+    version: int = 0
 
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,124 @@
+"""
+Room x night occupancy grid for free-room searches.
+
+One row per room and one column per night, from ``origin`` for
+AVAILABILITY_GRID_DAYS nights, holding the number of blocking stays on that
+night (a count rather than a flag, so taking away one of two overlapping
+stays leaves the night occupied). Capacity and room type are kept as
+parallel arrays, so a search is one vectorized pass over all rooms: ``any``
+over the columns of the requested nights, and masks for capacity and type.
+
+The grid has no lock of its own; services.availability_index owns it and
+feeds it every stay and room change under its lock.
+"""
+import os
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models import RoomType
+
+# Nights covered from the origin (searches past it use the interval lists)
+AVAILABILITY_GRID_DAYS = int(os.getenv("AVAILABILITY_GRID_DAYS", "730"))
+
+TYPE_INDEX = {room_type: i for i, room_type in enumerate(RoomType)}
+# Type of rows that must never match: deleted rooms, rooms not loaded yet
+NO_TYPE = -1
+
+
+class OccupancyGrid:
+    """Blocking stays per room and night, plus each room's capacity and type"""
+
+    def __init__(self, origin: date, days: int = AVAILABILITY_GRID_DAYS):
+        self.origin = origin
+        self.days = days
+        self.room_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.capacity = np.zeros(0, dtype=np.int64)
+        self.room_type = np.zeros(0, dtype=np.int64)
+        self.nights = np.zeros((0, days), dtype=np.uint16)
+
+    def load_rooms(self, rooms: Iterable[Tuple[str, int, RoomType]]):
+        """Add ``(id, capacity, room_type)`` rows in one go"""
+        rooms = [room for room in rooms if room[0] not in self.rows]
+        if rooms:
+            self._add_rows(
+                [room_id for room_id, _, _ in rooms],
+                [capacity for _, capacity, _ in rooms],
+                [TYPE_INDEX[room_type] for _, _, room_type in rooms],
+            )
+
+    def _add_rows(self, room_ids: List[str], capacities: List[int], types: List[int]):
+        for room_id in room_ids:
+            self.rows[room_id] = len(self.room_ids)
+            self.room_ids.append(room_id)
+        self.capacity = np.concatenate([self.capacity, np.array(capacities, dtype=np.int64)])
+        self.room_type = np.concatenate([self.room_type, np.array(types, dtype=np.int64)])
+        self.nights = np.vstack([self.nights, np.zeros((len(room_ids), self.days), dtype=self.nights.dtype)])
+
+    def _row(self, room_id: str) -> int:
+        if room_id not in self.rows:
+            # A stay may be seen before its room (e.g. relayed out of order)
+            self._add_rows([room_id], [0], [NO_TYPE])
+        return self.rows[room_id]
+
+    def set_room(self, room_id: str, capacity: int, room_type: RoomType):
+        row = self._row(room_id)
+        self.capacity[row] = capacity
+        self.room_type[row] = TYPE_INDEX[room_type]
+
+    def remove_room(self, room_id: str):
+        """Stop matching a room; its row is reused if the id comes back"""
+        row = self.rows.get(room_id)
+        if row is not None:
+            self.room_type[row] = NO_TYPE
+
+    def _columns(self, check_in: date, check_out: date) -> Tuple[int, int]:
+        first = min(max((check_in - self.origin).days, 0), self.days)
+        stop = min(max((check_out - self.origin).days, 0), self.days)
+        return first, stop
+
+    def add_stay(self, room_id: str, check_in: date, check_out: date, sign: int = 1):
+        """Count (or with sign=-1 uncount) a stay on the nights it covers"""
+        first, stop = self._columns(check_in, check_out)
+        if first < stop:
+            row = self._row(room_id)
+            if sign > 0:
+                self.nights[row, first:stop] += 1
+            else:
+                self.nights[row, first:stop] -= 1
+
+    def covers(self, check_in: date, check_out: date) -> bool:
+        return check_in >= self.origin and (check_out - self.origin).days <= self.days
+
+    def matching(self, min_capacity: int = 1, room_type: Optional[RoomType] = None) -> np.ndarray:
+        """Boolean mask of the rooms with enough capacity (and the type)"""
+        mask = self.capacity >= min_capacity
+        if room_type is None:
+            return mask & (self.room_type != NO_TYPE)
+        return mask & (self.room_type == TYPE_INDEX[room_type])
+
+    def free_rooms(
+        self,
+        check_in: date,
+        check_out: date,
+        min_capacity: int = 1,
+        room_type: Optional[RoomType] = None,
+    ) -> List[str]:
+        """Rooms free on every night of [check_in, check_out); must be covered"""
+        first, stop = self._columns(check_in, check_out)
+        free = self.matching(min_capacity, room_type) & ~self.nights[:, first:stop].any(axis=1)
+        return [self.room_ids[row] for row in np.flatnonzero(free)]
+
+    def reanchored(self, origin: date, stays: Iterable[Tuple[str, date, date]]) -> "OccupancyGrid":
+        """Same rooms, window moved to ``origin``, counts rebuilt from ``stays``"""
+        grid = OccupancyGrid(origin, self.days)
+        grid.room_ids = list(self.room_ids)
+        grid.rows = dict(self.rows)
+        grid.capacity = self.capacity.copy()
+        grid.room_type = self.room_type.copy()
+        grid.nights = np.zeros((len(self.room_ids), self.days), dtype=self.nights.dtype)
+        for room_id, check_in, check_out in stays:
+            grid.add_stay(room_id, check_in, check_out)
+        return grid
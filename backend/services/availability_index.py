@@ -0,0 +1,386 @@
+"""
+In-process index of booked intervals per room.
+
+Holds every CONFIRMED / CHECKED_IN stay as a half-open ``[check_in, check_out)``
+interval in a list sorted by check-in, one list per room. An overlap check
+is a binary search plus a scan over the few stays that can still reach into
+the requested range (bounded by the longest stay in that room), so it never
+touches the database. Alongside, an OccupancyGrid (services.availability_grid)
+holds the same stays as a rooms x nights matrix together with each room's
+capacity and type, for searching all rooms at once.
+
+The index is loaded at startup and kept current from committed writes (see
+services.model_events), including writes made by other API workers on the
+same host, which arrive through services.event_fanout. Writes that no relay
+delivers (scripts such as import_reservations.py, dropped datagrams) are
+caught up by ensure_current: at most every AVAILABILITY_INDEX_CHECK_SECONDS
+it compares the global change version with the one the index last caught up
+to, and applies the rooms, reservations and tombstones written since. Where
+the fan-out is unavailable (EVENT_FANOUT=0, non-POSIX hosts) and several
+workers run, disable the index (AVAILABILITY_INDEX=0) so the check goes to
+the database; a few seconds of lag are fine for scripts, not for
+concurrent bookings.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from database import open_session
+from models import Reservation, ReservationStatus, Room, RoomType, Tombstone
+from services import model_events
+from services.availability_grid import OccupancyGrid
+from services.change_sync import sync_state
+
+AVAILABILITY_INDEX = os.getenv("AVAILABILITY_INDEX", "1") == "1"
+# How often (at most) the index checks for writes it was not told about
+AVAILABILITY_INDEX_CHECK_SECONDS = float(os.getenv("AVAILABILITY_INDEX_CHECK_SECONDS", "5"))
+
+# Stays that block a room
+BLOCKING_STATUSES = (ReservationStatus.CONFIRMED, ReservationStatus.CHECKED_IN)
+# Move the grid's window forward once its origin is this far in the past
+GRID_REANCHOR_AFTER = timedelta(days=7)
+
+
+@dataclass(frozen=True)
+class Stay:
+    room_id: str
+    check_in: date
+    check_out: date
+
+
+class RoomIntervals:
+    """Stays of one room sorted by check-in"""
+
+    def __init__(self):
+        self.entries: List[Tuple[date, date, str]] = []
+        self.starts: List[date] = []
+        # Longest stay ever added (never shrinks until rebuild); bounds the scan
+        self.max_nights = 0
+
+    def add(self, reservation_id: str, check_in: date, check_out: date):
+        entry = (check_in, check_out, reservation_id)
+        position = bisect_left(self.entries, entry)
+        self.entries.insert(position, entry)
+        self.starts.insert(position, check_in)
+        self.max_nights = max(self.max_nights, (check_out - check_in).days)
+
+    def remove(self, reservation_id: str, check_in: date, check_out: date):
+        entry = (check_in, check_out, reservation_id)
+        position = bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+            del self.starts[position]
+
+    def overlapping(self, check_in: date, check_out: date, exclude_id: Optional[str] = None) -> Optional[str]:
+        """Id of a stay overlapping [check_in, check_out), or None"""
+        # Only stays starting before check_out can overlap, and only those
+        # starting after (check_in - longest stay) can still reach check_in
+        end = bisect_left(self.starts, check_out)
+        start = bisect_left(self.starts, date.fromordinal(max(1, check_in.toordinal() - self.max_nights)))
+        for i in range(end - 1, start - 1, -1):
+            other_in, other_out, other_id = self.entries[i]
+            if other_out > check_in and other_id != exclude_id:
+                return other_id
+        return None
+
+    def overlaps(self, check_in: date, check_out: date, exclude_id: Optional[str]) -> bool:
+        return self.overlapping(check_in, check_out, exclude_id) is not None
+
+
+class AvailabilityIndex:
+    """Per-room interval index over blocking reservations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: Dict[str, RoomIntervals] = {}
+        self._stays: Dict[str, Stay] = {}
+        self._grid = OccupancyGrid(date.today())
+        # Newest (version, deleted) applied per reservation since the last
+        # load; changes relayed from other workers may arrive late
+        self._versions: Dict[str, Tuple[int, bool]] = {}
+        # Changes committed while a rebuild is reading the database
+        self._replay: Optional[List[model_events.ModelChange]] = None
+        self.ready = False
+        # Change version of the last load or catch-up; relayed changes do not
+        # move it, since an earlier one may have been lost
+        self.version = 0
+        self._checked_at = 0.0
+
+    def __len__(self):
+        return len(self._stays)
+
+    def begin_load(self):
+        """Start collecting changes to replay on top of the next load()"""
+        with self._lock:
+            self._replay = []
+
+    def load(
+        self,
+        rows: Iterable[Tuple[str, str, date, date]],
+        room_rows: Iterable[Tuple[str, int, RoomType]] = (),
+        version: int = 0,
+    ):
+        """Replace the contents with ``(id, room_id, check_in, check_out)``
+        stays and ``(id, capacity, room_type)`` rooms, read at change
+        ``version``"""
+        rooms: Dict[str, RoomIntervals] = {}
+        stays: Dict[str, Stay] = {}
+        grid = OccupancyGrid(date.today())
+        grid.load_rooms(room_rows)
+        for reservation_id, room_id, check_in, check_out in rows:
+            stays[reservation_id] = Stay(room_id, check_in, check_out)
+            rooms.setdefault(room_id, RoomIntervals()).add(reservation_id, check_in, check_out)
+            grid.add_stay(room_id, check_in, check_out)
+        with self._lock:
+            self._rooms = rooms
+            self._stays = stays
+            self._grid = grid
+            self._versions = {}
+            replay, self._replay = self._replay or [], None
+            self.version = version
+            self._checked_at = time.monotonic()
+            self.ready = True
+        self.apply_changes(replay)
+
+    def upsert(self, reservation_id: str, room_id: str, check_in: date, check_out: date, status):
+        """Record the current state of a reservation"""
+        with self._lock:
+            self._discard(reservation_id)
+            if status in BLOCKING_STATUSES:
+                self._stays[reservation_id] = Stay(room_id, check_in, check_out)
+                self._rooms.setdefault(room_id, RoomIntervals()).add(reservation_id, check_in, check_out)
+                self._grid.add_stay(room_id, check_in, check_out)
+
+    def set_room(self, room_id: str, capacity: int, room_type: RoomType):
+        """Record a room's current capacity and type"""
+        with self._lock:
+            self._grid.set_room(room_id, capacity, room_type)
+
+    def remove_room(self, room_id: str):
+        with self._lock:
+            self._grid.remove_room(room_id)
+
+    def remove(self, reservation_id: str):
+        with self._lock:
+            self._discard(reservation_id)
+
+    def _discard(self, reservation_id: str):
+        stay = self._stays.pop(reservation_id, None)
+        if stay is not None:
+            self._rooms[stay.room_id].remove(reservation_id, stay.check_in, stay.check_out)
+            self._grid.add_stay(stay.room_id, stay.check_in, stay.check_out, sign=-1)
+
+    def is_available(
+        self,
+        room_id: str,
+        check_in: date,
+        check_out: date,
+        exclude_reservation_id: Optional[str] = None,
+    ) -> bool:
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            if intervals is None:
+                return True
+            return not intervals.overlaps(check_in, check_out, exclude_reservation_id)
+
+    def free_rooms(
+        self,
+        check_in: date,
+        check_out: date,
+        min_capacity: int = 1,
+        room_type: Optional[RoomType] = None,
+    ) -> List[str]:
+        """Ids of the rooms with enough capacity (and the type) that are free
+        on every night of [check_in, check_out)"""
+        with self._lock:
+            if date.today() - self._grid.origin > GRID_REANCHOR_AFTER:
+                self._grid = self._grid.reanchored(
+                    date.today(), ((s.room_id, s.check_in, s.check_out) for s in self._stays.values())
+                )
+            grid = self._grid
+            if grid.covers(check_in, check_out):
+                return grid.free_rooms(check_in, check_out, min_capacity, room_type)
+            # Outside the grid's window: the interval lists of the candidates
+            return [
+                grid.room_ids[row] for row in grid.matching(min_capacity, room_type).nonzero()[0]
+                if grid.room_ids[row] not in self._rooms
+                or not self._rooms[grid.room_ids[row]].overlaps(check_in, check_out, None)
+            ]
+
+    def grid_consistent(self) -> bool:
+        """Whether the grid's counts match the indexed stays"""
+        with self._lock:
+            grid = self._grid
+            expected = grid.reanchored(
+                grid.origin, ((s.room_id, s.check_in, s.check_out) for s in self._stays.values())
+            )
+            return bool((expected.nights == grid.nights).all())
+
+    def stays(self) -> Dict[str, Stay]:
+        """Copy of the indexed stays keyed by reservation id"""
+        with self._lock:
+            return dict(self._stays)
+
+    def apply_changes(self, changes: List[model_events.ModelChange]):
+        """model_events subscriber"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(changes)
+        for change in changes:
+            if self._is_stale(change):
+                continue
+            if change.model == "room":
+                if change.op == model_events.DELETED:
+                    self.remove_room(change.id)
+                else:
+                    self.set_room(change.id, change.values["capacity"], change.values["room_type"])
+            elif change.op == model_events.DELETED:
+                self.remove(change.id)
+            else:
+                values = change.values
+                self.upsert(change.id, values["room_id"], values["check_in"],
+                            values["check_out"], values["status"])
+
+    async def ensure_current(self) -> int:
+        """Catch up with writes that no relay delivered; returns the number
+        of changes applied (-1 after a full reload)"""
+        now = time.monotonic()
+        if not self.ready or now - self._checked_at < AVAILABILITY_INDEX_CHECK_SECONDS:
+            return 0
+        self._checked_at = now
+        # Always the primary: a lagging replica would move the index backwards
+        async with open_session() as db:
+            version, pruned_through = await sync_state(db)
+            since = self.version
+            if version == since:
+                return 0
+            if since < pruned_through:
+                # Deletions since then are no longer known
+                await load_from(db, self)
+                return -1
+            changes = await changes_since(db, since)
+        self.apply_changes(changes)
+        self.version = max(self.version, version)
+        return len(changes)
+
+    def _is_stale(self, change: model_events.ModelChange) -> bool:
+        version = change.values.get("version") or 0
+        deleted = change.op == model_events.DELETED
+        with self._lock:
+            seen = self._versions.get(change.id)
+            # A delete carries the version of the row it removed
+            if seen is not None and (version < seen[0] or (version == seen[0] and seen[1])):
+                return True
+            self._versions[change.id] = (version, deleted)
+            return False
+
+
+def blocking_stays_query(room_ids=None, start: Optional[date] = None, end: Optional[date] = None):
+    """``(id, room_id, check_in, check_out)`` of blocking stays, optionally
+    only in ``room_ids`` and overlapping ``[start, end)``"""
+    query = select(
+        Reservation.id, Reservation.room_id, Reservation.check_in, Reservation.check_out
+    ).where(Reservation.status.in_(BLOCKING_STATUSES))
+    if room_ids is not None:
+        query = query.where(Reservation.room_id.in_(room_ids))
+    if start is not None:
+        query = query.where(Reservation.check_out > start)
+    if end is not None:
+        query = query.where(Reservation.check_in < end)
+    return query
+
+
+def free_rooms_query(
+    check_in: date,
+    check_out: date,
+    min_capacity: int = 1,
+    room_type: Optional[RoomType] = None,
+):
+    """Rooms matching the search with no blocking stay in [check_in, check_out),
+    for when the index is disabled"""
+    busy = select(Reservation.room_id).where(
+        Reservation.status.in_(BLOCKING_STATUSES),
+        Reservation.check_in < check_out,
+        Reservation.check_out > check_in,
+    )
+    query = select(Room).where(Room.capacity >= min_capacity, Room.id.not_in(busy))
+    if room_type is not None:
+        query = query.where(Room.room_type == room_type)
+    return query
+
+
+async def load_from(db, index: "AvailabilityIndex") -> int:
+    index.begin_load()
+    # Read first: anything committed meanwhile is at worst caught up twice
+    version, _ = await sync_state(db)
+    rooms = (await db.execute(select(Room.id, Room.capacity, Room.room_type))).all()
+    result = await db.execute(blocking_stays_query())
+    index.load((tuple(row) for row in result), [tuple(room) for room in rooms], version)
+    return len(index)
+
+
+async def rebuild(db) -> int:
+    """Reload the index from the database; returns the number of stays"""
+    return await load_from(db, availability_index)
+
+
+async def changes_since(db, since: int) -> List[model_events.ModelChange]:
+    """Rooms and reservations written after version ``since`` and the
+    deletions since then, as changes the index can apply"""
+    changes = [
+        model_events.ModelChange("room", model_events.UPDATED, row.id, dict(row._mapping))
+        for row in await db.execute(
+            select(Room.id, Room.capacity, Room.room_type, Room.version).where(Room.version > since)
+        )
+    ]
+    changes += [
+        model_events.ModelChange("reservation", model_events.UPDATED, row.id, dict(row._mapping))
+        for row in await db.execute(
+            select(
+                Reservation.id, Reservation.room_id, Reservation.check_in, Reservation.check_out,
+                Reservation.status, Reservation.version,
+            ).where(Reservation.version > since)
+        )
+    ]
+    # A tombstone is newer than the row it replaced, so it wins over that row
+    changes += [
+        model_events.ModelChange(row.model, model_events.DELETED, row.object_id, {"version": row.version})
+        for row in await db.execute(
+            select(Tombstone.model, Tombstone.object_id, Tombstone.version).where(Tombstone.version > since)
+        )
+    ]
+    return changes
+
+
+async def verify(db) -> dict:
+    """Compare the index with the database without changing either"""
+    result = await db.execute(blocking_stays_query())
+    expected = {row.id: Stay(row.room_id, row.check_in, row.check_out) for row in result}
+    indexed = availability_index.stays()
+    missing = sorted(set(expected) - set(indexed))
+    unexpected = sorted(set(indexed) - set(expected))
+    mismatched = sorted(
+        reservation_id for reservation_id in set(expected) & set(indexed)
+        if expected[reservation_id] != indexed[reservation_id]
+    )
+    grid_consistent = availability_index.grid_consistent()
+    return {
+        "consistent": not (missing or unexpected or mismatched) and grid_consistent,
+        "grid_consistent": grid_consistent,
+        "indexed": len(indexed),
+        "expected": len(expected),
+        "missing": missing,
+        "unexpected": unexpected,
+        "mismatched": mismatched,
+    }
+
+
+# Process-wide index
+availability_index = AvailabilityIndex()
+model_events.subscribe(availability_index.apply_changes, remote=True)
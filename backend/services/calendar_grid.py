@@ -0,0 +1,110 @@
+"""
+Rooms × days occupancy grid for the calendar.
+
+One query (rooms LEFT JOIN the blocking reservations overlapping the range),
+selecting plain columns only, ordered so each room's stays arrive sorted by
+check-in. Rows are run-length encoded while streaming through the result,
+and every reservation's details are emitted once and referenced by index.
+"""
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy import select, and_
+
+from models import Reservation, Room
+from services.availability_index import BLOCKING_STATUSES
+
+ROOM_COLUMNS = (Room.id, Room.number, Room.name, Room.room_type, Room.capacity, Room.floor)
+RESERVATION_COLUMNS = (
+    Reservation.id, Reservation.guest_name, Reservation.guest_company,
+    Reservation.check_in, Reservation.check_out, Reservation.status,
+    Reservation.breakfast_included, Reservation.total_price,
+)
+
+
+def grid_query(start_date: date, end_date: date):
+    # Stays occupying at least one night in [start_date, end_date]
+    return (
+        select(*ROOM_COLUMNS, *RESERVATION_COLUMNS)
+        .outerjoin(Reservation, and_(
+            Reservation.room_id == Room.id,
+            Reservation.status.in_(BLOCKING_STATUSES),
+            Reservation.check_in <= end_date,
+            Reservation.check_out > start_date,
+        ))
+        .order_by(Room.number, Room.id, Reservation.check_in)
+    )
+
+
+def build_grid(rows, start_date: date, end_date: date) -> dict:
+    """Assemble the grid payload from ``grid_query`` rows (positional)"""
+    days = (end_date - start_date).days + 1
+    start_ordinal = start_date.toordinal()
+    rooms: List[dict] = []
+    grid_rows: List[List[list]] = []
+    reservations: List[dict] = []
+    reservation_refs: Dict[str, int] = {}
+
+    current_room_id = None
+    runs: List[list] = []
+    cursor = 0
+
+    def close_row():
+        if current_room_id is not None:
+            if cursor < days:
+                runs.append([None, days - cursor])
+            grid_rows.append(runs)
+
+    # Plain tuple unpacking: much cheaper than attribute access on Row
+    for (room_id, number, name, room_type, capacity, floor,
+         res_id, guest_name, guest_company, check_in, check_out, res_status,
+         breakfast_included, total_price) in rows:
+        if room_id != current_room_id:
+            close_row()
+            current_room_id = room_id
+            runs, cursor = [], 0
+            rooms.append({
+                "id": room_id,
+                "number": number,
+                "name": name,
+                "room_type": room_type,
+                "capacity": capacity,
+                "floor": floor,
+            })
+        if res_id is None:
+            continue
+
+        ref = reservation_refs.get(res_id)
+        if ref is None:
+            ref = reservation_refs[res_id] = len(reservations)
+            reservations.append({
+                "id": res_id,
+                "room_id": room_id,
+                "guest_name": guest_name,
+                "guest_company": guest_company,
+                "check_in": check_in,
+                "check_out": check_out,
+                "status": res_status,
+                "breakfast_included": breakfast_included,
+                "total_price": total_price,
+            })
+
+        first = max(cursor, check_in.toordinal() - start_ordinal)
+        last = min(days, check_out.toordinal() - start_ordinal)
+        if last <= first:
+            # Entirely shadowed by an (inconsistent) overlapping stay
+            continue
+        if first > cursor:
+            runs.append([None, first - cursor])
+        runs.append([ref, last - first])
+        cursor = last
+    close_row()
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "rooms": rooms,
+        "rows": grid_rows,
+        "reservations": reservations,
+    }
@@ -0,0 +1,42 @@
+"""
+Version bookkeeping for delta sync (see models.change_log).
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy import select, delete, func, update
+
+from models import SyncVersion, Tombstone
+
+# How long deletions are remembered; clients that have not synced for longer
+# get a full snapshot instead of a delta
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+# Deltas bigger than this are answered with a full snapshot
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", "5000"))
+
+
+async def sync_state(db) -> Tuple[int, int]:
+    """(current version, pruned_through); both 0 before the first write"""
+    row = (await db.execute(
+        select(SyncVersion.value, SyncVersion.pruned_through).where(SyncVersion.id == 1)
+    )).first()
+    return (row.value, row.pruned_through) if row else (0, 0)
+
+
+async def prune_tombstones(db) -> int:
+    """Drop tombstones past the retention period; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    pruned_through = await db.scalar(
+        select(func.max(Tombstone.version)).where(Tombstone.deleted_at < cutoff)
+    )
+    if pruned_through is None:
+        return 0
+    result = await db.execute(delete(Tombstone).where(Tombstone.version <= pruned_through))
+    await db.execute(
+        update(SyncVersion)
+        .where(SyncVersion.id == 1)
+        .values(pruned_through=pruned_through)
+    )
+    await db.commit()
+    return result.rowcount
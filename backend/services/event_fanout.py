@@ -0,0 +1,216 @@
+"""
+Cross-worker relay of committed changes on one host.
+
+Every API worker binds a Unix datagram socket in a shared directory
+(EVENT_FANOUT_DIR). After a local commit the changes are serialized and sent
+to every other socket in that directory; on arrival they are dispatched to
+the ``remote=True`` subscribers of services.model_events, so process-local
+state (availability index, live update streams) follows writes made by any
+worker without a broker.
+
+Datagrams never block the sender: when a peer's receive buffer is full the
+message is dropped for that peer and logged (its derived state can then be
+checked and rebuilt through /api/admin). Sockets left behind by dead workers
+are removed on the first failed send.
+
+A change too large for one datagram (e.g. long reservation notes) is sent
+as a reference without its values; receivers load the row themselves before
+dispatching it.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import uuid
+from typing import List, Optional
+
+from database import DATABASE_URL, open_session
+from services import model_events
+
+EVENT_FANOUT = os.getenv("EVENT_FANOUT", "1") == "1" and hasattr(socket, "AF_UNIX")
+# Workers of one deployment must share this directory; the default is unique
+# per database so separate deployments on a host do not hear each other
+EVENT_FANOUT_DIR = os.getenv("EVENT_FANOUT_DIR") or os.path.join(
+    tempfile.gettempdir(),
+    "lobbylobster-events-" + hashlib.sha256(DATABASE_URL.encode()).hexdigest()[:12],
+)
+
+# Stay well below the default datagram limits; larger commits are split
+MAX_DATAGRAM_BYTES = 32 * 1024
+SOCKET_SUFFIX = ".sock"
+
+
+class EventFanout:
+    """Unix datagram relay between the API workers sharing ``directory``"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._receiver: Optional[socket.socket] = None
+        self._sender: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+        # Received datagrams that were truncated or did not parse
+        self.malformed = 0
+        self.reloaded = 0
+        self._reloads: set = set()
+
+    @property
+    def running(self) -> bool:
+        return self._receiver is not None
+
+    def start(self):
+        """Bind this worker's socket and start relaying (idempotent)"""
+        if self._receiver is not None:
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}{SOCKET_SUFFIX}")
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(self.path)
+        receiver.setblocking(False)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._receiver = receiver
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(receiver.fileno(), self._on_readable)
+        model_events.subscribe(self.publish)
+
+    def shutdown(self):
+        if self._receiver is None:
+            return
+        model_events.unsubscribe(self.publish)
+        self._loop.remove_reader(self._receiver.fileno())
+        self._receiver.close()
+        self._sender.close()
+        self._receiver = self._sender = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def peers(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.directory, name) for name in names
+            if name.endswith(SOCKET_SUFFIX) and os.path.join(self.directory, name) != self.path
+        ]
+
+    def publish(self, changes: List[model_events.ModelChange]):
+        """model_events subscriber (local commits only); safe from any thread"""
+        sender = self._sender
+        if sender is None:
+            return
+        peers = self.peers()
+        if not peers:
+            return
+        for datagram in _encode(changes):
+            for peer in peers:
+                try:
+                    sender.sendto(datagram, peer)
+                    self.sent += 1
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker gone without cleaning up
+                    try:
+                        os.unlink(peer)
+                    except OSError:
+                        pass
+                except OSError as e:
+                    # Full receive buffer (BlockingIOError) or similar
+                    self.dropped += 1
+                    print(f"⚠️  Change fan-out to {os.path.basename(peer)} dropped: {e}")
+
+    def _on_readable(self):
+        while True:
+            try:
+                datagram, _, flags, _ = self._receiver.recvmsg(MAX_DATAGRAM_BYTES * 2)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                if flags & socket.MSG_TRUNC:
+                    raise ValueError(f"truncated at {len(datagram)} bytes")
+                items = json.loads(datagram)
+                changes = [model_events.ModelChange.from_dict(item) for item in items]
+            except (ValueError, KeyError) as e:
+                self.malformed += 1
+                print(f"⚠️  Ignoring malformed change datagram: {e}")
+                continue
+            self.received += 1
+            if any(item.get("reload") for item in items):
+                task = self._loop.create_task(self._dispatch_reloaded(items, changes))
+                self._reloads.add(task)
+                task.add_done_callback(self._reloads.discard)
+            else:
+                model_events.dispatch(changes, remote=True)
+
+    async def _dispatch_reloaded(self, items: List[dict], changes: List[model_events.ModelChange]):
+        """Fill in the values of changes sent by reference, then dispatch"""
+        try:
+            complete = []
+            async with open_session() as db:
+                for item, change in zip(items, changes):
+                    if not item.get("reload") or change.op == model_events.DELETED:
+                        complete.append(change)
+                        continue
+                    obj = await db.get(model_events.MODELS_BY_NAME[change.model], change.id)
+                    if obj is None:
+                        # Deleted since; its own change says so
+                        continue
+                    self.reloaded += 1
+                    complete.append(model_events.ModelChange(
+                        change.model, change.op, change.id, model_events.column_values(obj),
+                    ))
+        except Exception as e:
+            self.malformed += 1
+            print(f"⚠️  Could not load relayed changes: {e}")
+            return
+        model_events.dispatch(complete, remote=True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "peers": len(self.peers()) if self.running else 0,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "malformed": self.malformed,
+            "reloaded": self.reloaded,
+        }
+
+
+def _encode(changes: List[model_events.ModelChange]) -> List[bytes]:
+    """Serialize changes into datagrams of at most MAX_DATAGRAM_BYTES"""
+    datagrams = []
+    batch: List[bytes] = []
+    size = 2
+    for change in changes:
+        item = _encode_item(change.to_dict())
+        if len(item) + 2 > MAX_DATAGRAM_BYTES:
+            # Too big on its own: send a reference; the version lets stale
+            # checks work before the row is loaded
+            item = _encode_item({
+                "model": change.model, "op": change.op, "id": change.id,
+                "values": {"version": change.values.get("version")}, "reload": True,
+            })
+        if batch and size + len(item) + 1 > MAX_DATAGRAM_BYTES:
+            datagrams.append(b"[" + b",".join(batch) + b"]")
+            batch, size = [], 2
+        batch.append(item)
+        size += len(item) + 1
+    if batch:
+        datagrams.append(b"[" + b",".join(batch) + b"]")
+    return datagrams
+
+
+def _encode_item(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+
+# Process-wide relay
+event_fanout = EventFanout(EVENT_FANOUT_DIR)
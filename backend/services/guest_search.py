@@ -0,0 +1,292 @@
+"""
+Guest autocomplete over name, email, phone and company.
+
+Candidates come from guest_stats (one row per guest) and its search index
+(models.guest_search), in up to three steps until enough are found:
+
+  1. name prefix: a range scan on the guest_stats primary key
+  2. substring: FTS5 trigram phrase (SQLite), pg_trgm-indexed LIKE
+     (PostgreSQL), plain LIKE elsewhere; needs 3+ characters
+  3. near misses: names sharing two trigrams with the query (SQLite) or
+     pg_trgm word similarity, so "jonh" still finds "John"
+
+Candidates are ranked in Python (name prefix, word prefix, substring, then
+similarity; recent guests first within a tier) and the contact details of
+each guest's latest stay are attached.
+
+Results are cached per process, LRU, GUEST_SEARCH_CACHE_SIZE entries (0
+disables). The cache is cleared on every committed reservation change,
+including changes relayed from other workers, and, as a backstop for writes
+no relay delivered (scripts, dropped datagrams), whenever the global change
+version has moved between two checks at most GUEST_SEARCH_CHECK_SECONDS
+apart.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text, and_, or_
+
+from models import Reservation, GuestStats
+from models.guest_search import SEARCH_TABLE, PG_SEARCH_TEXT, fold, search_backend
+from services import model_events
+from services.change_sync import sync_state
+
+GUEST_SEARCH_CACHE_SIZE = int(os.getenv("GUEST_SEARCH_CACHE_SIZE", "2048"))
+# How often (at most) the cache checks for writes it was not told about
+GUEST_SEARCH_CHECK_SECONDS = float(os.getenv("GUEST_SEARCH_CHECK_SECONDS", "5"))
+
+MIN_QUERY_LENGTH = 2
+# Candidates considered per requested result
+CANDIDATE_FACTOR = 5
+# Near misses below this similarity are not suggested
+MIN_SIMILARITY = 0.75
+# Query trigrams used to find near misses (pairs grow quadratically)
+FUZZY_TRIGRAMS = 8
+# Only name-like queries get near misses; digits and email fragments are
+# matched exactly
+NAME_LIKE = re.compile(r"[^\W\d_]+(?:[ '.-]+[^\W\d_]+)*[ '.-]*")
+
+# Returned for every suggestion, from the guest's latest reservation
+DETAIL_COLUMNS = (
+    Reservation.guest_name,
+    Reservation.guest_email,
+    Reservation.guest_phone,
+    Reservation.guest_address,
+    Reservation.guest_city,
+    Reservation.guest_postal_code,
+    Reservation.guest_country,
+    Reservation.guest_company,
+    Reservation.company_address,
+    Reservation.company_city,
+    Reservation.company_postal_code,
+    Reservation.company_country,
+)
+
+
+class SearchCache:
+    """LRU of query -> suggestions, emptied whenever guest data changes"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[Tuple[str, int], List[dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on invalidation so a search that raced a write is not stored
+        self.generation = 0
+        # Change version at the last check
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+
+    def get(self, key) -> Optional[List[dict]]:
+        with self._lock:
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+            return results
+
+    def put(self, key, results: List[dict], generation: int):
+        if self.size <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    async def ensure_current(self, db):
+        """Clear if the change version moved since the last check"""
+        now = time.monotonic()
+        if self.size <= 0 or now - self._checked_at < GUEST_SEARCH_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        version, _ = await sync_state(db)
+        if version != self.version:
+            if self.version is not None:
+                self.clear()
+            self.version = version
+
+    def on_changes(self, changes: List[model_events.ModelChange]):
+        """model_events subscriber"""
+        if any(change.model == "reservation" for change in changes):
+            self.clear()
+
+
+def _escape_like(value: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+def _fts_phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _prefix_candidates(conn, q: str, limit: int) -> List[str]:
+    # guest_key is the lowercased name; everything starting with q sorts
+    # between q and q followed by the highest code point
+    return list(conn.execute(
+        select(GuestStats.guest_key)
+        .where(GuestStats.guest_key >= q, GuestStats.guest_key < q + "\U0010ffff")
+        .order_by(GuestStats.guest_key)
+        .limit(limit)
+    ).scalars())
+
+
+def _substring_candidates(conn, backend: str, q: str, raw: str, limit: int) -> List[str]:
+    if backend == "fts5":
+        return list(conn.execute(
+            text(f"SELECT guest_key FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :phrase LIMIT :limit"),
+            {"phrase": _fts_phrase(q), "limit": limit},
+        ).scalars())
+    pattern = f"%{_escape_like(raw)}%"
+    if backend == "pg_trgm":
+        return list(conn.execute(
+            text(f"SELECT guest_key FROM guest_stats WHERE {PG_SEARCH_TEXT} LIKE :pattern LIMIT :limit"),
+            {"pattern": pattern, "limit": limit},
+        ).scalars())
+    return list(conn.execute(
+        select(GuestStats.guest_key).where(or_(
+            GuestStats.guest_name.ilike(pattern, escape="\\"),
+            GuestStats.guest_email.ilike(pattern, escape="\\"),
+            GuestStats.guest_phone.ilike(pattern, escape="\\"),
+            GuestStats.guest_company.ilike(pattern, escape="\\"),
+        )).limit(limit)
+    ).scalars())
+
+
+def _fuzzy_candidates(conn, backend: str, q: str, raw: str, limit: int) -> List[str]:
+    if backend == "fts5":
+        # A typo breaks the (up to three) trigrams around it; names sharing
+        # two of the query's trigrams are close enough to rank. Unranked
+        # MATCH stops at the limit instead of scoring every partial match.
+        trigrams = list(dict.fromkeys(q[i:i + 3] for i in range(len(q) - 2)))[:FUZZY_TRIGRAMS]
+        if len(trigrams) <= 3:
+            # Too short for two trigrams to survive a typo
+            terms = [_fts_phrase(t) for t in trigrams]
+        else:
+            terms = [
+                f"({_fts_phrase(a)} AND {_fts_phrase(b)})"
+                for i, a in enumerate(trigrams) for b in trigrams[i + 1:]
+            ]
+        return list(conn.execute(
+            text(f"SELECT guest_key FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query LIMIT :limit"),
+            {"query": "guest_name : (" + " OR ".join(terms) + ")", "limit": limit},
+        ).scalars())
+    if backend == "pg_trgm":
+        return list(conn.execute(
+            text(
+                f"SELECT guest_key FROM guest_stats WHERE :q <% {PG_SEARCH_TEXT} "
+                f"ORDER BY :q <<-> {PG_SEARCH_TEXT} LIMIT :limit"
+            ),
+            {"q": raw, "limit": limit},
+        ).scalars())
+    return []
+
+
+def _similarity(q: str, token: str) -> float:
+    """Shared characters between q and the start of token (0..1).
+
+    Ignores order; candidates already share two in-order trigrams with the
+    query, and this stays cheap enough to run on every one of them.
+    """
+    token = token[:len(q) + 1]
+    common = sum(min(q.count(c), token.count(c)) for c in set(q))
+    return 2 * common / (len(q) + len(token))
+
+
+def _rank(q: str, guest) -> Optional[tuple]:
+    """Sort key for a candidate, None when it is too far off to suggest"""
+    name = fold(guest.guest_name)
+    words = name.split()
+    recency = -(guest.last_visit.toordinal() if guest.last_visit else 0)
+    if name.startswith(q):
+        return (0, 0, recency)
+    if any(word.startswith(q) for word in words):
+        return (1, 0, recency)
+    others = (fold(guest.guest_email), fold(guest.guest_company))
+    digits = re.sub(r"\D", "", q)
+    if q in name or any(q in value for value in others) or (
+        len(digits) >= 3 and digits in re.sub(r"\D", "", guest.guest_phone or "")
+    ):
+        return (2, 0, recency)
+    tokens = words + [value.split("@")[0] for value in others if value]
+    similarity = max((_similarity(q, token) for token in tokens), default=0)
+    if similarity < MIN_SIMILARITY:
+        return None
+    return (3, -similarity, recency)
+
+
+def _details(conn, keys: List[str]) -> Dict[str, dict]:
+    """Contact details of each guest's most recent stay"""
+    rows = conn.execute(
+        select(Reservation.guest_key, Reservation.created_at, *DETAIL_COLUMNS)
+        .join(GuestStats, and_(
+            GuestStats.guest_key == Reservation.guest_key,
+            GuestStats.last_visit == Reservation.check_in,
+        ))
+        .where(GuestStats.guest_key.in_(keys))
+        .order_by(Reservation.created_at)
+    ).mappings()
+    details = {}
+    for row in rows:
+        # Ordered by creation, so the newest of same-day stays wins
+        details[row["guest_key"]] = {column.key: row[column.key] for column in DETAIL_COLUMNS}
+    return details
+
+
+def search(conn, query: str, limit: int = 10) -> List[dict]:
+    """Suggestions for ``query`` (sync; runs on a Connection)"""
+    q = fold(query).strip()
+    if len(q) < MIN_QUERY_LENGTH:
+        return []
+    raw = query.strip().lower()
+    backend = search_backend(conn)
+    wanted = limit * CANDIDATE_FACTOR
+
+    keys = _prefix_candidates(conn, raw, wanted)
+    if len(keys) < wanted and len(q) >= 3:
+        keys += _substring_candidates(conn, backend, q, raw, wanted)
+    if len(set(keys)) < limit and len(q) >= 4 and NAME_LIKE.fullmatch(q):
+        keys += _fuzzy_candidates(conn, backend, q, raw, wanted)
+    if not keys:
+        return []
+
+    guests = conn.execute(
+        select(
+            GuestStats.guest_key, GuestStats.guest_name, GuestStats.guest_email,
+            GuestStats.guest_phone, GuestStats.guest_company, GuestStats.last_visit,
+        ).where(GuestStats.guest_key.in_(set(keys)))
+    ).all()
+    ranked = sorted(
+        (rank, guest.guest_key) for guest in guests
+        if (rank := _rank(q, guest)) is not None
+    )[:limit]
+    chosen = [key for _, key in ranked]
+    details = _details(conn, chosen)
+    return [details[key] for key in chosen if key in details]
+
+
+async def search_guests(db, query: str, limit: int = 10) -> List[dict]:
+    """Cached ``search`` on a request session"""
+    key = (query.strip().lower(), limit)
+    await search_cache.ensure_current(db)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = search_cache.generation
+    results = await db.run_sync(lambda session: search(session.connection(), query, limit))
+    search_cache.put(key, results, generation)
+    return results
+
+
+# Process-wide cache
+search_cache = SearchCache(GUEST_SEARCH_CACHE_SIZE)
+model_events.subscribe(search_cache.on_changes, remote=True)
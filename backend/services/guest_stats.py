@@ -0,0 +1,78 @@
+"""
+Backfill and rebuild of the guest statistics table (models.guest_stats).
+
+The table is kept current by a flush hook on every reservation write. A full
+rebuild is only needed after upgrading a database that predates it, or
+after writes that bypassed the ORM (bulk ``query.delete()``, manual SQL). Both
+functions take a sync Connection inside a transaction
+(``with engine.begin() as conn``).
+"""
+from sqlalchemy import select, update, delete, bindparam
+
+from models import Reservation, GuestStats
+from models.guest_stats import guest_key, aggregate_rows, upsert_guest_stats
+from models.guest_search import fill_search_index
+
+BATCH_SIZE = 5000
+
+
+def needs_backfill(conn) -> bool:
+    """True while reservations exist that the statistics do not cover yet
+
+    (rows written before guest keys existed, or a database copied without
+    its statistics, e.g. by migrate_ids.py)
+    """
+    if conn.execute(
+        select(Reservation.id).where(Reservation.guest_key.is_(None)).limit(1)
+    ).first() is not None:
+        return True
+    return (
+        conn.execute(select(GuestStats.guest_key).limit(1)).first() is None
+        and conn.execute(select(Reservation.id).limit(1)).first() is not None
+    )
+
+
+def backfill_guest_keys(conn) -> int:
+    """Fill in guest_key on reservations written before it existed"""
+    table = Reservation.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("_id"))
+        .values(guest_key=bindparam("_key"))
+    )
+    filled = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.guest_name)
+            .where(table.c.guest_key.is_(None))
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return filled
+        conn.execute(statement, [{"_id": row.id, "_key": guest_key(row.guest_name)} for row in rows])
+        filled += len(rows)
+
+
+def rebuild(conn) -> int:
+    """Recompute every guest (and the search index) from scratch; returns the number of guests"""
+    backfill_guest_keys(conn)
+    conn.execute(delete(GuestStats.__table__))
+    result = conn.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(
+        select(
+            Reservation.guest_key, Reservation.guest_name, Reservation.guest_email,
+            Reservation.guest_phone, Reservation.guest_company,
+            Reservation.check_in, Reservation.check_out,
+        ).order_by(Reservation.guest_key, Reservation.check_in, Reservation.created_at)
+    )
+    # Rows arrive grouped by guest, so memory stays at one batch
+    guests = 0
+    batch = []
+    for row in aggregate_rows(result):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            upsert_guest_stats(conn, batch)
+            guests += len(batch)
+            batch = []
+    upsert_guest_stats(conn, batch)
+    fill_search_index(conn)
+    return guests + len(batch)
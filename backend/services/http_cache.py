@@ -0,0 +1,187 @@
+"""
+HTTP caching for read endpoints: strong ETags, conditional GETs, compression.
+
+ETags are derived from change versions (see models.change_log) rather than
+from the body, so a route can answer ``If-None-Match`` with 304 after one
+small query, before loading or serializing anything:
+
+- a single room or reservation: its own version;
+- the room list: number of rooms and their highest version, as tracked by
+  services.room_catalog;
+- calendar views: the global change version, which every room and
+  reservation write (deletions included) moves forward.
+
+CompressionMiddleware gzip- or brotli-compresses JSON bodies of at least
+HTTP_COMPRESS_MIN_BYTES. Brotli needs ``pip install brotli``; without it
+clients get gzip. A compressed body is a different representation, so its
+ETag gets an encoding suffix, which etag_matches ignores when comparing.
+Streamed bodies (exports, live events) are passed through as they are.
+"""
+import gzip
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from models import SyncVersion
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Compress JSON bodies from this size on (0 disables compression)
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+# Seconds clients may reuse a cached read without asking; 0 means they
+# revalidate every time (cheap: a 304 carries no body)
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+
+GZIP_LEVEL = 6
+# Brotli quality 5 compresses better than gzip -6 at a similar speed
+BROTLI_QUALITY = 5
+# Bodies this large are compressed in the threadpool (a 7 MB calendar takes
+# about 100 ms), so the event loop is not held up
+THREADPOOL_COMPRESS_BYTES = 256 * 1024
+COMPRESSIBLE_TYPES = ("application/json",)
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def cache_control() -> str:
+    if HTTP_CACHE_MAX_AGE > 0:
+        return f"private, max-age={HTTP_CACHE_MAX_AGE}"
+    return "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values a representation depends on"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches ``etag``"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        for suffix in ENCODING_SUFFIXES:
+            if candidate.endswith(f'{suffix}"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+                break
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the client already has ``etag``, else None"""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=validators(etag))
+    return None
+
+
+def validators(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control()}
+
+
+def tag(response: Response, etag: str) -> Response:
+    response.headers.update(validators(etag))
+    return response
+
+
+async def change_version(db) -> int:
+    """Global change version; moves on every room or reservation write"""
+    return await db.scalar(select(SyncVersion.value).where(SyncVersion.id == 1)) or 0
+
+
+async def row_version(db, model, object_id: str) -> Optional[int]:
+    """Version of one room or reservation, None if it does not exist"""
+    return await db.scalar(select(model.version).where(model.id == object_id))
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Compresses whole (non-streamed) JSON responses the client accepts"""
+
+    def __init__(self, app, minimum_size: int = HTTP_COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size <= 0:
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = _accepted_encoding(accept_encoding)
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if not content_type.startswith(COMPRESSIBLE_TYPES) or b"content-encoding" in headers:
+                    await send(message)
+                    return
+                # Hold the start until the body shows whether it is worth compressing
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            headers = list(start.get("headers", []))
+            headers.append((b"vary", b"Accept-Encoding"))
+            body = message.get("body", b"")
+            if encoding is not None and not message.get("more_body", False) and len(body) >= self.minimum_size:
+                if len(body) >= THREADPOOL_COMPRESS_BYTES:
+                    body = await run_in_threadpool(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers = [
+                    (name, _with_suffix(value, encoding) if name == b"etag" else value)
+                    for name, value in headers if name != b"content-length"
+                ]
+                headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+                message = {**message, "body": body}
+            await send({**start, "headers": headers})
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _with_suffix(etag: bytes, encoding: str) -> bytes:
+    if etag.endswith(b'"'):
+        return etag[:-1] + f'-{encoding}"'.encode()
+    return etag
@@ -0,0 +1,141 @@
+"""
+Content-addressed on-disk cache for rendered invoice PDFs.
+
+The key is a hash of everything that ends up on the invoice (the
+InvoiceSnapshot, including the reservation's updated_at) plus the template
+version, so an unchanged reservation always maps to the same file and any
+edit produces a new key. The key doubles as the HTTP ETag.
+
+Size is bounded: when the directory grows past INVOICE_CACHE_MAX_BYTES the
+least recently used files are removed until it is back under the low-water
+mark. Recency is the file mtime, which is bumped on every hit, so several
+workers sharing the directory agree on it. Since any worker may evict a file
+at any moment, callers get the PDF bytes rather than a path to send later.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from services.invoice_pdf import INVOICE_TEMPLATE_VERSION, InvoiceSnapshot
+
+INVOICE_CACHE_DIR = os.getenv("INVOICE_CACHE_DIR", "./invoice_cache")
+# 0 disables the cache
+INVOICE_CACHE_MAX_BYTES = int(os.getenv("INVOICE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Eviction trims the cache down to this fraction of the maximum
+INVOICE_CACHE_LOW_WATER = 0.8
+
+
+def invoice_cache_key(snapshot: InvoiceSnapshot) -> str:
+    """Stable content hash of an invoice snapshot"""
+    payload = json.dumps(
+        {"template": INVOICE_TEMPLATE_VERSION, **dataclasses.asdict(snapshot)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class InvoiceCache:
+    """Size-bounded directory of PDFs named by their content key"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Approximate size of the directory; recomputed on every eviction pass
+        self._total_bytes: Optional[int] = None
+        # put() runs in threadpool workers
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Cached PDF for ``key``, or None on a miss"""
+        return await run_in_threadpool(self._get, key)
+
+    async def put(self, key: str, pdf_bytes: bytes):
+        """Store a rendered PDF"""
+        await run_in_threadpool(self._put, key, pdf_bytes)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            # Mark as recently used
+            os.utime(path)
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _put(self, key: str, pdf_bytes: bytes):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see partial PDFs
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(pdf_bytes)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(mtime, size, path) for every cached PDF"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Drop least recently used PDFs until under the low-water mark
+        (caller holds the lock)"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * INVOICE_CACHE_LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total_bytes = total
+
+
+# Process-wide cache instance
+invoice_cache = InvoiceCache(INVOICE_CACHE_DIR, INVOICE_CACHE_MAX_BYTES)
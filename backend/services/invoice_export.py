@@ -0,0 +1,173 @@
+"""
+Bulk invoice export as a streamed ZIP archive.
+
+Invoices are rendered by a small set of export workers sharing the global
+invoice renderer, and every finished PDF is written into the archive as soon
+as it is ready, so the first bytes reach the client while later invoices are
+still rendering. Memory stays bounded: finished results wait in a queue
+no longer than the number of workers, so at most that many PDFs are held at
+once. Because every rendered PDF lands in the
+cache, a client that drops out halfway can simply retry and the already
+rendered invoices are served from disk.
+
+A ``manifest.csv`` at the end of the archive lists every requested invoice
+and whether it made it into the archive.
+"""
+import asyncio
+import csv
+import io
+import zipfile
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from services.invoice_cache import invoice_cache, invoice_cache_key
+from services.invoice_pdf import InvoiceSnapshot
+from services.invoice_renderer import invoice_renderer, RendererBusy
+
+# Seconds to back off when interactive invoice requests keep the renderer full
+EXPORT_BUSY_BACKOFF = 0.5
+EXPORT_BUSY_RETRIES = 20
+
+
+class _ZipSink:
+    """Write-only, non-seekable file object that hands out what was written.
+
+    ZipFile falls back to data descriptors for non-seekable outputs, which is
+    exactly what makes the archive streamable.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._buffer.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+@dataclass
+class _ExportResult:
+    snapshot: InvoiceSnapshot
+    arcname: str
+    pdf_bytes: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+async def _render(snapshot: InvoiceSnapshot) -> bytes:
+    """Render through the shared renderer, waiting out short busy spells"""
+    for _ in range(EXPORT_BUSY_RETRIES):
+        try:
+            return await invoice_renderer.render(snapshot)
+        except RendererBusy:
+            await asyncio.sleep(EXPORT_BUSY_BACKOFF)
+    return await invoice_renderer.render(snapshot)
+
+
+async def _produce(snapshot: InvoiceSnapshot, arcname: str) -> _ExportResult:
+    result = _ExportResult(snapshot=snapshot, arcname=arcname)
+    try:
+        key = invoice_cache_key(snapshot)
+        if invoice_cache.enabled:
+            result.pdf_bytes = await invoice_cache.get(key)
+        if result.pdf_bytes is None:
+            result.pdf_bytes = await _render(snapshot)
+            if invoice_cache.enabled:
+                await invoice_cache.put(key, result.pdf_bytes)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _manifest(results: List[_ExportResult]) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["reservation_id", "guest_name", "check_in", "check_out", "file", "status"])
+    for r in results:
+        writer.writerow([
+            r.snapshot.id,
+            r.snapshot.guest_name,
+            r.snapshot.check_in.isoformat(),
+            r.snapshot.check_out.isoformat(),
+            r.arcname if r.error is None else "",
+            "ok" if r.error is None else r.error,
+        ])
+    return out.getvalue().encode()
+
+
+def archive_entries(snapshots: List[InvoiceSnapshot], filename) -> List[tuple]:
+    """``(snapshot, arcname)`` pairs with names unique within the archive.
+
+    Names start with the full reservation id (UUIDv7 prefixes are just the
+    creation time), and a repeated name gets a counter, since extraction
+    would otherwise keep only one of the files.
+    """
+    entries, seen = [], set()
+    for snapshot in snapshots:
+        base = f"{snapshot.id}_{filename(snapshot)}"
+        arcname, n = base, 1
+        while arcname in seen:
+            n += 1
+            stem, dot, ext = base.rpartition(".")
+            arcname = f"{stem}_{n}.{ext}" if dot else f"{base}_{n}"
+        seen.add(arcname)
+        entries.append((snapshot, arcname))
+    return entries
+
+
+async def stream_invoice_zip(
+    entries: List[tuple],
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Yield a ZIP archive of ``(snapshot, arcname)`` invoices chunk by chunk"""
+    concurrency = max(1, min(concurrency or invoice_renderer.workers, len(entries) or 1))
+    pending: asyncio.Queue = asyncio.Queue()
+    for entry in entries:
+        pending.put_nowait(entry)
+    # Small queue: workers stall instead of piling up results for a slow client
+    finished: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def worker():
+        while True:
+            try:
+                snapshot, arcname = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await finished.put(await _produce(snapshot, arcname))
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    sink = _ZipSink()
+    zf = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    results = []
+    try:
+        for _ in range(len(entries)):
+            result = await finished.get()
+            results.append(result)
+            if result.error is not None:
+                continue
+            await run_in_threadpool(zf.writestr, result.arcname, result.pdf_bytes)
+            result.pdf_bytes = None
+            yield sink.drain()
+
+        zf.writestr("manifest.csv", _manifest(results))
+        zf.close()
+        yield sink.drain()
+    finally:
+        # Client went away (or we are done): stop rendering the rest
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,391 @@
+"""
+Invoice PDF rendering.
+
+Kept free of database/ORM imports: this module is loaded by the invoice
+render worker processes, which only ever see plain InvoiceSnapshot objects.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from io import BytesIO
+from typing import Optional
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+# Bump whenever the invoice layout changes so cached PDFs are not reused
+INVOICE_TEMPLATE_VERSION = 4
+
+# Invoices are the only PDFs rendered here: write binary streams and skip the
+# ASCII85 pass over every compressed stream
+rl_config.useA85 = 0
+
+
+@dataclass(frozen=True)
+class InvoiceSnapshot:
+    """Plain, picklable copy of everything an invoice needs from a reservation"""
+    id: str
+    status: str
+    guest_name: str
+    room_number: str
+    room_name: str
+    check_in: date
+    check_out: date
+    guest_email: Optional[str] = None
+    guest_phone: Optional[str] = None
+    guest_address: Optional[str] = None
+    guest_city: Optional[str] = None
+    guest_postal_code: Optional[str] = None
+    guest_country: Optional[str] = None
+    guest_company: Optional[str] = None
+    company_address: Optional[str] = None
+    company_city: Optional[str] = None
+    company_postal_code: Optional[str] = None
+    company_country: Optional[str] = None
+    price_per_night: Optional[float] = None
+    breakfast_included: Optional[bool] = None
+    total_price: Optional[float] = None
+    payment_method: Optional[str] = None
+    notes: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_reservation(cls, reservation) -> "InvoiceSnapshot":
+        """Copy a Reservation (with its room loaded) into a snapshot"""
+        return cls(
+            id=reservation.id,
+            status=_enum_value(reservation.status),
+            guest_name=reservation.guest_name,
+            room_number=reservation.room.number,
+            room_name=reservation.room.name,
+            check_in=reservation.check_in,
+            check_out=reservation.check_out,
+            guest_email=reservation.guest_email,
+            guest_phone=reservation.guest_phone,
+            guest_address=reservation.guest_address,
+            guest_city=reservation.guest_city,
+            guest_postal_code=reservation.guest_postal_code,
+            guest_country=reservation.guest_country,
+            guest_company=reservation.guest_company,
+            company_address=reservation.company_address,
+            company_city=reservation.company_city,
+            company_postal_code=reservation.company_postal_code,
+            company_country=reservation.company_country,
+            price_per_night=reservation.price_per_night,
+            breakfast_included=reservation.breakfast_included,
+            total_price=reservation.total_price,
+            payment_method=_enum_value(reservation.payment_method),
+            notes=reservation.notes,
+            updated_at=reservation.updated_at,
+        )
+
+
+def _enum_value(value):
+    """Plain string for an enum member (None stays None)"""
+    return getattr(value, "value", value)
+
+
+class InvoiceTemplate:
+    """Everything about the invoice layout that does not depend on the data.
+
+    Styles, table styles and page geometry are built once and reused for
+    every invoice rendered by this process; the hotel header and the footer
+    are drawn straight onto each page instead of going through the flowable
+    layout. Typical invoices fit on one page and take a fast path that stacks
+    the flowables directly onto a canvas; anything taller (long notes) goes
+    through the full platypus document build.
+    """
+
+    PAGE_WIDTH, PAGE_HEIGHT = A4
+    MARGIN = 20*mm
+    # Space reserved above the body for the hotel header
+    HEADER_HEIGHT = 24 + 18
+    # Space reserved below the body for the footer
+    FOOTER_HEIGHT = 24
+    # Gap after each section
+    SECTION_GAP = 16
+
+    TITLE = "🦞 LobbyLobster Hotel"
+    TITLE_COLOR = colors.HexColor('#E63946')
+    ACCENT_COLOR = colors.HexColor('#1D3557')
+    LABEL_COLOR = colors.HexColor('#666666')
+
+    PAYMENT_LABELS = {
+        'CASH': 'Cash',
+        'DEBIT_CARD': 'Debit Card',
+        'CREDIT_CARD': 'Credit Card',
+        'INVOICE': 'Invoice (will be sent by post)'
+    }
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+        self.header_style = ParagraphStyle(
+            'CustomHeader',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=self.ACCENT_COLOR,
+            spaceBefore=6,
+            spaceAfter=6,
+            keepWithNext=1,
+        )
+
+        # Body frame between header and footer
+        self.frame_x = self.MARGIN
+        self.frame_y = self.MARGIN + self.FOOTER_HEIGHT
+        self.frame_width = self.PAGE_WIDTH - 2 * self.MARGIN
+        self.frame_height = self.PAGE_HEIGHT - 2 * self.MARGIN - self.HEADER_HEIGHT - self.FOOTER_HEIGHT
+
+        # Table styles
+        self.info_table_style = TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (0, -1), self.LABEL_COLOR),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ])
+        self.guest_table_style = TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('TEXTCOLOR', (0, 0), (0, -1), self.LABEL_COLOR),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.company_table_style = TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.charges_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), self.ACCENT_COLOR),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ])
+        self.total_table_style = TableStyle([
+            ('ALIGN', (2, 0), (-1, 0), 'RIGHT'),
+            ('FONTNAME', (2, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (2, 0), (-1, 0), 12),
+            ('TEXTCOLOR', (2, 0), (-1, 0), self.TITLE_COLOR),
+            ('LINEABOVE', (2, 0), (-1, 0), 2, self.ACCENT_COLOR),
+            ('TOPPADDING', (2, 0), (-1, 0), 12),
+        ])
+        self.payment_table_style = TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F1FAEE')),
+            ('BOX', (0, 0), (-1, -1), 1, self.ACCENT_COLOR),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+        ])
+
+    def draw_page(self, canvas, issued_at: datetime):
+        """Static hotel header and footer"""
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 24)
+        canvas.setFillColor(self.TITLE_COLOR)
+        canvas.drawCentredString(self.PAGE_WIDTH / 2, self.PAGE_HEIGHT - self.MARGIN - 24, self.TITLE)
+
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawCentredString(self.PAGE_WIDTH / 2, self.MARGIN + 12,
+                                 "Thank you for staying at LobbyLobster Hotel!")
+        canvas.drawCentredString(self.PAGE_WIDTH / 2, self.MARGIN + 2,
+                                 "Issued on " + issued_at.strftime('%Y-%m-%d %H:%M'))
+        canvas.restoreState()
+
+    def flowables(self, reservation: InvoiceSnapshot, issued_at: datetime) -> list:
+        """Body of the invoice for one reservation"""
+        header_style = self.header_style
+        elements = []
+
+        # Invoice title
+        elements.append(Paragraph("INVOICE", header_style))
+        elements.append(Spacer(1, 6))
+
+        # Invoice info table
+        invoice_data = [
+            ['Invoice Date:', issued_at.strftime('%B %d, %Y')],
+            ['Reservation ID:', reservation.id],
+            ['Status:', reservation.status],
+        ]
+        elements.append(Table(invoice_data, colWidths=[50*mm, 80*mm], style=self.info_table_style))
+        elements.append(Spacer(1, self.SECTION_GAP))
+
+        # Guest information
+        elements.append(Paragraph("Guest Information", header_style))
+        guest_info = [
+            ['Name:', reservation.guest_name],
+        ]
+        if reservation.guest_company:
+            guest_info.append(['Company:', reservation.guest_company])
+        if reservation.guest_email:
+            guest_info.append(['Email:', reservation.guest_email])
+        if reservation.guest_phone:
+            guest_info.append(['Phone:', reservation.guest_phone])
+
+        address_parts = _address_lines(
+            reservation.guest_address, reservation.guest_postal_code,
+            reservation.guest_city, reservation.guest_country,
+        )
+        if address_parts:
+            guest_info.append(['Address:', '\n'.join(address_parts)])
+
+        elements.append(Table(guest_info, colWidths=[50*mm, 120*mm], style=self.guest_table_style))
+        elements.append(Spacer(1, self.SECTION_GAP))
+
+        # Company address (if provided)
+        if reservation.guest_company and (reservation.company_address or reservation.company_city):
+            elements.append(Paragraph("Company Address", header_style))
+            company_address_parts = _address_lines(
+                reservation.company_address, reservation.company_postal_code,
+                reservation.company_city, reservation.company_country,
+            )
+            elements.append(Table([['', '\n'.join(company_address_parts)]], colWidths=[50*mm, 120*mm],
+                                  style=self.company_table_style))
+            elements.append(Spacer(1, self.SECTION_GAP))
+
+        # Stay details
+        nights = (reservation.check_out - reservation.check_in).days
+        elements.append(Paragraph("Stay Details", header_style))
+        stay_data = [
+            ['Room:', f"{reservation.room_number} - {reservation.room_name}"],
+            ['Check-in:', reservation.check_in.strftime('%B %d, %Y')],
+            ['Check-out:', reservation.check_out.strftime('%B %d, %Y')],
+            ['Nights:', str(nights)],
+        ]
+        elements.append(Table(stay_data, colWidths=[50*mm, 80*mm], style=self.info_table_style))
+        elements.append(Spacer(1, self.SECTION_GAP))
+
+        # Pricing breakdown
+        elements.append(Paragraph("Charges", header_style))
+        price_per_night = reservation.price_per_night or 0
+        room_total = price_per_night * nights
+        charges_data = [
+            ['Description', 'Quantity', 'Unit Price', 'Amount'],
+            [
+                f'Room {reservation.room_number}',
+                f'{nights} nights',
+                f'€{price_per_night:.2f}',
+                f'€{room_total:.2f}'
+            ],
+        ]
+        if reservation.breakfast_included:
+            charges_data.append(['Breakfast (included)', '', '', 'Included'])
+        elements.append(Table(charges_data, colWidths=[60*mm, 30*mm, 30*mm, 30*mm],
+                              style=self.charges_table_style))
+        elements.append(Spacer(1, 12))
+
+        # Total
+        total_price = reservation.total_price or room_total
+        elements.append(Table([['', '', 'TOTAL:', f'€{total_price:.2f}']],
+                              colWidths=[60*mm, 30*mm, 30*mm, 30*mm], style=self.total_table_style))
+        elements.append(Spacer(1, self.SECTION_GAP))
+
+        # Payment method
+        if reservation.payment_method:
+            elements.append(Paragraph("Payment Method", header_style))
+            payment_text = self.PAYMENT_LABELS.get(reservation.payment_method, reservation.payment_method)
+            elements.append(Table([[payment_text]], colWidths=[170*mm], style=self.payment_table_style))
+            elements.append(Spacer(1, self.SECTION_GAP))
+
+        # Notes
+        if reservation.notes:
+            elements.append(Paragraph("Notes", header_style))
+            elements.append(Paragraph(reservation.notes, self.normal_style))
+            elements.append(Spacer(1, self.SECTION_GAP))
+
+        return elements
+
+    def render(self, reservation: InvoiceSnapshot, fast_path: bool = True) -> bytes:
+        """Render one invoice to PDF bytes.
+
+        The output depends on the snapshot alone (no wall clock, no random
+        document id), so equal cache keys and ETags mean identical bytes.
+        """
+        # Last change to the reservation, else its check-out
+        issued_at = reservation.updated_at or datetime.combine(reservation.check_out, time())
+        elements = self.flowables(reservation, issued_at)
+        buffer = BytesIO()
+
+        if fast_path:
+            canvas = Canvas(buffer, pagesize=A4, invariant=1)
+            if self._draw_single_page(canvas, elements):
+                self.draw_page(canvas, issued_at)
+                canvas.showPage()
+                canvas.save()
+                return buffer.getvalue()
+            # Too tall for one page: lay it out properly
+            buffer = BytesIO()
+
+        doc = BaseDocTemplate(buffer, pagesize=A4, leftMargin=self.MARGIN, rightMargin=self.MARGIN,
+                              topMargin=self.MARGIN, bottomMargin=self.MARGIN, invariant=1)
+        frame = Frame(self.frame_x, self.frame_y, self.frame_width, self.frame_height,
+                      leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+        doc.addPageTemplates([PageTemplate(
+            frames=[frame],
+            onPage=lambda canvas, doc: self.draw_page(canvas, issued_at),
+        )])
+        doc.build(elements)
+        return buffer.getvalue()
+
+    def _draw_single_page(self, canvas, elements: list) -> bool:
+        """Stack the flowables top-down into the body frame.
+
+        Measures everything first and draws nothing unless it all fits, so a
+        False return leaves the canvas untouched.
+        """
+        placed = []
+        y = self.frame_y + self.frame_height
+        for i, flowable in enumerate(elements):
+            if i:
+                y -= flowable.getSpaceBefore()
+            width, height = flowable.wrapOn(canvas, self.frame_width, self.frame_height)
+            y -= height
+            if y < self.frame_y:
+                return False
+            placed.append((flowable, y, width))
+            y -= flowable.getSpaceAfter()
+
+        for flowable, y, width in placed:
+            # _sW lets the flowable apply its own hAlign, as a Frame would
+            flowable.drawOn(canvas, self.frame_x, y, _sW=self.frame_width - width)
+        return True
+
+
+def _address_lines(street, postal_code, city, country) -> list:
+    """Non-empty address lines: street, 'postal, city', country"""
+    lines = []
+    if street:
+        lines.append(street)
+    city_postal = ', '.join(filter(None, [postal_code, city]))
+    if city_postal:
+        lines.append(city_postal)
+    if country:
+        lines.append(country)
+    return lines
+
+
+_template: Optional[InvoiceTemplate] = None
+
+
+def get_invoice_template() -> InvoiceTemplate:
+    """The process-wide invoice template, built on first use"""
+    global _template
+    if _template is None:
+        _template = InvoiceTemplate()
+    return _template
+
+
+def generate_invoice_pdf(reservation: InvoiceSnapshot) -> bytes:
+    """Generate PDF invoice from a reservation snapshot"""
+    return get_invoice_template().render(reservation)
@@ -0,0 +1,129 @@
+"""
+Off-loop invoice rendering.
+
+ReportLab layout is CPU-bound and holds the GIL, so invoices are rendered in
+a worker pool instead of on the event loop. The number of renders in flight
+(running + waiting) is bounded; past that limit callers get RendererBusy right
+away instead of piling up behind a checkout burst.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from services.invoice_pdf import InvoiceSnapshot, generate_invoice_pdf
+
+# "process" scales with cores; "thread" is for platforms where worker
+# processes are unavailable (still keeps the event loop free)
+INVOICE_RENDER_BACKEND = os.getenv("INVOICE_RENDER_BACKEND", "process").lower()
+INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", "0")) or (os.cpu_count() or 1)
+# Renders allowed to wait for a free worker before new requests are rejected
+INVOICE_RENDER_QUEUE_SIZE = int(os.getenv("INVOICE_RENDER_QUEUE_SIZE", "32"))
+# Seconds a single render may take (including queue wait)
+INVOICE_RENDER_TIMEOUT = float(os.getenv("INVOICE_RENDER_TIMEOUT", "30"))
+
+
+class RendererBusy(Exception):
+    """Raised when the render queue is full"""
+
+
+class RenderTimeout(Exception):
+    """Raised when a render does not finish within the timeout"""
+
+
+class InvoiceRenderer:
+    """Bounded worker pool that turns InvoiceSnapshots into PDF bytes"""
+
+    def __init__(
+        self,
+        backend: str = "process",
+        workers: int = 1,
+        queue_size: int = 32,
+        timeout: float = 30.0,
+    ):
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Unknown invoice render backend {backend!r}")
+        self.backend = backend
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        # Slots are released from executor callbacks, off the event loop
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "InvoiceRenderer":
+        return cls(
+            backend=INVOICE_RENDER_BACKEND,
+            workers=INVOICE_RENDER_WORKERS,
+            queue_size=INVOICE_RENDER_QUEUE_SIZE,
+            timeout=INVOICE_RENDER_TIMEOUT,
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Maximum renders running or waiting at once"""
+        return self.workers + self.queue_size
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self):
+        """Create the worker pool (idempotent)"""
+        if self._executor is not None:
+            return
+        if self.backend == "process":
+            # spawn: forking a process that already runs event loop and
+            # driver threads is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="invoice-render"
+            )
+
+    def shutdown(self):
+        """Stop the worker pool, dropping renders that have not started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, snapshot: InvoiceSnapshot) -> bytes:
+        """Render one invoice in the pool"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                raise RendererBusy(f"{self._in_flight} invoices already rendering")
+            self._in_flight += 1
+        try:
+            self.start()
+            job = self._executor.submit(generate_invoice_pdf, snapshot)
+        except BaseException:
+            self._release()
+            raise
+        # The slot belongs to the job, not to this request: a timed-out or
+        # disconnected caller cannot stop a render that is already running,
+        # so the slot is freed only once the worker is done with it
+        job.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise RenderTimeout(f"Invoice {snapshot.id} not rendered within {self.timeout:g}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM killed); start over with a fresh pool
+            self.shutdown()
+            raise
+
+    def _release(self, job=None):
+        with self._lock:
+            self._in_flight -= 1
+
+# Process-wide renderer, started/stopped by the app lifespan
+invoice_renderer = InvoiceRenderer.from_env()
@@ -0,0 +1,156 @@
+"""
+Live change feed for dashboards.
+
+Committed room and reservation writes (local, and relayed from other workers
+by services.event_fanout) are collected for LIVE_COALESCE_MS and merged per
+object, so a burst of edits to one reservation becomes a single event. Each
+merged batch is offered to every connected client's bounded queue; a client
+whose queue is full is disconnected instead of buffering without limit or
+slowing everyone else down. Clients reconnect and catch up through
+``/api/reservations/calendar/changes`` with the version they last saw.
+
+Events carry what changed (model, op, id, version), not the full rows.
+"""
+import asyncio
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from services import model_events
+
+# Window in which changes to the same object are merged into one event
+LIVE_COALESCE_MS = int(os.getenv("LIVE_COALESCE_MS", "100"))
+# Event batches a client may fall behind before it is disconnected
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))
+# Open streams per worker
+LIVE_MAX_CLIENTS = int(os.getenv("LIVE_MAX_CLIENTS", "500"))
+
+
+class TooManyClients(Exception):
+    """Raised when LIVE_MAX_CLIENTS streams are already open"""
+
+
+class LiveClient:
+    """One connected stream"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Set when the client fell behind; the stream ends after this
+        self.dropped = False
+
+
+def _merge(previous: Optional[str], op: str) -> Optional[str]:
+    """Combined op of two consecutive changes to one object (None: cancel out)"""
+    if previous is None:
+        return op
+    if previous == model_events.CREATED:
+        return None if op == model_events.DELETED else model_events.CREATED
+    return op
+
+
+class LiveUpdates:
+    """Coalescing broadcaster from model_events to connected clients"""
+
+    def __init__(self, coalesce_ms: int = 100, queue_size: int = 64, max_clients: int = 500):
+        self.coalesce = coalesce_ms / 1000
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._clients: Set[LiveClient] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # (model, id) -> [op, version], in first-seen order
+        self._pending: Dict[Tuple[str, str], list] = {}
+        self._flush_scheduled = False
+        self.dropped_clients = 0
+
+    def start(self):
+        """Start feeding clients from committed changes (idempotent)"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        model_events.subscribe(self.on_changes, remote=True)
+
+    def shutdown(self):
+        model_events.unsubscribe(self.on_changes)
+        for client in list(self._clients):
+            self._close(client)
+        self._loop = None
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def connect(self) -> LiveClient:
+        if len(self._clients) >= self.max_clients:
+            raise TooManyClients()
+        client = LiveClient(self.queue_size)
+        self._clients.add(client)
+        return client
+
+    def disconnect(self, client: LiveClient):
+        self._clients.discard(client)
+
+    def on_changes(self, changes: List[model_events.ModelChange]):
+        """model_events subscriber; may run in a threadpool thread"""
+        loop = self._loop
+        if loop is None:
+            return
+        with self._lock:
+            for change in changes:
+                key = (change.model, change.id)
+                entry = self._pending.get(key)
+                op = _merge(entry[0] if entry else None, change.op)
+                if op is None:
+                    del self._pending[key]
+                elif entry:
+                    entry[0], entry[1] = op, change.values.get("version")
+                else:
+                    self._pending[key] = [op, change.values.get("version")]
+            if self._flush_scheduled or not self._pending:
+                return
+            self._flush_scheduled = True
+        try:
+            loop.call_soon_threadsafe(loop.call_later, self.coalesce, self._flush)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            pass
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        if not pending:
+            return
+        batch = [
+            {"model": model, "op": op, "id": object_id, "version": version}
+            for (model, object_id), (op, version) in pending.items()
+        ]
+        for client in list(self._clients):
+            try:
+                client.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                self._drop(client)
+
+    def _drop(self, client: LiveClient):
+        """Disconnect a client that cannot keep up"""
+        client.dropped = True
+        self.dropped_clients += 1
+        self._close(client)
+
+    def _close(self, client: LiveClient):
+        self._clients.discard(client)
+        # Wake the stream so it notices; make room for the marker if needed
+        while True:
+            try:
+                client.queue.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                client.queue.get_nowait()
+
+
+# Process-wide broadcaster
+live_updates = LiveUpdates(
+    coalesce_ms=LIVE_COALESCE_MS,
+    queue_size=LIVE_QUEUE_SIZE,
+    max_clients=LIVE_MAX_CLIENTS,
+)
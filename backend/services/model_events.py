@@ -0,0 +1,156 @@
+"""
+Committed-change notifications for rooms and reservations.
+
+Every ORM write to a Room or Reservation is recorded when the session flushes
+and handed to subscribers once the transaction commits (and dropped if it
+rolls back). This is the single place in-process derived state (indexes,
+caches, aggregates, push notifications) learns about writes, whichever route
+or script made them.
+
+Subscribers are plain callables taking a list of ModelChange. They run
+synchronously right after the commit, in whatever thread committed (the
+event loop in async mode, a threadpool worker in sync mode), so they must be
+quick and thread-safe. Bulk ``query.delete()``/``update()`` statements
+bypass the ORM unit of work and are not reported.
+
+Changes committed by other API workers arrive through services.event_fanout;
+subscribers that keep process-local state in sync ask for them with
+``subscribe(callback, remote=True)``.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import Date, DateTime, event, inspect
+from sqlalchemy.orm import Session
+
+from models import Reservation, Room
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+# Tracked models and the name they are reported under
+TRACKED_MODELS = {
+    Room: "room",
+    Reservation: "reservation",
+}
+MODELS_BY_NAME = {name: model for model, name in TRACKED_MODELS.items()}
+
+_PENDING_KEY = "model_events.pending"
+
+
+@dataclass(frozen=True)
+class ModelChange:
+    """One committed write: column values after it (before it for deletes)"""
+    model: str
+    op: str
+    id: str
+    values: Dict = field(default_factory=dict, compare=False)
+
+    def to_dict(self) -> Dict:
+        """JSON-ready form (dates as ISO strings, enums as values)"""
+        return {
+            "model": self.model,
+            "op": self.op,
+            "id": self.id,
+            "values": {k: _json_value(v) for k, v in self.values.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ModelChange":
+        """Inverse of to_dict, restoring Python types from the model's columns"""
+        columns = MODELS_BY_NAME[data["model"]].__table__.columns
+        values = {}
+        for key, value in data["values"].items():
+            column_type = columns[key].type if key in columns else None
+            if value is not None and isinstance(column_type, (Date, DateTime)):
+                value = column_type.python_type.fromisoformat(value)
+            elif value is not None and getattr(column_type, "enum_class", None):
+                value = column_type.enum_class(value)
+            values[key] = value
+        return cls(model=data["model"], op=data["op"], id=data["id"], values=values)
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+# (callback, wants changes committed by other workers)
+_subscribers: List[Tuple[Callable[[List[ModelChange]], None], bool]] = []
+
+
+def subscribe(callback: Callable[[List[ModelChange]], None], remote: bool = False):
+    """Call ``callback(changes)`` after every commit that touched tracked models.
+
+    With ``remote`` the callback also receives changes committed by other
+    API worker processes.
+    """
+    unsubscribe(callback)
+    _subscribers.append((callback, remote))
+
+
+def unsubscribe(callback: Callable[[List[ModelChange]], None]):
+    _subscribers[:] = [(cb, remote) for cb, remote in _subscribers if cb != callback]
+
+
+def dispatch(changes: List[ModelChange], remote: bool = False):
+    """Hand committed changes to subscribers"""
+    for callback, wants_remote in list(_subscribers):
+        if remote and not wants_remote:
+            continue
+        try:
+            callback(changes)
+        except Exception as e:
+            # The data is committed; a failing subscriber must not hide that
+            print(f"⚠️  Change subscriber {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+
+def column_values(obj) -> Dict:
+    """Plain dict of an instance's mapped column attributes"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _record(session: Session, obj, op: str):
+    model = TRACKED_MODELS.get(type(obj))
+    if model is None:
+        return
+    pending: Dict[Tuple[str, str], ModelChange] = session.info.setdefault(_PENDING_KEY, {})
+    key = (model, obj.id)
+    previous = pending.get(key)
+
+    if previous is not None:
+        if previous.op == CREATED and op == DELETED:
+            # Never visible outside the transaction
+            del pending[key]
+            return
+        if previous.op == CREATED:
+            op = CREATED
+    pending[key] = ModelChange(model=model, op=op, id=obj.id, values=column_values(obj))
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context):
+    # new/dirty/deleted still describe what this flush just wrote
+    for obj in session.new:
+        _record(session, obj, CREATED)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _record(session, obj, UPDATED)
+    for obj in session.deleted:
+        _record(session, obj, DELETED)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    dispatch(list(pending.values()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,179 @@
+"""
+Keyset (cursor) pagination.
+
+A listing is ordered by a Keyset: indexed columns whose last one is unique,
+all in one direction. A page continues strictly after (or before) the sort
+key of the previous page's last (first) row, so every page costs the same
+index range scan however deep it is, and rows inserted or deleted meanwhile
+never shift others between pages.
+
+Cursors are opaque to clients: URL-safe base64 of the sort name, direction
+and the boundary row's key values. Routes return them in the X-Next-Cursor
+and X-Prev-Cursor headers and keep the list body unchanged.
+"""
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Date, DateTime, Integer, literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """Sort order of a listing; the last column must be unique"""
+    name: str
+    columns: Tuple
+
+
+@dataclass
+class Page:
+    items: List
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+    def set_headers(self, response: Response):
+        if self.next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = self.next_cursor
+        if self.prev_cursor:
+            response.headers[PREV_CURSOR_HEADER] = self.prev_cursor
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def _restore(column, value):
+    if value is None:
+        return None
+    column_type = column.type
+    if isinstance(column_type, (Date, DateTime)):
+        return column_type.python_type.fromisoformat(value)
+    if isinstance(column_type, Integer):
+        return int(value)
+    return value
+
+
+def encode_cursor(keyset: Keyset, descending: bool, direction: str, item) -> str:
+    payload = {
+        "s": keyset.name,
+        "o": "desc" if descending else "asc",
+        "d": direction,
+        "k": [_json_value(getattr(item, column.key)) for column in keyset.columns],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keyset: Keyset, descending: bool) -> Tuple[str, list]:
+    """(direction, key values) of a cursor issued for this keyset and order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction, values = payload["d"], payload["k"]
+        matches = (
+            payload["s"] == keyset.name
+            and payload["o"] == ("desc" if descending else "asc")
+            and direction in ("next", "prev")
+            and len(values) == len(keyset.columns)
+        )
+        if matches:
+            return direction, [_restore(c, v) for c, v in zip(keyset.columns, values)]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor, or it was issued for a different sort order"
+    )
+
+
+async def fetch_page(
+    db,
+    query,
+    keyset: Keyset,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    offset: int = 0,
+) -> Page:
+    """Run ``query`` (a select of one entity) for one page.
+
+    ``offset`` keeps old skip-based clients working; it is ignored once a
+    cursor is given.
+    """
+    direction, boundary = ("next", None) if not cursor else decode_cursor(cursor, keyset, descending)
+    backwards = direction == "prev"
+    # Walking backwards reads the index the other way and flips the rows after
+    reverse = descending != backwards
+
+    key = tuple_(*keyset.columns)
+    if boundary is not None:
+        # Typed binds, so e.g. binary ids are converted like in any other filter
+        bound = tuple_(*(literal(v, c.type) for c, v in zip(keyset.columns, boundary)))
+        query = query.where(key < bound if reverse else key > bound)
+    elif offset:
+        query = query.offset(offset)
+    ordering = [column.desc() if reverse else column.asc() for column in keyset.columns]
+    result = await db.execute(query.order_by(*ordering).limit(limit + 1))
+    return _page(list(result.scalars().all()), keyset, limit, descending, backwards, boundary, offset)
+
+
+def page_of(
+    items: Sequence,
+    keyset: Keyset,
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    offset: int = 0,
+) -> Page:
+    """fetch_page over an in-memory list already sorted ascending by ``keyset``"""
+    direction, boundary = ("next", None) if not cursor else decode_cursor(cursor, keyset, descending)
+    backwards = direction == "prev"
+    reverse = descending != backwards
+
+    keys = [column.key for column in keyset.columns]
+
+    def key(item):
+        return tuple(getattr(item, k) for k in keys)
+
+    if boundary is not None:
+        bound = tuple(boundary)
+        if reverse:
+            candidates = items[:bisect_left(items, bound, key=key)][::-1]
+        else:
+            candidates = items[bisect_right(items, bound, key=key):]
+    else:
+        candidates = (items[::-1] if reverse else items)[offset:]
+    return _page(list(candidates[:limit + 1]), keyset, limit, descending, backwards, boundary, offset)
+
+
+def _page(items: List, keyset: Keyset, limit: int, descending: bool, backwards: bool, boundary, offset: int) -> Page:
+    """Page from up to ``limit + 1`` rows read in walking order"""
+    more = len(items) > limit
+    items = items[:limit]
+    if backwards:
+        items.reverse()
+    if not items:
+        return Page(items, None, None)
+
+    has_next = more if not backwards else True
+    has_prev = more if backwards else (boundary is not None or offset > 0)
+    return Page(
+        items,
+        encode_cursor(keyset, descending, "next", items[-1]) if has_next else None,
+        encode_cursor(keyset, descending, "prev", items[0]) if has_prev else None,
+    )
+
+
+def sort_options(keysets: Sequence[Keyset]) -> str:
+    """Query-parameter pattern accepting the keyset names"""
+    return "^(" + "|".join(k.name for k in keysets) + ")$"
@@ -0,0 +1,159 @@
+"""
+Occupancy and revenue reports (occupancy %, ADR, RevPAR).
+
+Per-day, per-room-type totals come from the daily_room_nights rollup, which
+reservation writes keep current, so a report reads one row per day and room
+type however many stays there are. NumPy then sums the days into weeks (ISO,
+starting Monday) or months.
+
+  occupancy = rooms sold / rooms available * 100
+  ADR       = revenue / rooms sold          (average daily rate)
+  RevPAR    = revenue / rooms available     (revenue per available room)
+
+Rooms available is the current room inventory on every day of the range.
+Cancelled stays do not count. A stay's nightly rate is its price per night,
+else its total price spread over its nights, else 0.
+"""
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import DailyRoomNights, Room, RoomType
+
+GRANULARITIES = ("day", "week", "month")
+# Longest range a report may span
+MAX_REPORT_DAYS = 366 * 20
+
+ROOM_TYPES = list(RoomType)
+
+
+def _driver_rows(conn, query) -> list:
+    """Rows as the driver returns them (dates may be ISO strings, enums
+    their names), skipping per-value type processing and Row objects, which
+    cost more than the rest of the report"""
+    result = conn.execute(query)
+    try:
+        return result.cursor.fetchall()
+    finally:
+        result.close()
+
+
+def load_daily(conn, start: date, end: date):
+    """(daily totals, rooms per type) for [start, end]; sync, on a Connection.
+
+    Daily totals maps each counter of the rollup to a days x room types array.
+    """
+    type_index = {room_type.name: i for i, room_type in enumerate(ROOM_TYPES)}
+    inventory = np.zeros(len(ROOM_TYPES), dtype=np.int64)
+    for room_type, rooms in _driver_rows(conn, select(Room.room_type, func.count()).group_by(Room.room_type)):
+        inventory[type_index[room_type]] = rooms
+
+    days = (np.datetime64(end) - np.datetime64(start)).astype(np.int64) + 1
+    daily = {
+        "rooms_sold": np.zeros((days, len(ROOM_TYPES)), dtype=np.int64),
+        "revenue": np.zeros((days, len(ROOM_TYPES))),
+        "arrivals": np.zeros((days, len(ROOM_TYPES)), dtype=np.int64),
+        "departures": np.zeros((days, len(ROOM_TYPES)), dtype=np.int64),
+    }
+    rows = _driver_rows(conn, select(
+        DailyRoomNights.day, DailyRoomNights.room_type, *(DailyRoomNights.__table__.c[name] for name in daily)
+    ).where(DailyRoomNights.day >= start, DailyRoomNights.day <= end))
+    if rows:
+        day, room_type, *counters = zip(*rows)
+        # (day, room type) is the primary key, so every cell is set at most once
+        offset = (np.array(day, dtype="datetime64[D]") - np.datetime64(start)).astype(np.int64)
+        types = np.fromiter(map(type_index.__getitem__, room_type), dtype=np.int64, count=len(room_type))
+        for name, values in zip(daily, counters):
+            daily[name][offset, types] = values
+    return daily, inventory
+
+
+def period_index(start: date, end: date, granularity: str):
+    """(period of each day, first day of each period)"""
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    if granularity == "week":
+        # 1970-01-01, day 0, was a Thursday
+        keys = days - (days.astype(np.int64) + 3) % 7
+    elif granularity == "month":
+        keys = days.astype("datetime64[M]").astype("datetime64[D]")
+    else:
+        keys = days
+    period_starts, index = np.unique(keys, return_inverse=True)
+    return index, period_starts
+
+
+def _metrics(sold, revenue, arrivals, departures, available) -> dict:
+    return {
+        "rooms_available": int(available),
+        "rooms_sold": int(sold),
+        "revenue": round(float(revenue), 2),
+        "arrivals": int(arrivals),
+        "departures": int(departures),
+        "occupancy": round(100.0 * sold / available, 2) if available else None,
+        "adr": round(float(revenue) / sold, 2) if sold else None,
+        "revpar": round(float(revenue) / available, 2) if available else None,
+    }
+
+
+def build_report(
+    daily: Dict[str, np.ndarray],
+    inventory: np.ndarray,
+    start: date,
+    end: date,
+    granularity: str = "month",
+    by_room_type: bool = False,
+) -> dict:
+    """Report over [start, end] from daily totals and rooms per type"""
+    rooms = inventory
+    index, period_starts = period_index(start, end, granularity)
+    periods = len(period_starts)
+
+    # Sum days into periods per room type
+    flat = (index[:, None] * len(ROOM_TYPES) + np.arange(len(ROOM_TYPES))).ravel()
+    size = periods * len(ROOM_TYPES)
+    totals = {
+        name: np.bincount(flat, weights=values.ravel(), minlength=size).reshape(periods, -1)
+        for name, values in daily.items()
+    }
+    sold, revenue, arrivals, departures = (
+        totals[name] for name in ("rooms_sold", "revenue", "arrivals", "departures")
+    )
+    period_days = np.bincount(index, minlength=periods)
+    available = period_days[:, None] * rooms
+
+    rows: List[dict] = []
+    for p, period_start in enumerate(period_starts.tolist()):
+        if by_room_type:
+            for t, room_type in enumerate(ROOM_TYPES):
+                if rooms[t]:
+                    rows.append({
+                        "period": period_start, "room_type": room_type,
+                        **_metrics(sold[p, t], revenue[p, t], arrivals[p, t], departures[p, t], available[p, t]),
+                    })
+        else:
+            rows.append({
+                "period": period_start, "room_type": None,
+                **_metrics(sold[p].sum(), revenue[p].sum(), arrivals[p].sum(), departures[p].sum(),
+                           available[p].sum()),
+            })
+    return {
+        "start_date": start,
+        "end_date": end,
+        "granularity": granularity,
+        "rows": rows,
+        "totals": _metrics(sold.sum(), revenue.sum(), arrivals.sum(), departures.sum(), available.sum()),
+    }
+
+
+async def occupancy_report(
+    db,
+    start: date,
+    end: date,
+    granularity: str = "month",
+    by_room_type: bool = False,
+) -> dict:
+    """Load the daily totals of [start, end] and build the report"""
+    daily, inventory = await db.run_sync(lambda session: load_daily(session.connection(), start, end))
+    return build_report(daily, inventory, start, end, granularity, by_room_type)
@@ -0,0 +1,167 @@
+"""
+Atomic batches of reservation creates, updates and deletes.
+
+Availability is checked against the state after the whole batch, not after
+each operation, so a swap (A moves to B's room, B moves to A's) is valid
+even though either move alone would conflict. Checking is done in memory:
+the blocking stays of every room the batch places a stay in are loaded in
+one query, those the batch updates or deletes are taken out, and each
+moved or new stay is then checked against the rest and against the others
+of the batch.
+
+Either every operation is applied, in one transaction (and one change
+version), or none is and every problem is reported with its operation's
+index.
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+from models import Reservation, ReservationStatus, Room
+from schemas import ReservationBatch
+from services.availability_index import BLOCKING_STATUSES, RoomIntervals, blocking_stays_query
+
+# Update fields that can change where and when a stay blocks a room
+PLACEMENT_FIELDS = ("room_id", "check_in", "check_out", "status")
+
+
+class BatchRejected(Exception):
+    """The batch was not applied; ``errors`` are ``{"index", "error"}`` dicts"""
+
+    def __init__(self, errors: List[dict], conflict: bool):
+        super().__init__(f"{len(errors)} operation(s) rejected")
+        self.errors = errors
+        # Only availability conflicts (HTTP 409), rather than invalid operations
+        self.conflict = conflict
+
+
+@dataclass
+class _Placement:
+    index: int
+    room_id: str
+    check_in: date
+    check_out: date
+    status: ReservationStatus
+    # Checked against the others; unchanged stays only occupy their room
+    moved: bool
+
+
+async def apply_batch(db, batch: ReservationBatch) -> List[dict]:
+    """Apply all operations and commit; ``{"op", "id", "reservation"}`` per operation"""
+    operations = batch.operations
+    errors: List[dict] = []
+
+    targets = [op.id for op in operations if op.op != "create"]
+    found: Dict[str, Reservation] = {}
+    if targets:
+        result = await db.execute(select(Reservation).where(Reservation.id.in_(targets)))
+        found = {reservation.id: reservation for reservation in result.scalars()}
+    seen = set()
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            continue
+        if op.id in seen:
+            errors.append({"index": index, "error": f"Reservation {op.id} appears in more than one operation"})
+        elif op.id not in found:
+            errors.append({"index": index, "error": f"Reservation with id {op.id} not found"})
+        seen.add(op.id)
+
+    room_ids = {op.data.room_id for op in operations if op.op != "delete" and op.data.room_id}
+    room_ids |= {reservation.room_id for reservation in found.values()}
+    result = await db.execute(select(Room.id, Room.number).where(Room.id.in_(room_ids)))
+    room_numbers = dict(result.all())
+
+    placements: List[_Placement] = []
+    for index, op in enumerate(operations):
+        if op.op == "delete" or (op.op == "update" and op.id not in found):
+            continue
+        if op.op == "create":
+            values = op.data.model_dump()
+            moved = True
+        else:
+            reservation = found[op.id]
+            values = {
+                field: getattr(reservation, field) for field in PLACEMENT_FIELDS
+            } | op.data.model_dump(exclude_unset=True)
+            moved = any(field in op.data.model_fields_set for field in PLACEMENT_FIELDS)
+        cleared = [field for field in PLACEMENT_FIELDS if field in values and values[field] is None]
+        if cleared:
+            errors.append({"index": index, "error": f"{', '.join(cleared)} cannot be null"})
+            continue
+        if values["room_id"] not in room_numbers and (op.op == "create" or "room_id" in op.data.model_fields_set):
+            errors.append({"index": index, "error": f"Room with id {values['room_id']} not found"})
+            continue
+        if values["check_out"] <= values["check_in"]:
+            errors.append({"index": index, "error": "Check-out date must be after check-in date"})
+            continue
+        placements.append(_Placement(
+            index, values["room_id"], values["check_in"], values["check_out"],
+            values.get("status") or ReservationStatus.CONFIRMED, moved,
+        ))
+    if errors:
+        raise BatchRejected(sorted(errors, key=lambda error: error["index"]), conflict=False)
+
+    await _check_final_state(db, placements, set(targets), room_numbers)
+
+    results = []
+    created: Dict[int, Reservation] = {}
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            values = op.data.model_dump()
+            if values.get("price_per_night"):
+                values["total_price"] = values["price_per_night"] * (op.data.check_out - op.data.check_in).days
+            created[index] = Reservation(**values)
+            db.add(created[index])
+        elif op.op == "update":
+            for field, value in op.data.model_dump(exclude_unset=True).items():
+                setattr(found[op.id], field, value)
+        else:
+            await db.delete(found[op.id])
+    await db.commit()
+
+    for index, op in enumerate(operations):
+        if op.op == "delete":
+            results.append({"op": op.op, "id": op.id, "reservation": None})
+            continue
+        reservation = created[index] if op.op == "create" else found[op.id]
+        await db.refresh(reservation)
+        results.append({"op": op.op, "id": reservation.id, "reservation": reservation})
+    return results
+
+
+async def _check_final_state(db, placements: List[_Placement], touched: set, room_numbers: Dict[str, str]):
+    blocking = [p for p in placements if p.status in BLOCKING_STATUSES]
+    moved = [p for p in blocking if p.moved]
+    if not moved:
+        return
+
+    rooms: Dict[str, RoomIntervals] = {}
+    result = await db.execute(blocking_stays_query(
+        {p.room_id for p in moved},
+        min(p.check_in for p in moved),
+        max(p.check_out for p in moved),
+    ))
+    for reservation_id, room_id, check_in, check_out in result:
+        # Stays the batch changes or deletes are replaced by their final state
+        if reservation_id not in touched:
+            rooms.setdefault(room_id, RoomIntervals()).add(f"reservation {reservation_id}", check_in, check_out)
+    for p in blocking:
+        if not p.moved:
+            rooms.setdefault(p.room_id, RoomIntervals()).add(f"operation {p.index}", p.check_in, p.check_out)
+
+    errors = []
+    for p in moved:
+        intervals = rooms.setdefault(p.room_id, RoomIntervals())
+        other: Optional[str] = intervals.overlapping(p.check_in, p.check_out)
+        if other is not None:
+            number = room_numbers.get(p.room_id, p.room_id)
+            errors.append({
+                "index": p.index,
+                "error": f"Room {number} is not available for the selected dates (overlaps {other})",
+            })
+        else:
+            intervals.add(f"operation {p.index}", p.check_in, p.check_out)
+    if errors:
+        raise BatchRejected(errors, conflict=True)
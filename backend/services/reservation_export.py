@@ -0,0 +1,130 @@
+"""
+Streaming reservation export (NDJSON or CSV).
+
+Rows are read through a server-side cursor in batches of EXPORT_BATCH_SIZE
+and encoded as they arrive, so memory stays at one batch however many years
+are exported. The export uses its own connection rather than the request
+session: a streamed body outlives the request's dependencies.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import Date, DateTime, Enum, select
+from starlette.concurrency import run_in_threadpool
+
+from database import DATABASE_MODE, async_engine, async_read_engine, engine, read_engine
+from models import Reservation, Room
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+# Internal bookkeeping columns that are not part of the export
+_SKIPPED = {"guest_key", "version"}
+EXPORT_COLUMNS = [
+    column for column in Reservation.__table__.columns if column.name not in _SKIPPED
+]
+FIELDS = [column.name for column in EXPORT_COLUMNS] + ["room_number"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_query(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[str] = None,
+    room_id: Optional[str] = None,
+):
+    """Reservations overlapping [start_date, end_date], oldest stay first"""
+    query = select(*EXPORT_COLUMNS, Room.number.label("room_number")).join(
+        Room, Room.id == Reservation.room_id
+    )
+    if start_date:
+        query = query.where(Reservation.check_out > start_date)
+    if end_date:
+        query = query.where(Reservation.check_in <= end_date)
+    if status:
+        query = query.where(Reservation.status == status)
+    if room_id:
+        query = query.where(Reservation.room_id == room_id)
+    return query.order_by(Reservation.check_in, Reservation.id)
+
+
+async def stream_rows(query, batch_size: int = EXPORT_BATCH_SIZE, replica: bool = False) -> AsyncIterator[list]:
+    """Result rows in batches, without ever holding the whole result"""
+    if DATABASE_MODE == "async":
+        async with (async_read_engine if replica else async_engine).connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                yield rows
+        return
+
+    conn = (read_engine if replica else engine).connect()
+    try:
+        result = await run_in_threadpool(
+            conn.execution_options(stream_results=True, yield_per=batch_size).execute, query
+        )
+        while rows := await run_in_threadpool(result.fetchmany, batch_size):
+            yield rows
+    finally:
+        await run_in_threadpool(conn.close)
+
+
+def _converter(column):
+    if isinstance(column.type, (Date, DateTime)):
+        return lambda value: value.isoformat()
+    if isinstance(column.type, Enum):
+        return lambda value: value.value
+    return None
+
+
+# (position, converter) of the columns that are not plain JSON/CSV values;
+# only these are touched per row
+_CONVERSIONS = [
+    (position, convert) for position, column in enumerate(EXPORT_COLUMNS)
+    if (convert := _converter(column)) is not None
+]
+
+
+def _plain(row) -> list:
+    values = list(row)
+    for position, convert in _CONVERSIONS:
+        if values[position] is not None:
+            values[position] = convert(values[position])
+    return values
+
+
+def encode_ndjson(rows, header: bool = False) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(FIELDS, _plain(row))), ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+
+def encode_csv(rows, header: bool = False) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(FIELDS)
+    writer.writerows(map(_plain, rows))
+    return out.getvalue().encode()
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+async def stream_export(query, fmt: str, replica: bool = False) -> AsyncIterator[bytes]:
+    """Encoded export body, one chunk per batch"""
+    encode = ENCODERS[fmt]
+    first = True
+    async for rows in stream_rows(query, replica=replica):
+        yield encode(rows, header=first)
+        first = False
+    if first and fmt == "csv":
+        # Empty export: still a valid CSV with its header
+        yield encode([], header=True)
@@ -0,0 +1,211 @@
+"""
+Bulk reservation import (JSON or CSV), for migrations from other systems.
+
+The whole file is validated before anything is written:
+
+  1. every row against the ReservationImport schema; rooms are resolved by
+     id or number from one query over the rooms table
+  2. room/date conflicts in memory: the blocking stays already booked in
+     the affected rooms and dates are loaded once, and each blocking row is
+     checked against them and against the rows before it in the file
+     (first come, first served), with the same interval lists the
+     availability index uses
+
+Valid rows are then inserted IMPORT_BATCH_SIZE at a time, one transaction
+per batch (or a single one with ``atomic``), through the ORM so versions,
+guest statistics and live updates stay current. Each failed row is reported
+with its 1-based position in the file (CSV: not counting the header).
+
+Conflicts with bookings made while an import is running are not re-checked;
+import during a quiet period.
+"""
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Reservation, Room
+from schemas import ReservationImport
+from services.availability_index import BLOCKING_STATUSES, RoomIntervals, blocking_stays_query
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+# Largest file accepted by the API endpoint (the CLI has no limit)
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole could not be read"""
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    imported: int = 0
+    dry_run: bool = False
+    # {"row": n, "errors": [...]} per rejected row
+    errors: List[dict] = field(default_factory=list)
+    # {"row": n, "id": ...} per inserted row
+    created: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "failed": len(self.errors),
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+            "created": self.created,
+        }
+
+
+def parse_rows(data, fmt: str) -> List[dict]:
+    """Rows of a JSON (list, or {"reservations": [...]}) or CSV file"""
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ImportFormatError("File is not UTF-8 encoded")
+    if fmt == "csv":
+        # Empty cells are missing values, not empty strings
+        try:
+            return [
+                {key: value for key, value in row.items() if key and value not in ("", None)}
+                for row in csv.DictReader(io.StringIO(data))
+            ]
+        except csv.Error as e:
+            raise ImportFormatError(f"Invalid CSV: {e}")
+    try:
+        rows = json.loads(data)
+    except ValueError as e:
+        raise ImportFormatError(f"Invalid JSON: {e}")
+    if isinstance(rows, dict):
+        rows = rows.get("reservations")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ImportFormatError('Expected a list of reservations or {"reservations": [...]}')
+    return rows
+
+
+def _messages(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    ]
+
+
+def validate_rows(session, rows: List[dict]) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """(row number, reservation values) of acceptable rows, and the errors"""
+    rooms = session.execute(select(Room.id, Room.number)).all()
+    number_by_id = {room_id: number for room_id, number in rooms}
+    id_by_number = {number: room_id for room_id, number in rooms}
+
+    accepted: List[Tuple[int, dict]] = []
+    errors: List[dict] = []
+    for position, row in enumerate(rows, start=1):
+        try:
+            item = ReservationImport.model_validate(row)
+        except ValidationError as e:
+            errors.append({"row": position, "errors": _messages(e)})
+            continue
+        room_id = item.room_id or id_by_number.get(item.room_number)
+        if room_id not in number_by_id:
+            missing = f"id {item.room_id}" if item.room_id else f"number {item.room_number}"
+            errors.append({"row": position, "errors": [f"Room with {missing} not found"]})
+            continue
+        values = item.model_dump(exclude={"room_number"})
+        values["room_id"] = room_id
+        if values["total_price"] is None and values["price_per_night"]:
+            values["total_price"] = values["price_per_night"] * (item.check_out - item.check_in).days
+        accepted.append((position, values))
+
+    # Conflicts, in file order
+    blocking = [(p, v) for p, v in accepted if v["status"] in BLOCKING_STATUSES]
+    intervals: Dict[str, RoomIntervals] = {}
+    if blocking:
+        existing = session.execute(blocking_stays_query(
+            {v["room_id"] for _, v in blocking},
+            min(v["check_in"] for _, v in blocking),
+            max(v["check_out"] for _, v in blocking),
+        ))
+        for reservation_id, room_id, check_in, check_out in existing:
+            intervals.setdefault(room_id, RoomIntervals()).add(
+                f"reservation {reservation_id}", check_in, check_out
+            )
+    rejected = set()
+    for position, values in blocking:
+        room = intervals.setdefault(values["room_id"], RoomIntervals())
+        other = room.overlapping(values["check_in"], values["check_out"])
+        if other is not None:
+            rejected.add(position)
+            errors.append({"row": position, "errors": [
+                f"Room {number_by_id[values['room_id']]} is not available for the selected dates "
+                f"(overlaps {other})"
+            ]})
+        else:
+            room.add(f"row {position}", values["check_in"], values["check_out"])
+
+    errors.sort(key=lambda error: error["row"])
+    return [(p, v) for p, v in accepted if p not in rejected], errors
+
+
+def import_rows(
+    session,
+    rows: List[dict],
+    dry_run: bool = False,
+    atomic: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress=None,
+) -> ImportReport:
+    """Validate and insert ``rows`` on a sync Session.
+
+    ``atomic`` imports nothing unless every row is valid, in one transaction.
+    ``progress(done, total)`` is called after every batch.
+    """
+    accepted, errors = validate_rows(session, rows)
+    report = ImportReport(total=len(rows), dry_run=dry_run, errors=errors)
+    if dry_run or (atomic and errors) or not accepted:
+        session.rollback()
+        return report
+
+    for start in range(0, len(accepted), batch_size):
+        batch = accepted[start:start + batch_size]
+        reservations = [Reservation(**values) for _, values in batch]
+        session.add_all(reservations)
+        if atomic:
+            session.flush()
+        else:
+            session.commit()
+        report.created.extend(
+            {"row": position, "id": reservation.id}
+            for (position, _), reservation in zip(batch, reservations)
+        )
+        if progress:
+            progress(start + len(batch), len(accepted))
+    if atomic:
+        session.commit()
+    report.imported = len(report.created)
+    return report
+
+
+def import_file(
+    data,
+    fmt: str,
+    dry_run: bool = False,
+    atomic: bool = False,
+    max_rows: Optional[int] = None,
+    progress=None,
+) -> ImportReport:
+    """Parse and import a whole file with its own session (blocking)"""
+    rows = parse_rows(data, fmt)
+    if max_rows is not None and len(rows) > max_rows:
+        raise ImportFormatError(f"At most {max_rows} reservations per import, got {len(rows)}")
+    session = SessionLocal(expire_on_commit=False)
+    try:
+        return import_rows(session, rows, dry_run=dry_run, atomic=atomic, progress=progress)
+    finally:
+        session.close()
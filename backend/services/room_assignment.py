@@ -0,0 +1,488 @@
+"""
+Room assignment: place requested stays and re-pack movable reservations.
+
+Stays that cannot move (checked in, locked, not confirmed, or not wholly
+inside the repack window) are fixed. Requested stays are placed by a sweep
+in check-in order (longest first on ties), each going to the suitable room
+that scores best:
+
+  - the room must be free from check-in until its next stay
+  - a free run shorter than ``min_gap`` nights left before the stay (no
+    later stay in the sweep can fill it) or after it counts against the room
+  - a room with spare beds costs a little, keeping big rooms for big needs
+  - otherwise the room whose last stay ends closest to check-in wins
+
+Room state is two NumPy arrays (end of the last stay so far, start of the
+next stay), so each decision is one vectorized pass over the rooms. The
+sweep is repeated with randomized tie-breaks while it keeps improving.
+
+Repacking then starts from that valid assignment and swaps the stays of two
+rooms of the same type from a common free night on, up to each room's next
+fixed stay. Only the gaps at the cut and at those fixed stays change, so a
+swap is scored from four gaps and made when it removes unsellable ones; the
+stays after the next cut that costs nothing are swapped back, so a swap
+moves a block rather than a whole tail. Every reservation moved away from
+its booked room costs ``move_cost`` gaps, so a swap is only kept when the
+gaps it closes outweigh the guests it moves, and no more than ``max_moves``
+reservations move in total. Rounds over all gaps continue until nothing
+improves or the time budget is spent.
+
+A movable reservation may go to any room of its current room's type with
+at least its capacity. Plans are proposals and nothing is written; the
+moves map onto ``update`` operations of POST /api/reservations/batch.
+"""
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from models import Reservation, ReservationStatus, Room
+from schemas import AssignmentRequest
+from services.availability_grid import TYPE_INDEX
+from services.availability_index import BLOCKING_STATUSES
+
+# Default repack window after repack_from, and the longest allowed
+REPACK_DAYS = 180
+MAX_REPACK_DAYS = 366
+
+GAP_COST = 1.0
+# Gaps after a stay may still be filled by a later one
+GAP_AFTER_COST = 0.5
+# Keeps big rooms for stays that need them
+SPARE_BED_COST = 0.05
+# Per night of free run before the stay, up to TIGHT_NIGHTS
+TIGHT_COST = 0.02
+TIGHT_NIGHTS = 30
+NOISE = 0.3
+# Stop after this many plans in a row without improvement
+STALE_PASSES = 50
+
+NEVER = 10 ** 9
+
+
+@dataclass
+class _Stay:
+    start: int              # check-in ordinal
+    end: int                # check-out ordinal
+    fit: np.ndarray         # per room: inf where unsuitable, else the cost of spare beds
+    current: int = -1       # room row of a reservation, -1 for requested stays
+
+
+def room_fit(capacity: np.ndarray, suitable: np.ndarray, beds: int) -> np.ndarray:
+    """Per-room cost of putting a stay needing ``beds`` there (inf: never)"""
+    return np.where(suitable, SPARE_BED_COST * (capacity - beds), np.inf)
+
+
+class _Layout:
+    """Fixed stays sorted by start, with the next fixed start in the same room"""
+
+    def __init__(self, rooms: int, fixed: List[Tuple[int, int, int]]):
+        fixed = sorted(fixed)
+        self.end = [f[1] for f in fixed]
+        self.room = [f[2] for f in fixed]
+        self.successor = [NEVER] * len(fixed)
+        self.first = np.full(rooms, NEVER, dtype=np.int64)
+        following: Dict[int, int] = {}
+        for i in range(len(fixed) - 1, -1, -1):
+            room = self.room[i]
+            self.successor[i] = following.get(room, NEVER)
+            following[room] = fixed[i][0]
+        for room, start in following.items():
+            self.first[room] = start
+        self.fixed = fixed
+
+
+def _sweep(layout: _Layout, stays: List[_Stay], min_gap: int, rng=None) -> List[int]:
+    """Room row per stay (-1 where none fits)"""
+    rooms = len(layout.first)
+    last_end = np.full(rooms, -NEVER, dtype=np.int64)
+    next_fixed = layout.first.copy()
+    if rng is None:
+        order = sorted(range(len(stays)), key=lambda i: (stays[i].start, stays[i].start - stays[i].end))
+    else:
+        jitter = rng.random(len(stays))
+        order = sorted(range(len(stays)), key=lambda i: (stays[i].start, stays[i].start - stays[i].end, jitter[i]))
+
+    placed = [-1] * len(stays)
+    f = 0
+    for i in order:
+        stay = stays[i]
+        while f < len(layout.fixed) and layout.fixed[f][0] <= stay.start:
+            room = layout.room[f]
+            last_end[room] = max(last_end[room], layout.end[f])
+            next_fixed[room] = layout.successor[f]
+            f += 1
+        rows = np.flatnonzero((last_end <= stay.start) & (next_fixed >= stay.end) & (stay.fit < np.inf))
+        if not len(rows):
+            continue
+        before = stay.start - last_end[rows]
+        after = next_fixed[rows] - stay.end
+        cost = (
+            stay.fit[rows]
+            + GAP_COST * ((before > 0) & (before < min_gap))
+            + GAP_AFTER_COST * ((after > 0) & (after < min_gap))
+            + TIGHT_COST * np.minimum(before, TIGHT_NIGHTS)
+        )
+        if rng is not None:
+            cost = cost + NOISE * rng.random(len(rows))
+        room = rows[np.argmin(cost)]
+        placed[i] = room
+        last_end[room] = stay.end
+    return placed
+
+
+def count_gaps(stays: List[Tuple[int, int, int]], min_gap: int) -> int:
+    """Free runs of 1 to min_gap - 1 nights between ``(start, end, room)`` stays"""
+    if not stays:
+        return 0
+    start, end, room = (np.array(column, dtype=np.int64) for column in zip(*stays))
+    order = np.lexsort((start, room))
+    start, end, room = start[order], end[order], room[order]
+    # Latest check-out so far in each room (stays may overlap); the offset
+    # keeps the running maximum from carrying over from the previous room
+    offset = room * (4 * NEVER)
+    reach = np.maximum.accumulate(end + offset) - offset
+    gaps = start[1:] - reach[:-1]
+    same = room[1:] == room[:-1]
+    return int(np.count_nonzero(same & (gaps > 0) & (gaps < min_gap)))
+
+
+def _bad(end: int, start: int, min_gap: int) -> int:
+    return 1 if 0 < start - end < min_gap else 0
+
+
+class _Chains:
+    """Each room's stays in check-in order, rearranged by suffix swaps.
+
+    Swapping the stays of rooms r and s from a night c on (up to each room's
+    next fixed stay) only changes the junctions at c and at those fixed
+    stays, so its effect on unsellable gaps is known from four gaps.
+    """
+
+    def __init__(
+        self, rooms: int, fixed, stays: List[_Stay], placed: List[int], room_types, min_gap: int,
+        move_cost: float = 0.0, max_moves: Optional[int] = None,
+    ):
+        self.stays = stays
+        self.min_gap = min_gap
+        self.move_cost = move_cost
+        self.max_moves = NEVER if max_moves is None else max_moves
+        # Reservations currently away from their booked room
+        self.moves = sum(1 for stay, room in zip(stays, placed) if 0 <= stay.current != room)
+        # Entries are (check-in, check-out, stay index or -1 when fixed)
+        self.chains: List[list] = [[] for _ in range(rooms)]
+        for start, end, room in fixed:
+            self.chains[room].append((start, end, -1))
+        for k, (stay, room) in enumerate(zip(stays, placed)):
+            if room >= 0:
+                self.chains[room].append((stay.start, stay.end, k))
+        for chain in self.chains:
+            chain.sort()
+        # Rooms with overlapping stays (legacy data) are left alone
+        self.frozen = {
+            room for room, chain in enumerate(self.chains)
+            if any(b[0] < a[1] for a, b in zip(chain, chain[1:]))
+        }
+        self.peers = {
+            room: [other for other in range(rooms) if room_types[other] == room_types[room] and other != room]
+            for room in range(rooms)
+        }
+
+    def _split(self, room: int, cut: int):
+        """(first index from the cut, end before it, end of the suffix index, next fixed check-in)"""
+        chain = self.chains[room]
+        i = bisect_left(chain, cut, key=lambda entry: entry[0])
+        previous = chain[i - 1][1] if i else -NEVER
+        j = i
+        while j < len(chain) and chain[j][2] >= 0:
+            j += 1
+        return i, previous, j, chain[j][0] if j < len(chain) else NEVER
+
+    def _junctions(self, previous: int, suffix: list, horizon: int) -> int:
+        if not suffix:
+            return _bad(previous, horizon, self.min_gap)
+        return _bad(previous, suffix[0][0], self.min_gap) + _bad(suffix[-1][1], horizon, self.min_gap)
+
+    def swap_delta(self, r: int, s: int, cut: int):
+        """Change in unsellable gaps from swapping suffixes at ``cut`` (None: not possible)"""
+        ir, previous_r, jr, horizon_r = self._split(r, cut)
+        is_, previous_s, js, horizon_s = self._split(s, cut)
+        if previous_r > cut or previous_s > cut:
+            return None
+        suffix_r, suffix_s = self.chains[r][ir:jr], self.chains[s][is_:js]
+        if not suffix_r and not suffix_s:
+            return None
+        if (suffix_s and suffix_s[-1][1] > horizon_r) or (suffix_r and suffix_r[-1][1] > horizon_s):
+            return None
+        stays = self.stays
+        if any(stays[k].fit[r] == np.inf for _, _, k in suffix_s) or any(stays[k].fit[s] == np.inf for _, _, k in suffix_r):
+            return None
+        before = self._junctions(previous_r, suffix_r, horizon_r) + self._junctions(previous_s, suffix_s, horizon_s)
+        after = self._junctions(previous_r, suffix_s, horizon_r) + self._junctions(previous_s, suffix_r, horizon_s)
+        return after - before
+
+    def swap(self, r: int, s: int, cut: int):
+        ir, _, jr, _ = self._split(r, cut)
+        is_, _, js, _ = self._split(s, cut)
+        chain_r, chain_s = self.chains[r], self.chains[s]
+        self.chains[r] = chain_r[:ir] + chain_s[is_:js] + chain_r[jr:]
+        self.chains[s] = chain_s[:is_] + chain_r[ir:jr] + chain_s[js:]
+
+    def _common_cut(self, s: int, start: int, stop: int):
+        """A night in [start, stop] on which room s has no stay, if any"""
+        chain = self.chains[s]
+        i = bisect_left(chain, start, key=lambda entry: entry[0])
+        previous = chain[i - 1][1] if i else -NEVER
+        cut = max(start, previous)
+        return cut if cut <= stop else None
+
+    def _moved(self, room: int) -> int:
+        """Reservations in ``room`` that were booked into another one"""
+        stays = self.stays
+        return sum(1 for _, _, k in self.chains[room] if k >= 0 and 0 <= stays[k].current != room)
+
+    def improve(self, r: int, k: int) -> bool:
+        """Try to close the gap after the k-th stay of room r"""
+        chain = self.chains[r]
+        end, start = chain[k][1], chain[k + 1][0]
+        for s in self.peers[r]:
+            if s in self.frozen:
+                continue
+            cut = self._common_cut(s, end, start)
+            if cut is None:
+                continue
+            delta = self.swap_delta(r, s, cut)
+            if delta is None or delta >= 0:
+                continue
+            saved = self.chains[r], self.chains[s]
+            moved = self._moved(r) + self._moved(s)
+            self.swap(r, s, cut)
+            delta += self._swap_back(r, s, cut)
+            moved = self._moved(r) + self._moved(s) - moved
+            if delta + self.move_cost * moved < 0 and self.moves + moved <= self.max_moves:
+                self.moves += moved
+                return True
+            # Not worth the moves: undo
+            self.chains[r], self.chains[s] = saved
+        return False
+
+    def _swap_back(self, r: int, s: int, cut: int) -> int:
+        """Return the stays after the first later cut that costs nothing, so
+        only a block of stays changes rooms; returns the change in gaps"""
+        chain = self.chains[r]
+        for k in range(bisect_left(chain, cut + 1, key=lambda entry: entry[0]) - 1, len(chain) - 1):
+            if k < 0 or chain[k][2] < 0 or chain[k + 1][2] < 0:
+                continue
+            back = self._common_cut(s, chain[k][1], chain[k + 1][0])
+            if back is not None and back > cut:
+                delta = self.swap_delta(r, s, back)
+                if delta is not None and delta <= 0:
+                    self.swap(r, s, back)
+                    return delta
+        return 0
+
+    def place(self, k: int) -> bool:
+        """Put stay k in the free room where it leaves the fewest unsellable gaps"""
+        stay = self.stays[k]
+        best = None
+        for room in np.flatnonzero(stay.fit < np.inf):
+            if room in self.frozen:
+                continue
+            chain = self.chains[room]
+            i = bisect_left(chain, stay.start, key=lambda entry: entry[0])
+            previous = chain[i - 1][1] if i else -NEVER
+            following = chain[i][0] if i < len(chain) else NEVER
+            if previous <= stay.start and stay.end <= following:
+                cost = (
+                    _bad(previous, stay.start, self.min_gap) + _bad(stay.end, following, self.min_gap)
+                    - _bad(previous, following, self.min_gap), stay.fit[room]
+                )
+                if best is None or cost < best[0]:
+                    best = (cost, room, i)
+        if best is None:
+            return False
+        _, room, i = best
+        self.chains[room].insert(i, (stay.start, stay.end, k))
+        return True
+
+    def bad_gaps(self, room: int) -> List[int]:
+        """Indexes of the stays followed by an unsellable gap"""
+        chain = self.chains[room]
+        return [k for k in range(len(chain) - 1) if _bad(chain[k][1], chain[k + 1][0], self.min_gap)]
+
+    def rooms_of(self, count: int) -> List[int]:
+        rooms = [-1] * count
+        for room, chain in enumerate(self.chains):
+            for _, _, k in chain:
+                if k >= 0:
+                    rooms[k] = room
+        return rooms
+
+
+def plan_assignment(
+    fixed: List[Tuple[int, int, int]],
+    reservations: List[_Stay],
+    requested: List[_Stay],
+    room_types: np.ndarray,
+    min_gap: int,
+    repack: bool,
+    time_budget: float,
+    move_cost: float = 0.0,
+    max_moves: Optional[int] = None,
+) -> Tuple[List[int], List[int], int, int, int]:
+    """(room per reservation, room per requested stay or -1, unsellable gaps
+    now, with the plan, and the number of passes)"""
+    begin = time.perf_counter()
+    rooms = len(room_types)
+    current = [(s.start, s.end, s.current) for s in reservations]
+    kept = _Layout(rooms, fixed + current)
+
+    def placed_score(placed: List[int]):
+        stays = [(s.start, s.end, room) for s, room in zip(requested, placed) if room >= 0]
+        return placed.count(-1), count_gaps(fixed + current + stays, min_gap)
+
+    # Requested stays fill the gaps around the reservations as they are
+    placed = _sweep(kept, requested, min_gap)
+    best = placed_score(placed)
+    passes, stale = 1, 0
+    rng = np.random.default_rng(0)
+    # Repacking gets the rest of the budget
+    placing_budget = time_budget / 4 if repack else time_budget
+    while requested and best != (0, 0) and stale < STALE_PASSES and time.perf_counter() - begin < placing_budget:
+        attempt = _sweep(kept, requested, min_gap, rng)
+        passes += 1
+        score = placed_score(attempt)
+        if score < best:
+            placed, best, stale = attempt, score, 0
+        else:
+            stale += 1
+
+    stays = reservations + requested
+    chains = _Chains(
+        rooms, fixed, stays, [s.current for s in reservations] + placed, room_types, min_gap,
+        move_cost, max_moves,
+    )
+    gaps_now = count_gaps(fixed + current, min_gap)
+    improved = repack
+    while improved and time.perf_counter() - begin < time_budget:
+        passes += 1
+        improved = False
+        for r in rng.permutation(rooms):
+            if r in chains.frozen:
+                continue
+            for k in reversed(chains.bad_gaps(r)):
+                if k < len(chains.chains[r]) - 1 and chains.improve(r, k):
+                    improved = True
+            if time.perf_counter() - begin >= time_budget:
+                break
+
+    assigned = chains.rooms_of(len(stays))
+    if repack:
+        # Repacking may have made room for stays that did not fit before
+        for k in range(len(reservations), len(stays)):
+            if assigned[k] < 0 and chains.place(k):
+                assigned = chains.rooms_of(len(stays))
+    gaps = count_gaps([(s.start, s.end, room) for s, room in zip(stays, assigned) if room >= 0] + fixed, min_gap)
+    return assigned[:len(reservations)], assigned[len(reservations):], gaps_now, gaps, passes
+
+
+def repack_window(request: AssignmentRequest) -> Tuple[date, date]:
+    """(first check-in, last check-out) of the reservations that may move"""
+    repack_from = request.repack_from or date.today() + timedelta(days=1)
+    return repack_from, request.repack_until or repack_from + timedelta(days=REPACK_DAYS)
+
+
+async def propose_assignment(db, request: AssignmentRequest) -> dict:
+    """Plan placements for ``request.stays`` (and moves, with ``repack``)"""
+    begin = time.perf_counter()
+    repack_from, repack_until = repack_window(request)
+    starts = [s.check_in for s in request.stays] + ([repack_from] if request.repack else [])
+    ends = [s.check_out for s in request.stays] + ([repack_until] if request.repack else [])
+    # Neighbouring stays just outside decide whether a gap at the edge is sellable
+    window_start = min(starts) - timedelta(days=request.min_gap)
+    window_end = max(ends) + timedelta(days=request.min_gap)
+
+    result = await db.execute(select(Room.id, Room.number, Room.room_type, Room.capacity).order_by(Room.number))
+    room_rows = result.all()
+    row_of = {room.id: row for row, room in enumerate(room_rows)}
+    types = np.array([TYPE_INDEX[room.room_type] for room in room_rows], dtype=np.int64)
+    capacity = np.array([room.capacity for room in room_rows], dtype=np.int64)
+
+    result = await db.execute(
+        select(Reservation.id, Reservation.room_id, Reservation.check_in, Reservation.check_out,
+               Reservation.status, Reservation.guest_name)
+        .where(
+            Reservation.status.in_(BLOCKING_STATUSES),
+            Reservation.check_in < window_end,
+            Reservation.check_out > window_start,
+        )
+    )
+    locked = set(request.locked)
+    fixed: List[Tuple[int, int, int]] = []
+    movable = []
+    reservations: List[_Stay] = []
+    fit_for_room: Dict[int, np.ndarray] = {}
+    for stay in result:
+        row = row_of[stay.room_id]
+        start, end = stay.check_in.toordinal(), stay.check_out.toordinal()
+        if (
+            request.repack and stay.status == ReservationStatus.CONFIRMED and stay.id not in locked
+            and stay.check_in >= repack_from and stay.check_out <= repack_until
+        ):
+            if row not in fit_for_room:
+                fit_for_room[row] = room_fit(capacity, (types == types[row]) & (capacity >= capacity[row]), capacity[row])
+            reservations.append(_Stay(start, end, fit_for_room[row], row))
+            movable.append(stay)
+        else:
+            fixed.append((start, end, row))
+
+    requested = [
+        _Stay(
+            s.check_in.toordinal(), s.check_out.toordinal(),
+            room_fit(
+                capacity,
+                (capacity >= s.min_capacity) & (types == TYPE_INDEX[s.room_type] if s.room_type else True),
+                s.min_capacity,
+            ),
+        )
+        for s in request.stays
+    ]
+
+    moved_to, placed, gaps_now, gaps, passes = await run_in_threadpool(
+        plan_assignment, fixed, reservations, requested, types,
+        request.min_gap, request.repack, request.time_budget,
+        request.move_cost, request.max_moves,
+    )
+
+    placements = []
+    for index, (stay, row) in enumerate(zip(request.stays, placed)):
+        room = room_rows[row] if row >= 0 else None
+        placements.append({
+            "index": index, "label": stay.label,
+            "room_id": room and room.id, "room_number": room and room.number,
+        })
+    moves = [
+        {
+            "reservation_id": stay.id, "guest_name": stay.guest_name,
+            "check_in": stay.check_in, "check_out": stay.check_out,
+            "from_room_id": stay.room_id, "from_room_number": room_rows[row_of[stay.room_id]].number,
+            "to_room_id": room_rows[row].id, "to_room_number": room_rows[row].number,
+        }
+        for stay, row in zip(movable, moved_to)
+        if row != row_of[stay.room_id]
+    ]
+    return {
+        "placements": placements,
+        "moves": moves,
+        "unplaced": placed.count(-1),
+        "gaps_before": gaps_now,
+        "gaps_after": gaps,
+        "moved": len(moves),
+        "passes": passes,
+        "elapsed_ms": round((time.perf_counter() - begin) * 1000, 1),
+    }
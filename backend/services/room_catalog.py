@@ -0,0 +1,135 @@
+"""
+Process-local room catalog.
+
+Every room as a plain snapshot, by id and by number, so the room list and
+single-room reads do not go to the database. It is for reads and display
+fields only: writes that depend on a room existing (reservation create and
+update) check it in their own transaction, since the catalog may lag.
+
+Rooms change rarely; the catalog is loaded at startup and kept current from
+committed writes (see services.model_events), including those of other API
+workers relayed by services.event_fanout.
+
+As a backstop for relays that never arrive (EVENT_FANOUT=0, a dropped
+datagram, writes from scripts), the catalog compares its version, the
+number of rooms and their highest change version, with the database's at
+most every ROOM_CATALOG_CHECK_SECONDS and reloads when they differ. A room
+missing from the catalog is still looked up in the database by the room
+read, so a room created elsewhere is never reported as missing.
+"""
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, inspect, select
+
+from database import open_session
+from models import Room
+from services import model_events
+from services.pagination import Keyset
+
+# How often (at most) the catalog version is checked against the database
+ROOM_CATALOG_CHECK_SECONDS = float(os.getenv("ROOM_CATALOG_CHECK_SECONDS", "5"))
+
+ROOM_FIELDS = tuple(attr.key for attr in inspect(Room).column_attrs)
+
+
+class CatalogRoom(SimpleNamespace):
+    """Snapshot of a room row (read-only by convention)"""
+
+
+async def rooms_version(db) -> Tuple[int, Optional[int]]:
+    """(count, highest version) of the rooms; changes with any room write"""
+    return tuple((await db.execute(select(func.count(), func.max(Room.version)).select_from(Room))).one())
+
+
+class RoomCatalog:
+    """All rooms in memory; thread-safe (sync-mode commits notify from worker threads)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, CatalogRoom] = {}
+        self._by_number: Dict[str, CatalogRoom] = {}
+        # Rooms in keyset order, built on first use after each change
+        self._ordered: Dict[str, List[CatalogRoom]] = {}
+        self.version: Tuple[int, Optional[int]] = (0, None)
+        self.ready = False
+        self._checked_at = 0.0
+
+    def load(self, rows: Iterable[dict]):
+        """Replace the contents with ``rows`` (column values per room)"""
+        rooms = [CatalogRoom(**{name: row[name] for name in ROOM_FIELDS}) for row in rows]
+        with self._lock:
+            self._by_id = {room.id: room for room in rooms}
+            self._by_number = {room.number: room for room in rooms}
+            self._changed()
+            self.ready = True
+            self._checked_at = time.monotonic()
+
+    def _changed(self):
+        self._ordered = {}
+        self.version = (len(self._by_id), max((room.version for room in self._by_id.values()), default=None))
+
+    def _discard(self, room_id: str):
+        room = self._by_id.pop(room_id, None)
+        if room is not None and self._by_number.get(room.number) is room:
+            del self._by_number[room.number]
+
+    def apply_changes(self, changes: List[model_events.ModelChange]):
+        """model_events subscriber"""
+        changes = [change for change in changes if change.model == "room"]
+        if not changes:
+            return
+        with self._lock:
+            for change in changes:
+                self._discard(change.id)
+                if change.op != model_events.DELETED:
+                    room = CatalogRoom(**{name: change.values.get(name) for name in ROOM_FIELDS})
+                    self._by_id[room.id] = room
+                    self._by_number[room.number] = room
+            self._changed()
+
+    def get(self, room_id: str) -> Optional[CatalogRoom]:
+        return self._by_id.get(room_id)
+
+    def by_number(self, number: str) -> Optional[CatalogRoom]:
+        return self._by_number.get(number)
+
+    def snapshot(self, keyset: Keyset) -> Tuple[Tuple, List[CatalogRoom]]:
+        """(version, rooms sorted ascending by the keyset's columns)"""
+        with self._lock:
+            ordered = self._ordered.get(keyset.name)
+            if ordered is None:
+                keys = [column.key for column in keyset.columns]
+                ordered = sorted(self._by_id.values(), key=lambda room: tuple(getattr(room, k) for k in keys))
+                self._ordered[keyset.name] = ordered
+            return self.version, ordered
+
+    async def ensure_current(self):
+        """Reload if the database's room version moved without us noticing"""
+        now = time.monotonic()
+        if not self.ready or now - self._checked_at < ROOM_CATALOG_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        # Always the primary: a lagging replica would move the catalog backwards
+        async with open_session() as db:
+            if await rooms_version(db) != self.version:
+                await load_from(db, self)
+
+
+async def load_from(db, catalog: "RoomCatalog") -> int:
+    rows = (await db.execute(select(*(getattr(Room, name) for name in ROOM_FIELDS)))).mappings().all()
+    catalog.load(rows)
+    return len(rows)
+
+
+async def rebuild(db) -> int:
+    """Load the catalog from the database; returns the number of rooms"""
+    return await load_from(db, room_catalog)
+
+
+# Process-wide catalog
+room_catalog = RoomCatalog()
+model_events.subscribe(room_catalog.apply_changes, remote=True)
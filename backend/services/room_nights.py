@@ -0,0 +1,41 @@
+"""
+Backfill and rebuild of the daily room-nights rollup (models.daily_room_nights).
+
+Reservation writes through the ORM keep the rollup current. A rebuild is
+only needed for a database that predates it or after writes that bypassed
+the ORM; like services.guest_stats, both functions take a sync Connection
+inside a transaction.
+"""
+from sqlalchemy import select, delete
+
+from models import Reservation, ReservationStatus, Room, DailyRoomNights
+from models.daily_room_nights import apply_deltas, rollup_rows
+
+BATCH_SIZE = 5000
+
+
+def needs_backfill(conn) -> bool:
+    """True while sold stays exist but the rollup is empty"""
+    return (
+        conn.execute(select(DailyRoomNights.day).limit(1)).first() is None
+        and conn.execute(
+            select(Reservation.id).where(Reservation.status != ReservationStatus.CANCELLED).limit(1)
+        ).first() is not None
+    )
+
+
+def rebuild(conn) -> int:
+    """Recompute the whole rollup; returns the number of (day, room type) rows"""
+    conn.execute(delete(DailyRoomNights.__table__))
+    result = conn.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(
+        select(
+            Room.room_type, Reservation.check_in, Reservation.check_out, Reservation.status,
+            Reservation.price_per_night, Reservation.total_price,
+        )
+        .join(Room, Room.id == Reservation.room_id)
+        .where(Reservation.status != ReservationStatus.CANCELLED)
+    )
+    # One counter set per day and room type, however many stays
+    deltas = rollup_rows(result)
+    apply_deltas(conn, deltas)
+    return sum(1 for counters in deltas.values() if any(counters))
@@ -0,0 +1,72 @@
+"""
+Shared fixtures: the whole app against a throwaway SQLite database.
+
+Settings are read when the modules are imported, so the environment is
+prepared here before anything from the backend is imported.
+"""
+import itertools
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="lobbylobster-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ["INVOICE_CACHE_DIR"] = os.path.join(_TMP_DIR, "invoice_cache")
+# Spawned renderer processes would re-import pytest's main module
+os.environ["INVOICE_RENDER_BACKEND"] = "thread"
+os.environ["INVOICE_RENDER_WORKERS"] = "2"
+os.environ["EVENT_FANOUT"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from main import app  # noqa: E402
+
+_room_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_room(client):
+    """Create a room with a number no other test uses"""
+    def make(**fields):
+        data = {
+            "number": f"T{next(_room_numbers):04d}",
+            "name": "Test room",
+            "room_type": "DOUBLE",
+            "capacity": 2,
+            **fields,
+        }
+        response = client.post("/api/rooms/", json=data)
+        assert response.status_code == 201, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def make_reservation(client):
+    """Book a room for ``nights`` nights from ``check_in``"""
+    def make(room_id: str, check_in: date, nights: int = 2, **fields):
+        data = {
+            "room_id": room_id,
+            "guest_name": "Test Guest",
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=nights)).isoformat(),
+            "price_per_night": 100.0,
+            **fields,
+        }
+        response = client.post("/api/reservations/", json=data)
+        assert response.status_code == 201, response.text
+        return response.json()
+    return make
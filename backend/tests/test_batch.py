@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+CHECK_IN = date(2036, 4, 1)
+
+
+def stay(room_id: str, check_in: date = CHECK_IN, nights: int = 3, **fields) -> dict:
+    return {
+        "room_id": room_id, "guest_name": "Batch Guest",
+        "check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=nights)).isoformat(),
+        **fields,
+    }
+
+
+def batch(client, *operations):
+    return client.post("/api/reservations/batch", json={"operations": list(operations)})
+
+
+def room_reservations(client, room_id: str):
+    return client.get("/api/reservations/", params={"room_id": room_id, "limit": 100}).json()
+
+
+def test_swap_checks_the_final_state(client, make_room, make_reservation):
+    first_room, second_room = make_room(), make_room()
+    first = make_reservation(first_room["id"], CHECK_IN, nights=3)
+    second = make_reservation(second_room["id"], CHECK_IN, nights=3)
+
+    response = batch(
+        client,
+        {"op": "update", "id": first["id"], "data": {"room_id": second_room["id"]}},
+        {"op": "update", "id": second["id"], "data": {"room_id": first_room["id"]}},
+    )
+    assert response.status_code == 200, response.text
+    assert [r["id"] for r in room_reservations(client, first_room["id"])] == [second["id"]]
+    assert [r["id"] for r in room_reservations(client, second_room["id"])] == [first["id"]]
+
+
+def test_conflict_with_existing_stay_rejects_everything(client, make_room, make_reservation):
+    room, other = make_room(), make_room()
+    make_reservation(room["id"], CHECK_IN, nights=3)
+
+    response = batch(
+        client,
+        {"op": "create", "data": stay(other["id"])},
+        {"op": "create", "data": stay(room["id"], CHECK_IN + timedelta(days=2))},
+    )
+    assert response.status_code == 409
+    errors = response.json()["detail"]["errors"]
+    assert [error["index"] for error in errors] == [1]
+    assert room["number"] in errors[0]["error"]
+    # The valid operation was not applied either
+    assert room_reservations(client, other["id"]) == []
+
+
+def test_conflict_within_the_batch(client, make_room):
+    room = make_room()
+    response = batch(
+        client,
+        {"op": "create", "data": stay(room["id"])},
+        {"op": "create", "data": stay(room["id"], CHECK_IN + timedelta(days=1))},
+    )
+    assert response.status_code == 409
+    assert [error["index"] for error in response.json()["detail"]["errors"]] == [1]
+    assert room_reservations(client, room["id"]) == []
+
+
+def test_delete_frees_the_room_for_a_create(client, make_room, make_reservation):
+    room = make_room()
+    old = make_reservation(room["id"], CHECK_IN, nights=3)
+    response = batch(
+        client,
+        {"op": "create", "data": stay(room["id"], guest_name="Replacement")},
+        {"op": "delete", "id": old["id"]},
+    )
+    assert response.status_code == 200, response.text
+    assert [r["guest_name"] for r in room_reservations(client, room["id"])] == ["Replacement"]
+
+
+def test_invalid_operations_are_listed(client, make_room, make_reservation):
+    room = make_room()
+    reservation = make_reservation(room["id"], CHECK_IN)
+    response = batch(
+        client,
+        {"op": "update", "id": "00000000-0000-4000-8000-000000000000", "data": {"notes": "x"}},
+        {"op": "update", "id": reservation["id"], "data": {"notes": "first"}},
+        {"op": "delete", "id": reservation["id"]},
+    )
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]["errors"]] == [0, 2]
+    assert client.get(f"/api/reservations/{reservation['id']}").json()["notes"] is None
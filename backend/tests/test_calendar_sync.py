@@ -0,0 +1,55 @@
+from datetime import date
+
+from database import SessionLocal
+from models import SyncVersion
+
+RANGE = {"start_date": "2037-01-01", "end_date": "2037-02-01"}
+
+
+def changes(client, since=None):
+    params = dict(RANGE, **({"since": since} if since is not None else {}))
+    response = client.get("/api/reservations/calendar/changes", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_delta_carries_writes_and_tombstones(client, make_room, make_reservation):
+    room, doomed_room = make_room(), make_room()
+    kept = make_reservation(room["id"], date(2037, 1, 5))
+    cancelled = make_reservation(room["id"], date(2037, 1, 10))
+    snapshot = changes(client)
+    assert snapshot["full"]
+    assert {kept["id"], cancelled["id"]} <= {r["id"] for r in snapshot["reservations"]}
+
+    added = make_reservation(room["id"], date(2037, 1, 20))
+    assert client.put(f"/api/reservations/{kept['id']}", json={"notes": "Late arrival"}).status_code == 200
+    assert client.delete(f"/api/reservations/{cancelled['id']}").status_code == 204
+    assert client.delete(f"/api/rooms/{doomed_room['id']}").status_code == 204
+
+    delta = changes(client, snapshot["version"])
+    assert not delta["full"]
+    assert delta["version"] > snapshot["version"]
+    assert {r["id"] for r in delta["reservations"]} == {added["id"], kept["id"]}
+    assert delta["deleted_reservations"] == [cancelled["id"]]
+    assert delta["deleted_rooms"] == [doomed_room["id"]]
+
+    # Caught up: nothing new
+    assert changes(client, delta["version"]) == {
+        "version": delta["version"], "full": False, "rooms": [], "reservations": [],
+        "deleted_rooms": [], "deleted_reservations": [],
+    }
+
+
+def test_full_snapshot_when_the_delta_cannot_be_served(client, make_room, make_reservation):
+    room = make_room()
+    make_reservation(room["id"], date(2037, 1, 15))
+    version = changes(client)["version"]
+    # A version from the future (e.g. after a restore from backup)
+    assert changes(client, version + 1000)["full"]
+
+    # Tombstones up to the current version were pruned
+    with SessionLocal() as db:
+        db.get(SyncVersion, 1).pruned_through = version
+        db.commit()
+    assert changes(client, version - 1)["full"]
+    assert not changes(client, version)["full"]
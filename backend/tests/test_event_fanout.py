@@ -0,0 +1,55 @@
+import asyncio
+import socket
+from datetime import date
+
+from services import model_events
+from services.event_fanout import MAX_DATAGRAM_BYTES, EventFanout
+
+
+def test_oversized_change_is_reloaded_by_peers(client, make_room, make_reservation, tmp_path):
+    notes = "x" * (MAX_DATAGRAM_BYTES * 3)
+    reservation = make_reservation(make_room()["id"], date(2033, 4, 1), notes=notes)
+    change = model_events.ModelChange("reservation", model_events.UPDATED, reservation["id"],
+                                      {"version": reservation["version"], "notes": notes})
+    received = []
+
+    async def scenario():
+        sender, receiver = EventFanout(str(tmp_path)), EventFanout(str(tmp_path))
+        sender.start()
+        receiver.start()
+        model_events.subscribe(received.extend, remote=True)
+        try:
+            sender.publish([change])
+            for _ in range(200):
+                if received:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            model_events.unsubscribe(received.extend)
+            sender.shutdown()
+            receiver.shutdown()
+        return receiver.stats()
+
+    stats = asyncio.run(scenario())
+    assert [c.id for c in received] == [reservation["id"]]
+    assert received[0].values["notes"] == notes
+    assert stats["reloaded"] == 1 and stats["malformed"] == 0
+
+
+def test_truncated_datagram_is_counted(tmp_path):
+    async def scenario():
+        receiver = EventFanout(str(tmp_path))
+        receiver.start()
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+                sender.sendto(b'[{"notes":"' + b"x" * (MAX_DATAGRAM_BYTES * 3) + b'"}]', receiver.path)
+            for _ in range(200):
+                if receiver.malformed:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            receiver.shutdown()
+        return receiver.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["malformed"] == 1 and stats["received"] == 0
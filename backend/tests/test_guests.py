@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+
+def test_guest_list_is_complete_without_paging(client, make_room):
+    room = make_room()
+    start = date(2033, 1, 1)
+    operations = [
+        {"op": "create", "data": {
+            "room_id": room["id"], "guest_name": f"Listed Guest {i:03d}",
+            "check_in": (start + timedelta(days=i)).isoformat(),
+            "check_out": (start + timedelta(days=i + 1)).isoformat(),
+        }}
+        for i in range(120)
+    ]
+    assert client.post("/api/reservations/batch", json={"operations": operations}).status_code == 200
+
+    response = client.get("/api/guests")
+    assert response.status_code == 200
+    guests = response.json()
+    assert len(guests) == int(response.headers["X-Total-Count"]) >= 120
+    assert "X-Next-Cursor" not in response.headers
+    listed = [guest for guest in guests if guest["guest_name"].startswith("Listed Guest")]
+    assert len(listed) == 120
+    assert all(len(guest["reservations"]) == 1 for guest in listed)
+
+    page = client.get("/api/guests", params={"limit": 50})
+    assert len(page.json()) == 50
+    assert page.headers["X-Next-Cursor"]
@@ -0,0 +1,88 @@
+from datetime import date
+
+from services.http_cache import etag_matches
+
+
+def revalidate(client, url: str, etag: str, **params):
+    return client.get(url, params=params, headers={"If-None-Match": etag})
+
+
+def test_reservation_etag_follows_its_version(client, make_room, make_reservation):
+    reservation = make_reservation(make_room()["id"], date(2038, 3, 1))
+    url = f"/api/reservations/{reservation['id']}"
+    etag = client.get(url).headers["ETag"]
+
+    response = revalidate(client, url, etag)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # Weak comparison and lists of candidates match too
+    assert revalidate(client, url, f'"other", W/{etag}').status_code == 304
+
+    assert client.put(url, json={"notes": "Quiet room"}).status_code == 200
+    response = revalidate(client, url, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["notes"] == "Quiet room"
+
+
+def test_room_etags(client, make_room):
+    room = make_room()
+    url = f"/api/rooms/{room['id']}"
+    etag = client.get(url).headers["ETag"]
+    assert revalidate(client, url, etag).status_code == 304
+    assert client.put(url, json={"name": "Renamed"}).status_code == 200
+    assert revalidate(client, url, etag).status_code == 200
+
+    listing = client.get("/api/rooms/")
+    assert revalidate(client, "/api/rooms/", listing.headers["ETag"]).status_code == 304
+    # Another page is another representation
+    assert revalidate(client, "/api/rooms/", listing.headers["ETag"], limit=1).status_code == 200
+    make_room()
+    assert revalidate(client, "/api/rooms/", listing.headers["ETag"]).status_code == 200
+
+
+def test_calendar_etag_moves_with_any_write(client, make_room, make_reservation):
+    room = make_room()
+    make_reservation(room["id"], date(2038, 4, 1))
+    params = {"start_date": "2038-04-01", "end_date": "2038-05-01"}
+    etag = client.get("/api/reservations/calendar", params=params).headers["ETag"]
+    assert revalidate(client, "/api/reservations/calendar", etag, **params).status_code == 304
+
+    # A write outside the range still moves the version (deletions included)
+    other = make_reservation(room["id"], date(2038, 9, 1))
+    assert client.delete(f"/api/reservations/{other['id']}").status_code == 204
+    assert revalidate(client, "/api/reservations/calendar", etag, **params).status_code == 200
+
+
+def test_compressed_responses_keep_revalidating(client, make_room, make_reservation):
+    room = make_room()
+    for day in range(1, 28, 3):
+        make_reservation(room["id"], date(2038, 6, day), nights=2)
+    params = {"start_date": "2038-06-01", "end_date": "2038-07-01"}
+    response = client.get("/api/reservations/calendar", params=params, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+    assert len(response.json()) == 9
+
+    # The encoding suffix is ignored when comparing, whatever the client accepts now
+    response = client.get("/api/reservations/calendar", params=params,
+                          headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert response.status_code == 304
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc-br"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_small_bodies_are_not_compressed(client, make_room):
+    room = make_room()
+    response = client.get(f"/api/rooms/{room['id']}", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert not response.headers["ETag"].endswith('-gzip"')
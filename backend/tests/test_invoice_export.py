@@ -0,0 +1,73 @@
+import io
+import time
+import zipfile
+from datetime import date
+
+from services.invoice_cache import invoice_cache
+from services.invoice_export import archive_entries
+from services.invoice_pdf import InvoiceSnapshot, get_invoice_template
+
+
+def test_export_entries_carry_full_ids(client, make_room, make_reservation):
+    room = make_room()
+    # Same guest and check-in: only the id tells the invoices apart
+    first = make_reservation(room["id"], date(2031, 3, 1), guest_name="Ada Lovelace")
+    second = make_reservation(room["id"], date(2031, 3, 5), guest_name="Ada Lovelace")
+
+    response = client.get("/api/invoices/export", params={"reservation_ids": [first["id"], second["id"]]})
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        manifest = archive.read("manifest.csv").decode()
+
+    pdfs = [name for name in names if name.endswith(".pdf")]
+    assert len(pdfs) == len(set(pdfs)) == 2
+    assert {name.split("_", 1)[0] for name in pdfs} == {first["id"], second["id"]}
+    assert manifest.count(",ok") == 2
+
+
+def test_archive_entries_deduplicates_names():
+    snapshot = InvoiceSnapshot(
+        id="0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b",
+        status="CONFIRMED",
+        guest_name="Grace Hopper",
+        room_number="101",
+        room_name="Harbour",
+        check_in=date(2031, 1, 1),
+        check_out=date(2031, 1, 3),
+    )
+    entries = archive_entries([snapshot, snapshot], lambda s: "invoice.pdf")
+    names = [arcname for _, arcname in entries]
+    assert names == [f"{snapshot.id}_invoice.pdf", f"{snapshot.id}_invoice_2.pdf"]
+
+
+def test_invoice_served_when_cache_evicts_it(client, make_room, make_reservation, monkeypatch):
+    # Smaller than one PDF: every put evicts the file it just wrote
+    monkeypatch.setattr(invoice_cache, "max_bytes", 1)
+    reservation = make_reservation(make_room()["id"], date(2031, 4, 1))
+
+    response = client.get(f"/api/invoices/{reservation['id']}/invoice")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+
+    response = client.get("/api/invoices/export", params={"reservation_ids": [reservation["id"]]})
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.read("manifest.csv").decode().count(",ok") == 1
+
+
+def test_same_snapshot_renders_identical_bytes():
+    snapshot = InvoiceSnapshot(
+        id="0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b",
+        status="CONFIRMED",
+        guest_name="Grace Hopper",
+        room_number="101",
+        room_name="Harbour",
+        check_in=date(2031, 1, 1),
+        check_out=date(2031, 1, 3),
+        notes="Late arrival. " * 400,
+    )
+    template = get_invoice_template()
+    for fast_path in (True, False):
+        first = template.render(snapshot, fast_path=fast_path)
+        time.sleep(1.1)
+        assert template.render(snapshot, fast_path=fast_path) == first
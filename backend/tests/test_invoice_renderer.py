@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from datetime import date
+
+import pytest
+
+from services import invoice_renderer as renderer_module
+from services.invoice_pdf import InvoiceSnapshot
+from services.invoice_renderer import InvoiceRenderer, RendererBusy, RenderTimeout
+
+SNAPSHOT = InvoiceSnapshot(
+    id="0190a1b2-c3d4-7e5f-8a9b-0c1d2e3f4a5b",
+    status="CONFIRMED",
+    guest_name="Grace Hopper",
+    room_number="101",
+    room_name="Harbour",
+    check_in=date(2031, 1, 1),
+    check_out=date(2031, 1, 3),
+)
+
+
+def test_timed_out_renders_keep_their_slots(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(renderer_module, "generate_invoice_pdf", lambda snapshot: release.wait(10) and b"%PDF")
+    renderer = InvoiceRenderer(backend="thread", workers=2, queue_size=0, timeout=0.05)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RenderTimeout):
+                await renderer.render(SNAPSHOT)
+        # Both workers are still busy with the abandoned renders
+        assert renderer.in_flight == 2
+        with pytest.raises(RendererBusy):
+            await renderer.render(SNAPSHOT)
+
+        release.set()
+        for _ in range(100):
+            if renderer.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert renderer.in_flight == 0
+        renderer.timeout = 5
+        assert await renderer.render(SNAPSHOT) == b"%PDF"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        renderer.shutdown()
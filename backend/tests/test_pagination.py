@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def booked_room(make_room, make_reservation):
+    """A room with seven consecutive stays, in check-in order"""
+    room = make_room()
+    ids = [make_reservation(room["id"], date(2035, 1, 1) + timedelta(days=2 * i), nights=2)["id"] for i in range(7)]
+    return room, ids
+
+
+def page(client, **params):
+    response = client.get("/api/reservations/", params=params)
+    assert response.status_code == 200, response.text
+    return [r["id"] for r in response.json()], response.headers
+
+
+def test_cursor_walks_forward_and_back(client, booked_room):
+    room, ids = booked_room
+    first, headers = page(client, room_id=room["id"], limit=3)
+    assert first == ids[:3]
+    assert "X-Prev-Cursor" not in headers
+
+    second, headers = page(client, room_id=room["id"], limit=3, cursor=headers["X-Next-Cursor"])
+    assert second == ids[3:6]
+    back, _ = page(client, room_id=room["id"], limit=3, cursor=headers["X-Prev-Cursor"])
+    assert back == first
+
+    last, headers = page(client, room_id=room["id"], limit=3, cursor=headers["X-Next-Cursor"])
+    assert last == ids[6:]
+    assert "X-Next-Cursor" not in headers
+
+
+def test_descending_pages(client, booked_room):
+    room, ids = booked_room
+    first, headers = page(client, room_id=room["id"], limit=4, order="desc")
+    second, _ = page(client, room_id=room["id"], limit=4, order="desc", cursor=headers["X-Next-Cursor"])
+    assert first + second == ids[::-1]
+
+
+def test_skip_still_works(client, booked_room):
+    room, ids = booked_room
+    assert page(client, room_id=room["id"], limit=2, skip=5)[0] == ids[5:]
+
+
+# Garbage, a payload missing its fields ({"s":"check_in"}), not base64 at all
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "eyJzIjoiY2hlY2tfaW4ifQ", "%%%"])
+def test_bad_cursor_is_rejected(client, booked_room, cursor):
+    room, _ = booked_room
+    response = client.get("/api/reservations/", params={"room_id": room["id"], "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_cursor_of_another_sort_order_is_rejected(client, booked_room):
+    room, _ = booked_room
+    _, headers = page(client, room_id=room["id"], limit=3)
+    for params in ({"order": "desc"}, {"sort": "created_at"}):
+        response = client.get("/api/reservations/", params={
+            "room_id": room["id"], "limit": 3, "cursor": headers["X-Next-Cursor"], **params,
+        })
+        assert response.status_code == 400
+
+
+def test_room_list_pages_match_the_full_list(client, make_room):
+    for _ in range(5):
+        make_room()
+    everything = [room["id"] for room in client.get("/api/rooms/", params={"limit": 10000}).json()]
+    walked, cursor = [], None
+    while True:
+        response = client.get("/api/rooms/", params={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        walked += [room["id"] for room in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert walked == everything
+    previous = client.get("/api/rooms/", params={"limit": 4, "cursor": response.headers["X-Prev-Cursor"]})
+    assert [room["id"] for room in previous.json()] == walked[-len(response.json()) - 4:-len(response.json())]
@@ -0,0 +1,57 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+WINDOW_START = date(2034, 1, 1)
+WINDOW_DAYS = 60
+
+
+@pytest.fixture(scope="module")
+def fragmented(client):
+    """Eight suites booked with random stays and short holes"""
+    rng = random.Random(3)
+    operations = []
+    for _ in range(8):
+        room = client.post("/api/rooms/", json={
+            "number": f"S{rng.randrange(10 ** 6):06d}", "name": "Fragmented suite",
+            "room_type": "SUITE", "capacity": 3,
+        }).json()
+        day = WINDOW_START
+        while day < WINDOW_START + timedelta(days=WINDOW_DAYS - 7):
+            day += timedelta(days=rng.choice([0, 0, 1, 1, 2]))
+            nights = rng.randint(1, 5)
+            operations.append({"op": "create", "data": {
+                "room_id": room["id"], "guest_name": "Fragment",
+                "check_in": day.isoformat(), "check_out": (day + timedelta(days=nights)).isoformat(),
+            }})
+            day += timedelta(days=nights)
+    assert client.post("/api/reservations/batch", json={"operations": operations}).status_code == 200
+
+
+def repack(client, **options):
+    response = client.post("/api/availability/assign", json={
+        "repack": True,
+        "repack_from": WINDOW_START.isoformat(),
+        "repack_until": (WINDOW_START + timedelta(days=WINDOW_DAYS)).isoformat(),
+        **options,
+    })
+    assert response.status_code == 200, response.text
+    plan = response.json()
+    assert plan["moved"] == len(plan["moves"])
+    return plan
+
+
+def test_move_cost_trades_gaps_for_moves(client, fragmented):
+    free = repack(client, move_cost=0)
+    costed = repack(client, move_cost=0.5)
+    assert free["gaps_after"] < free["gaps_before"]
+    assert costed["gaps_after"] <= costed["gaps_before"]
+    assert costed["moved"] < free["moved"]
+    # Every kept swap closed more gaps than half its moves
+    assert costed["gaps_before"] - costed["gaps_after"] > 0.5 * costed["moved"]
+
+
+def test_max_moves_caps_the_plan(client, fragmented):
+    assert repack(client, move_cost=0, max_moves=0)["moved"] == 0
+    assert repack(client, move_cost=0, max_moves=3)["moved"] <= 3
@@ -0,0 +1,30 @@
+from datetime import date
+
+from services.room_catalog import CatalogRoom, room_catalog
+
+
+def test_deleted_room_cannot_be_booked(client, make_room):
+    room = make_room()
+    assert client.delete(f"/api/rooms/{room['id']}").status_code == 204
+    # A worker whose catalog has not caught up with the deletion yet
+    room_catalog._by_id[room["id"]] = CatalogRoom(**room)
+    try:
+        response = client.post("/api/reservations/", json={
+            "room_id": room["id"], "guest_name": "Late Booker",
+            "check_in": date(2031, 5, 1).isoformat(), "check_out": date(2031, 5, 3).isoformat(),
+        })
+    finally:
+        room_catalog._by_id.pop(room["id"], None)
+    assert response.status_code == 404
+
+
+def test_move_to_deleted_room_is_rejected(client, make_room, make_reservation):
+    room, gone = make_room(), make_room()
+    reservation = make_reservation(room["id"], date(2031, 5, 10))
+    assert client.delete(f"/api/rooms/{gone['id']}").status_code == 204
+    room_catalog._by_id[gone["id"]] = CatalogRoom(**gone)
+    try:
+        response = client.put(f"/api/reservations/{reservation['id']}", json={"room_id": gone["id"]})
+    finally:
+        room_catalog._by_id.pop(gone["id"], None)
+    assert response.status_code == 404
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+from database import SessionLocal
+from models import Reservation
+from services import availability_index as availability, guest_search, model_events
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def check_every_request(monkeypatch):
+    monkeypatch.setattr(availability, "AVAILABILITY_INDEX_CHECK_SECONDS", 0)
+    monkeypatch.setattr(guest_search, "GUEST_SEARCH_CHECK_SECONDS", 0)
+
+
+def free_room_ids(client, check_in: date, check_out: date):
+    response = client.get("/api/availability/search", params={
+        "check_in": check_in.isoformat(), "check_out": check_out.isoformat(),
+    })
+    assert response.status_code == 200
+    return {room["id"] for room in response.json()}
+
+
+def test_workers_pick_up_cli_import(client, make_room, tmp_path, check_every_request):
+    room = make_room()
+    check_in, check_out = date(2032, 1, 10), date(2032, 1, 12)
+    assert room["id"] in free_room_ids(client, check_in, check_out)
+    # Cached before the import
+    assert client.get("/api/reservations/search-guests", params={"query": "Quentin Imported"}).json() == []
+
+    path = tmp_path / "rows.json"
+    path.write_text(json.dumps([{
+        "room_number": room["number"], "guest_name": "Quentin Imported",
+        "check_in": check_in.isoformat(), "check_out": check_out.isoformat(),
+    }]))
+    result = subprocess.run(
+        [sys.executable, "import_reservations.py", str(path)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    assert room["id"] not in free_room_ids(client, check_in, check_out)
+    response = client.post("/api/reservations/", json={
+        "room_id": room["id"], "guest_name": "Double Booker",
+        "check_in": check_in.isoformat(), "check_out": check_out.isoformat(),
+    })
+    assert response.status_code == 409
+    names = [guest["guest_name"] for guest in
+             client.get("/api/reservations/search-guests", params={"query": "Quentin Imported"}).json()]
+    assert names == ["Quentin Imported"]
+
+
+def test_index_applies_missed_deletions(client, make_room, make_reservation, check_every_request):
+    room = make_room()
+    check_in = date(2032, 2, 1)
+    reservation = make_reservation(room["id"], check_in, nights=3)
+    assert room["id"] not in free_room_ids(client, check_in, date(2032, 2, 4))
+
+    # Deleted by "another process": this worker's index is not told
+    model_events.unsubscribe(availability.availability_index.apply_changes)
+    try:
+        with SessionLocal() as db:
+            db.delete(db.get(Reservation, reservation["id"]))
+            db.commit()
+    finally:
+        model_events.subscribe(availability.availability_index.apply_changes, remote=True)
+
+    assert room["id"] in free_room_ids(client, check_in, date(2032, 2, 4))
+    assert client.get("/api/admin/availability-index").json()["consistent"]